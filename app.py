@@ -5,15 +5,26 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 import streamlit as st
-import fitz  # pymupdf
 import time
 import re
-import traceback
+import io
 
 # Internal Modules
 from src.arena import Arena
-from src.judge import Judge
 from src.selector import Selector
+from src.schemas import PMAnalysis, CIOVerdict
+from src.jobs import get_default_executor, ADJUDICATE, DONE, FAILED
+from src.extraction import extract_documents
+from src.dedup import dedupe_pages
+from src.doc_store import get_default_store
+from src.scheduler import get_default_scheduler
+from src import telemetry
+from src.context import ContextIndex, build_query, SELECTOR_TOKEN_BUDGET, ARENA_TOKEN_BUDGET
+from src.messages import cache_stats
+from src.history import get_default_history
+from src.clients import prewarm
+from src.deadline import Deadline, ADJUDICATION_SLA_SECONDS
+from src.debate import MAX_REBUTTAL_ROUNDS
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -48,6 +59,179 @@ def guess_ticker_from_files(file_list):
 
     return None
 
+# --- ADJUDICATION JOB VIEWS ---
+def clear_job():
+    st.session_state.job_id = None
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+@st.fragment(run_every=1.0)
+def job_progress(job_id):
+    """
+    Polls the running job once a second; only this fragment reruns, so the
+    rest of the page stays interactive. A full rerun renders the result.
+    """
+    job = get_default_executor().get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+
+    progress = job.progress
+    if progress.get("stage") == "judge":
+        st.info("⚖️ Phase 2: The CIO is weighing the evidence...")
+    elif progress.get("stage") == "rebuttal":
+        st.info(f"🗣️ Rebuttal round {progress.get('rebuttal_round', 0) + 1}: each PM answers the other's case...")
+    else:
+        st.info(f"🧠 Phase 1: Long and Short PMs are performing deep reasoning on {job.payload['ticker']}...")
+
+    samples = job.payload.get("samples", 1)
+    live_long, live_short = st.columns(2)
+    for column, role, caption in ((live_long, "long", "🔵 Bull Case (live)"), (live_short, "short", "🔴 Bear Case (live)")):
+        with column:
+            st.caption(caption)
+            if samples > 1:
+                st.info(f"Drawing {samples} samples...")
+            else:
+                st.markdown(f"*{progress.get(role, '')}*\n\n{progress.get(f'{role}_thesis', '')}")
+    if progress.get("verdict"):
+        st.markdown(f"**CIO (live):** {progress['verdict']}")
+    st.caption(f"Job `{job.job_id}` · {job.status} · {job.elapsed:.0f}s — you can keep using the page or reload it.")
+
+def render_result(result):
+    long_res = PMAnalysis.model_validate(result["long"]) if result["long"] else None
+    short_res = PMAnalysis.model_validate(result["short"]) if result["short"] else None
+
+    # =========================================================
+    # 🛡️ CIRCUIT BREAKER: Stop here if AI failed
+    # =========================================================
+    if result["failure"] == "both":
+        st.error("🚨 **AI Agents Failed:** The Long/Short PMs returned empty results.")
+        st.warning("👉 **Action:** Check your `.env` file. Your OpenAI API Key may be invalid or missing, "
+                   "or the provider kept failing after retries (see the scheduler panel in the sidebar).")
+        return
+    if result["failure"]:
+        survivor = short_res if long_res is None else long_res
+        st.error(f"🚨 **{result['failure']} PM Failed:** timed out or errored. The CIO needs both sides to rule.")
+        with st.expander(f"Partial result: {survivor.role}", expanded=True):
+            st.markdown(f"*{survivor.analytical_process}*")
+        return
+    # =========================================================
+
+    verdict = CIOVerdict.model_validate(result["verdict"]) if result["verdict"] else None
+    ensemble = result.get("ensemble") or {}
+    long_ens, short_ens = ensemble.get("long"), ensemble.get("short")
+    debate = result.get("debate") or {}
+
+    # SECTION 1: THE VERDICT
+    st.markdown(f"### 🏛️ Final Verdict: {result['ticker']}")
+
+    deadline = result.get("deadline") or {}
+    if deadline.get("degraded"):
+        st.warning(f"⏳ Degraded to meet the {deadline['sla_seconds']:.0f}s SLA: " + "; ".join(deadline["degraded"]))
+
+    winner = verdict.winner if verdict else "Undecided"
+
+    if "Long" in winner:
+        theme_color, winner_icon = "green", "🔵"
+    elif "Short" in winner:
+        theme_color, winner_icon = "red", "🔴"
+    else:
+        theme_color, winner_icon = "gray", "⚪"
+
+    with st.container(border=True):
+        kpi1, kpi2, kpi3 = st.columns([1, 2, 2])
+        with kpi1:
+            net_risk = verdict.net_risk_units if verdict else 0
+            st.metric("Net Risk Units", f"{net_risk:+.1f}")
+        with kpi2:
+            st.caption("Winner")
+            st.subheader(f":{theme_color}[{winner_icon} {winner}]")
+        with kpi3:
+            st.caption("Deciding Factor")
+            factor = verdict.deciding_factor if verdict else "Insufficient Data"
+            st.write(f"**{factor}**")
+
+        st.divider()
+        if verdict:
+            st.markdown(f"**Executive Summary:** {verdict.executive_summary}")
+
+    # SECTION 2: THE DEEP REASONING
+    st.markdown("---")
+    st.subheader("🧠 The Analytical Debate")
+    st.markdown("Review the step-by-step reasoning trace of how each PM arrived at their conviction.")
+
+    col1, col2 = st.columns(2)
+
+    # --- LONG SIDE ---
+    with col1:
+        st.header("🔵 Bull Case")
+        if long_res:
+            with st.container(border=True):
+                st.caption("Reasoning Trace")
+                st.markdown(f"*{long_res.analytical_process}*")
+                st.divider()
+                if hasattr(long_res, 'risk_sizing') and long_res.risk_sizing:
+                    st.metric("Risk Allocated", f"{long_res.risk_sizing.risk_units}/10")
+                    st.write(f"**Role:** {long_res.risk_sizing.role_in_book}")
+                    if long_ens:
+                        low, high = long_ens["risk_units_iqr"]
+                        st.caption(f"Median of {long_ens['n']} samples · IQR {low:.1f}-{high:.1f} · "
+                                   f"confidence {long_ens['confidence_median']:.0f} ± {long_ens['confidence_std']:.0f}")
+                    if debate.get("rounds"):
+                        path = " → ".join(f"{u:g}" for u in debate["long"]["risk_path"])
+                        st.caption(f"Sizing through {debate['rounds']} rebuttal rounds: {path}")
+                else:
+                    st.warning("No risk sizing generated.")
+
+    # --- SHORT SIDE ---
+    with col2:
+        st.header("🔴 Bear Case")
+        if short_res:
+            with st.container(border=True):
+                st.caption("Reasoning Trace")
+                st.markdown(f"*{short_res.analytical_process}*")
+                st.divider()
+                if hasattr(short_res, 'risk_sizing') and short_res.risk_sizing:
+                    st.metric("Risk Allocated", f"{short_res.risk_sizing.risk_units}/10")
+                    st.write(f"**Role:** {short_res.risk_sizing.role_in_book}")
+                    if short_ens:
+                        low, high = short_ens["risk_units_iqr"]
+                        st.caption(f"Median of {short_ens['n']} samples · IQR {low:.1f}-{high:.1f} · "
+                                   f"confidence {short_ens['confidence_median']:.0f} ± {short_ens['confidence_std']:.0f}")
+                    if debate.get("rounds"):
+                        path = " → ".join(f"{u:g}" for u in debate["short"]["risk_path"])
+                        st.caption(f"Sizing through {debate['rounds']} rebuttal rounds: {path}")
+                else:
+                    st.warning("No risk sizing generated.")
+
+    # SECTION 3: CONVICTION LEVERS
+    st.markdown("### 🎚️ Conviction Levers")
+    st.write("The specific arguments that tipped the scale.")
+
+    lever_col1, lever_col2 = st.columns(2)
+
+    with lever_col1:
+        st.subheader("🐂 Top Upside Drivers")
+        if long_res and hasattr(long_res, 'key_arguments'):
+            for i, arg in enumerate(long_res.key_arguments):
+                st.info(f"{i+1}. {str(arg)}")
+        else:
+            st.caption("No specific upside levers listed.")
+
+    with lever_col2:
+        st.subheader("🐻 Top Downside Risks")
+        if short_res and hasattr(short_res, 'key_arguments'):
+            for i, arg in enumerate(short_res.key_arguments):
+                st.warning(f"{i+1}. {str(arg)}")
+        else:
+            st.caption("No specific downside risks listed.")
+
+    # SECTION 4: PRE-MORTEM
+    if verdict and hasattr(verdict, 'pre_mortem'):
+        st.divider()
+        with st.expander("☠️ Pre-Mortem: What Kills This Thesis?", expanded=False):
+            st.markdown(verdict.pre_mortem)
+
+
 # --- SIDEBAR: CONTROLS ---
 with st.sidebar:
     st.header("1. Input Data")
@@ -65,55 +249,75 @@ with st.sidebar:
     if "selector" not in st.session_state: st.session_state.selector = Selector()
     if "target_cache" not in st.session_state: st.session_state.target_cache = None
     if "raw_text_cache" not in st.session_state: st.session_state.raw_text_cache = None
+    if "context_index" not in st.session_state: st.session_state.context_index = None
     
+    bypass_cache = st.checkbox("Bypass response cache", value=False,
+                               help="Re-run every model call even if an identical request was answered before.")
+    st.session_state.arena.bypass_cache = bypass_cache
+    st.session_state.selector.bypass_cache = bypass_cache
+
+    ensemble_samples = st.slider("Ensemble samples per PM", min_value=1, max_value=9, value=1,
+                                 help="Draw N analyses per PM in one request and size off the median. 1 = single sample with live streaming.")
+
+    rebuttal_rounds = st.slider("Rebuttal rounds", min_value=0, max_value=MAX_REBUTTAL_ROUNDS, value=0,
+                                help="After the opening pitches, each PM answers the other's arguments and may "
+                                     "resize. Stops early once both sides' sizing has converged.")
+
+    sla_seconds = st.slider("Adjudication SLA (seconds)", min_value=30, max_value=300, step=10,
+                            value=int(float(os.getenv("ARENA_SLA_SECONDS", ADJUDICATION_SLA_SECONDS))),
+                            help="End-to-end budget for debate + verdict. Short budgets use less context, "
+                                 "a cheaper model, or a heuristic verdict instead of hanging.")
+
+    show_timing = st.checkbox("Show timing panel", value=False,
+                              help="Per-stage wall time, queue time, tokens and estimated cost.")
+
+    with st.expander("⚙️ Model Scheduler"):
+        st.json(get_default_scheduler().metrics())
+
+    with st.expander("🧵 Jobs"):
+        for recent in get_default_executor().store.recent(10):
+            st.caption(f"`{recent.job_id}` {recent.payload.get('ticker', '')} · {recent.status} · {recent.elapsed:.0f}s")
+
     if st.button("Reset All"):
         st.session_state.arena = Arena()
         st.session_state.selector = Selector()
         st.session_state.target_cache = None
         st.session_state.raw_text_cache = None
+        st.session_state.context_index = None
+        clear_job()
         st.rerun()
 
 @st.cache_data(show_spinner=False)
-def extract_text_from_files(uploaded_files):
-    combined_text = ""
-    TIMEOUT_SECONDS = 120
-    start_time = time.time()
-    
+def extract_text_from_files(uploaded_files, _deadline_seconds=None):
+    # Underscore arg: the time budget is not part of the cache key
     progress_bar = st.progress(0)
     status_text = st.empty()
-    
-    total_files = len(uploaded_files)
-    timed_out = False
 
-    for file_index, uploaded_file in enumerate(uploaded_files):
-        if timed_out: break
+    documents = [(f.name, f.getvalue()) for f in uploaded_files]
+    total_files = len(documents)
+    file_progress = [0.0] * total_files
 
-        status_text.text(f"Processing {uploaded_file.name}...")
-        bytes_data = uploaded_file.getvalue()
-        
-        try:
-            with fitz.open(stream=bytes_data, filetype="pdf") as doc:
-                for page_num, page in enumerate(doc):
-                    if time.time() - start_time > TIMEOUT_SECONDS:
-                        st.error(f"⚠️ Extraction timed out. Partial data loaded.")
-                        timed_out = True
-                        break
-                    
-                    combined_text += page.get_text(sort=True) + "\n\n"
-        
-        except Exception as e:
-            st.error(f"Error reading {uploaded_file.name}: {e}")
+    def on_progress(file_index, file_name, pages_done, pages_total):
+        file_progress[file_index] = pages_done / pages_total if pages_total else 1.0
+        status_text.text(f"Processing {file_name}... page {pages_done}/{pages_total}")
+        progress_bar.progress(sum(file_progress) / total_files)
+
+    result = extract_documents(documents, progress_callback=on_progress,
+                               deadline_seconds=_deadline_seconds, store=get_default_store())
 
-        progress_bar.progress((file_index + 1) / total_files)
+    for name, error in result.errors.items():
+        st.error(f"Error reading {name}: {error}")
 
-    if not timed_out:
+    if result.timed_out:
+        st.error(f"⚠️ Extraction timed out. Partial data loaded ({result.pages_done}/{result.pages_total} pages).")
+    else:
         status_text.text("Extraction complete!")
         time.sleep(0.5)
-    
+
     status_text.empty()
     progress_bar.empty()
-    
-    return combined_text
+
+    return result
 
 # --- MAIN DASHBOARD LOGIC ---
 if uploaded_files:
@@ -121,18 +325,35 @@ if uploaded_files:
     # STEP 0: TEXT EXTRACTION
     if st.session_state.raw_text_cache is None:
         with st.spinner("📄 Extracting text from PDFs..."):
-            text = extract_text_from_files(uploaded_files)
+            # One deadline covers extraction and the target selection below
+            st.session_state.upload_deadline = Deadline.for_upload()
+            with telemetry.trace("extract") as extract_trace:
+                extraction = extract_text_from_files(
+                    uploaded_files, _deadline_seconds=st.session_state.upload_deadline.budget("extract")
+                )
+                # Repeated disclaimers, headers/footers and tables across files
+                dedup = dedupe_pages(extraction.pages)
+            st.session_state.extract_trace = extract_trace
+            text = dedup.text
             st.session_state.raw_text_cache = text
-            st.success(f"Extracted {len(text)} characters.")
+            st.session_state.doc_digests = extraction.digests
+            # Chunk + BM25 index built once per upload, reused by every call below
+            st.session_state.context_index = ContextIndex.from_pages(dedup.pages)
+            st.success(f"Extracted {len(text)} characters "
+                       f"({dedup.chars_removed:,} duplicate/boilerplate characters removed, {dedup.removed_ratio:.0%}).")
     
     raw_text = st.session_state.raw_text_cache
+    context_index = st.session_state.context_index
 
     if raw_text:
         # STEP 1: AUTO-SELECTION
         if st.session_state.target_cache is None:
             with st.spinner("🔍 AI Analyst is identifying the best trading vehicle..."):
                 try:
-                    selection = st.session_state.selector.select_target(raw_text[:30000])
+                    selection = st.session_state.selector.select_target(
+                        context_index.pack(build_query(), SELECTOR_TOKEN_BUDGET),
+                        deadline=st.session_state.pop("upload_deadline", None) or Deadline.for_upload(),
+                    )
                     st.session_state.target_cache = selection 
                 except Exception as e:
                     print(f"Selector Error: {e}") 
@@ -175,129 +396,108 @@ if uploaded_files:
                 st.write(final_reasoning)
 
         # STEP 2: THE ADJUDICATION
+        # Runs as a background job: this script only submits and polls, so
+        # widget reruns and page reloads neither abort nor repeat it.
         if st.button(f"⚖️ ADJUDICATE: {ticker_input}", type="primary", use_container_width=True):
-            
-            status_container = st.empty()
-            
-            try:
-                # --- PHASE 1: PM DEBATE ---
-                status_container.info(f"🧠 Phase 1: Long and Short PMs are performing deep reasoning on {ticker_input}...")
-                
-                long_res, short_res = st.session_state.arena.fight(raw_text[:60000], target=ticker_input)
-                
-                # =========================================================
-                # 🛡️ CIRCUIT BREAKER: Stop here if AI failed
-                # =========================================================
-                if long_res is None or short_res is None:
-                    status_container.empty()
-                    st.error("🚨 **AI Agents Failed:** The Long/Short PMs returned empty results.")
-                    st.warning("👉 **Action:** Check your `.env` file. Your OpenAI API Key is likely invalid or missing.")
-                    st.stop()
-                # =========================================================
-                
-                # --- PHASE 2: CIO JUDGMENT ---
-                status_container.info("⚖️ Phase 2: The CIO is weighing the evidence...")
-                judge = Judge()
-                verdict = judge.adjudicate(long_res, short_res)
-                
-                status_container.empty()
-
-                # SECTION 1: THE VERDICT
-                st.markdown(f"### 🏛️ Final Verdict: {ticker_input}")
-                
-                winner = verdict.winner if verdict else "Undecided"
-                
-                if "Long" in winner:
-                    theme_color, winner_icon = "green", "🔵"
-                elif "Short" in winner:
-                    theme_color, winner_icon = "red", "🔴"
-                else:
-                    theme_color, winner_icon = "gray", "⚪"
-
-                with st.container(border=True):
-                    kpi1, kpi2, kpi3 = st.columns([1, 2, 2])
-                    with kpi1:
-                        net_risk = verdict.net_risk_units if verdict else 0
-                        st.metric("Net Risk Units", f"{net_risk:+.1f}")
-                    with kpi2:
-                        st.caption("Winner")
-                        st.subheader(f":{theme_color}[{winner_icon} {winner}]")
-                    with kpi3:
-                        st.caption("Deciding Factor")
-                        factor = verdict.deciding_factor if verdict else "Insufficient Data"
-                        st.write(f"**{factor}**")
-
-                    st.divider()
-                    if verdict:
-                        st.markdown(f"**Executive Summary:** {verdict.executive_summary}")
-
-                # SECTION 2: THE DEEP REASONING
-                st.markdown("---")
-                st.subheader("🧠 The Analytical Debate")
-                st.markdown("Review the step-by-step reasoning trace of how each PM arrived at their conviction.")
-
-                col1, col2 = st.columns(2)
-                
-                # --- LONG SIDE ---
-                with col1:
-                    st.header("🔵 Bull Case")
-                    if long_res:
-                        with st.container(border=True):
-                            st.caption("Reasoning Trace")
-                            st.markdown(f"*{long_res.analytical_process}*")
-                            st.divider()
-                            if hasattr(long_res, 'risk_sizing') and long_res.risk_sizing:
-                                st.metric("Risk Allocated", f"{long_res.risk_sizing.risk_units}/10")
-                                st.write(f"**Role:** {long_res.risk_sizing.role_in_book}")
-                            else:
-                                st.warning("No risk sizing generated.")
-
-                # --- SHORT SIDE ---
-                with col2:
-                    st.header("🔴 Bear Case")
-                    if short_res:
-                        with st.container(border=True):
-                            st.caption("Reasoning Trace")
-                            st.markdown(f"*{short_res.analytical_process}*")
-                            st.divider()
-                            if hasattr(short_res, 'risk_sizing') and short_res.risk_sizing:
-                                st.metric("Risk Allocated", f"{short_res.risk_sizing.risk_units}/10")
-                                st.write(f"**Role:** {short_res.risk_sizing.role_in_book}")
-                            else:
-                                st.warning("No risk sizing generated.")
-
-                # SECTION 3: CONVICTION LEVERS
-                st.markdown("### 🎚️ Conviction Levers")
-                st.write("The specific arguments that tipped the scale.")
-                
-                lever_col1, lever_col2 = st.columns(2)
-                
-                with lever_col1:
-                    st.subheader("🐂 Top Upside Drivers")
-                    if long_res and hasattr(long_res, 'key_arguments'):
-                        for i, arg in enumerate(long_res.key_arguments):
-                            st.info(f"{i+1}. {str(arg)}")
-                    else:
-                        st.caption("No specific upside levers listed.")
-
-                with lever_col2:
-                    st.subheader("🐻 Top Downside Risks")
-                    if short_res and hasattr(short_res, 'key_arguments'):
-                        for i, arg in enumerate(short_res.key_arguments):
-                            st.warning(f"{i+1}. {str(arg)}")
-                    else:
-                        st.caption("No specific downside risks listed.")
-
-                # SECTION 4: PRE-MORTEM
-                if verdict and hasattr(verdict, 'pre_mortem'):
-                    st.divider()
-                    with st.expander("☠️ Pre-Mortem: What Kills This Thesis?", expanded=False):
-                        st.markdown(verdict.pre_mortem)
-
-            except Exception as e:
-                st.error("An error occurred during adjudication.")
-                st.code(traceback.format_exc())
-
-    # --- DEBUG SECTION ---
+            debate_context = context_index.pack(
+                build_query(ticker_input, sel.instrument_name if sel else None), ARENA_TOKEN_BUDGET
+            )
+            job_id = get_default_executor().submit(ADJUDICATE, {
+                "context": debate_context,
+                "ticker": ticker_input,
+                "samples": ensemble_samples,
+                "rebuttal_rounds": rebuttal_rounds,
+                "bypass_cache": bypass_cache,
+                "digests": st.session_state.get("doc_digests") or [],
+                "sla_seconds": sla_seconds,
+            })
+            st.session_state.job_id = job_id
+            st.query_params["job"] = job_id
+
+# --- ADJUDICATION JOB ---
+# The job id is mirrored into the URL, so a reloaded page picks it back up
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+if job_id:
+    job = get_default_executor().get(job_id)
+    if job is None:
+        st.warning(f"Adjudication job {job_id} not found.")
+        clear_job()
+    else:
+        st.session_state.job_id = job_id
+        if job.active:
+            job_progress(job_id)
+        elif job.status == DONE:
+            st.session_state.last_trace = job.result.get("trace")
+            render_result(job.result)
+        elif job.status == FAILED:
+            st.error("An error occurred during adjudication.")
+            st.code(job.error)
+        else:
+            st.warning(f"⚠️ Adjudication was interrupted: {job.error}. Run it again.")
+
+# --- VERDICT HISTORY ---
+with st.expander("📜 Verdict History", expanded=False):
+    history = get_default_history()
+    known = history.tickers()
+    if not known:
+        st.caption("No verdicts recorded yet. Every adjudication is saved here.")
+    else:
+        hist_ticker_col, hist_window_col = st.columns([1, 2])
+        with hist_ticker_col:
+            counts = {ticker: n for ticker, n, _ in known}
+            hist_ticker = st.selectbox("Ticker", ["All"] + list(counts),
+                                       format_func=lambda t: t if t == "All" else f"{t} ({counts[t]})")
+        with hist_window_col:
+            hist_days = st.select_slider("Window", options=[7, 30, 90, 365, 0], value=90,
+                                         format_func=lambda d: "All time" if d == 0 else f"Last {d} days")
+        hist_filters = {
+            "ticker": None if hist_ticker == "All" else hist_ticker,
+            "start": time.time() - hist_days * 86400 if hist_days else None,
+        }
+        # Summary columns only; the full analyses stay in SQLite until exported.
+        # pandas is imported here so a first visit with no history never pays for it
+        import pandas as pd
+        hist_df = pd.DataFrame(history.query(**hist_filters))
+        if hist_df.empty:
+            st.caption("No verdicts in this window.")
+        else:
+            hist_df["created_at"] = pd.to_datetime(hist_df["created_at"], unit="s")
+            if hist_filters["ticker"] and len(hist_df) > 1:
+                st.line_chart(hist_df, x="created_at", y=["net_risk_units", "long_risk_units", "short_risk_units"])
+            st.dataframe(hist_df, use_container_width=True, hide_index=True)
+
+            def export_history():
+                buffer = io.BytesIO()
+                history.export_parquet(buffer, full=True, **hist_filters)
+                return buffer.getvalue()
+
+            st.download_button("⬇️ Export Parquet (full records)", data=export_history,
+                               file_name=f"verdicts_{hist_ticker.lower()}.parquet",
+                               mime="application/vnd.apache.parquet")
+
+# --- TIMING PANEL ---
+if show_timing:
+    with st.expander("⏱️ Timing: where the time went", expanded=True):
+        extract_trace = st.session_state.get("extract_trace")
+        for label, rows in (("Extraction", extract_trace.rows() if extract_trace else None),
+                            ("Last adjudication", st.session_state.get("last_trace"))):
+            if not rows:
+                continue
+            total_cost = sum(r["cost_usd"] for r in rows)
+            prompt_cache = cache_stats(rows)
+            st.caption(
+                f"{label} — {rows[0]['wall_ms'] / 1000:.1f}s, est. ${total_cost:.4f}"
+                f" · prompt cache {prompt_cache['cached_tokens']:,}/{prompt_cache['prompt_tokens']:,} tokens"
+                f" ({prompt_cache['hit_rate']:.0%})"
+            )
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+# --- DEBUG SECTION ---
+if uploaded_files and st.session_state.raw_text_cache:
     with st.expander("🕵️ Debug: View Raw Text"):
-        st.write(raw_text[:5000])
\ No newline at end of file
+        st.write(st.session_state.raw_text_cache[:5000])
+
+# --- CLIENT WARM-UP ---
+# The OpenAI SDK and the pooled clients load after the page has rendered,
+# so neither the first render nor the first model call waits on them
+prewarm()
@@ -0,0 +1,32 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.batch import BatchRunner, discover_packs, DEFAULT_CHECKPOINT_DIR
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run research packs through select -> debate -> judge.")
+    parser.add_argument("source", help="Directory of PDFs (one pack per PDF or subdirectory) or a .jsonl manifest")
+    parser.add_argument("--output", default="data/batch/results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--checkpoints", default=DEFAULT_CHECKPOINT_DIR, help="Per-pack stage checkpoints for resume")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max packs in a model stage at once")
+    parser.add_argument("--extract-concurrency", type=int, default=2, help="Max packs extracting PDFs at once")
+    parser.add_argument("--fresh", action="store_true", help="Ignore existing checkpoints and rerun every pack")
+    args = parser.parse_args()
+
+    packs = discover_packs(args.source)
+    print(f"📦 {len(packs)} research packs found in {args.source}")
+
+    runner = BatchRunner(
+        args.output,
+        checkpoint_dir=args.checkpoints,
+        concurrency=args.concurrency,
+        extract_concurrency=args.extract_concurrency,
+        fresh=args.fresh,
+    )
+    summary = runner.run(packs)
+
+    print("\n📊 BATCH SUMMARY")
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    print(f"\n💾 Results streamed to {args.output}")
@@ -0,0 +1,146 @@
+"""
+Extraction benchmark: "layout" (get_text(sort=True)) vs "tables" mode.
+
+Per mode, in one process so the numbers are per-page cost rather than
+pool scheduling: pages/sec, output tokens per page (the prompt budget the
+text consumes downstream), tables found, and how many of the numbers in
+the layout text survive in the output (a cheap fidelity check).
+
+By default runs on a synthetic 10-K-style PDF: prose paragraphs, ruled
+financial tables on some pages and whitespace-aligned numeric rows on all
+of them. Pass real filings/decks to measure those instead.
+
+    python -m bench.bench_extraction
+    python -m bench.bench_extraction --pages 120 --ruled-every 2
+    python -m bench.bench_extraction reports/10k.pdf reports/deck.pdf --save bench/extraction.json
+"""
+import re
+import json
+import time
+import argparse
+from collections import Counter
+
+from src.extraction import EXTRACTION_MODES, LAYOUT, TABLES, page_text
+from src.context import count_tokens
+
+_NUMBER = re.compile(r"\d[\d,.]*")
+
+
+def make_filing_pdf(pages: int, ruled_every: int = 3) -> bytes:
+    """
+    Synthetic filing: three prose paragraphs per page, a ruled segment
+    table on every ruled_every-th page, and an unruled five-year summary.
+    """
+    import fitz
+    prose = ("Net revenue increased due to pricing and volume in the segment, partly offset by higher "
+             "freight and labor costs; operating margin expanded as fixed costs were absorbed. ") * 4
+    columns = [54, 200, 290, 380, 470, 540]
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        for _ in range(3):
+            page.insert_textbox(fitz.Rect(54, y, 540, y + 90), prose, fontsize=8)
+            y += 100
+        if ruled_every and page_num % ruled_every == 0:
+            rows = 8
+            for r in range(rows + 1):
+                page.draw_line((columns[0], y + r * 14), (columns[-1], y + r * 14))
+            for x in columns:
+                page.draw_line((x, y), (x, y + rows * 14))
+            for r in range(rows):
+                cells = (["($ in millions)", "FY2023", "FY2024", "Margin", "Change"] if r == 0 else
+                         [f"Segment {r}", f"{1000 + 37 * r + page_num:,}", f"{210 + 11 * r:,}",
+                          f"{18.5 + r:.1f}%", f"({12 + r})"])
+                for x, cell in zip(columns, cells):
+                    page.insert_text((x + 3, y + r * 14 + 10), cell, fontsize=8)
+            y += rows * 14 + 20
+        for r in range(6):
+            page.insert_text((54, y), f"FY{2019 + r}      {1000 + 37 * r:>8,}      {210 + 11 * r:>6,}      "
+                                      f"{18.5 + r:>5.1f}%", fontsize=8)
+            y += 12
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def bench_mode(documents: list, mode: str, repeats: int) -> dict:
+    import fitz
+    timings, outputs = [], []
+    for _ in range(repeats):
+        outputs = []
+        started = time.perf_counter()
+        for data in documents:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                outputs.extend(page_text(page, mode) for page in doc)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    tokens = [count_tokens(text) for text in outputs]
+    return {
+        "pages": len(outputs),
+        "pages_per_sec": round(len(outputs) / best, 1),
+        "ms_per_page": round(best / len(outputs) * 1000, 2),
+        "tokens_per_page": round(sum(tokens) / len(tokens), 1),
+        "chars_per_page": round(sum(len(t) for t in outputs) / len(outputs), 1),
+        "tables": sum(text.count("[table]") for text in outputs),
+        "_texts": outputs,
+    }
+
+
+def number_recall(reference: list, candidate: list) -> float:
+    """
+    Share of numeric tokens in the reference pages also present, with
+    multiplicity, in the candidate pages.
+    """
+    ref = Counter(n for text in reference for n in _NUMBER.findall(text))
+    got = Counter(n for text in candidate for n in _NUMBER.findall(text))
+    total = sum(ref.values())
+    return round(sum(min(count, got[n]) for n, count in ref.items()) / total, 4) if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extraction modes on speed and output tokens.")
+    parser.add_argument("pdfs", nargs="*", help="PDFs to measure (default: a synthetic filing)")
+    parser.add_argument("--pages", type=int, default=60, help="Synthetic filing length")
+    parser.add_argument("--ruled-every", type=int, default=3, help="Synthetic: a ruled table every N pages (0 = none)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes per mode; the best is reported")
+    parser.add_argument("--show-page", type=int, default=None, help="Print this page (0-based) in every mode")
+    parser.add_argument("--save", default=None, help="Write results JSON here")
+    args = parser.parse_args()
+
+    if args.pdfs:
+        documents = []
+        for path in args.pdfs:
+            with open(path, "rb") as f:
+                documents.append(f.read())
+        source = ", ".join(args.pdfs)
+    else:
+        documents = [make_filing_pdf(args.pages, args.ruled_every)]
+        source = f"synthetic filing ({args.pages} pages, ruled table every {args.ruled_every})"
+    print(f"📄 Extracting {source}")
+
+    results = {mode: bench_mode(documents, mode, args.repeats) for mode in EXTRACTION_MODES}
+    reference = results[LAYOUT]["_texts"]
+    for mode, result in results.items():
+        result["number_recall_vs_layout"] = number_recall(reference, result["_texts"])
+    layout, tables = results[LAYOUT], results[TABLES]
+    summary = {
+        "speedup": round(tables["pages_per_sec"] / layout["pages_per_sec"], 2),
+        "token_reduction": round(1 - tables["tokens_per_page"] / layout["tokens_per_page"], 3),
+    }
+
+    if args.show_page is not None:
+        for mode, result in results.items():
+            print(f"\n----- {mode}: page {args.show_page} -----\n{result['_texts'][args.show_page]}")
+    for result in results.values():
+        del result["_texts"]
+    output = {"source": source, "modes": results, "summary": summary}
+    print(json.dumps(output, indent=2))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+End-to-end throughput/latency benchmark against the offline fake server.
+
+Measures adjudications/sec and p50/p99 latency of select -> fight -> judge
+at a given concurrency, plus extraction pages/sec on synthetic PDFs.
+No OpenAI spend: every model call goes to bench.fake_openai.
+
+    python -m bench.bench_pipeline --adjudications 50 --concurrency 10
+    python -m bench.bench_pipeline --save bench/baseline.json
+    python -m bench.bench_pipeline --baseline bench/baseline.json   # exit 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from bench.fake_openai import FakeConfig, FakeOpenAIServer
+
+SCENARIO = (
+    "TICKER: ACME. Revenue grew 18% YoY on data-center demand; gross margin expanded 150bps. "
+    "Inventory rose 30% and two large customers delayed orders. Management guided flat next quarter. "
+) * 40
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def make_synthetic_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """
+    A 10-K-ish PDF: prose lines plus a small numeric table per page.
+    """
+    import fitz
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        for line in range(lines_per_page - 6):
+            page.insert_text((54, y), f"Item {page_num}.{line} Net revenue increased due to pricing and volume in segment {line % 7}.", fontsize=8)
+            y += 14
+        for row in range(6):
+            page.insert_text((54, y), f"FY{2019 + row}    {1000 + 37 * row:>8,}    {210 + 11 * row:>6,}    {18.5 + row:>5.1f}%", fontsize=8)
+            y += 12
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def _bench_adjudications(count: int, concurrency: int) -> dict:
+    from openai import AsyncOpenAI
+    from src.arena import Arena
+    from src.judge import Judge
+    from src.selector import Selector
+    from src.cache import ResponseCache
+
+    no_cache = ResponseCache(enabled=False)
+    selector, arena, judge = Selector(cache=no_cache), Arena(cache=no_cache), Judge(cache=no_cache)
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(client):
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            target = await selector.aselect_target(SCENARIO, client=client)
+            long_res, short_res = await arena.afight(SCENARIO, target=target.primary_ticker, client=client)
+            if long_res is None or short_res is None:
+                failures += 1
+                return
+            await judge.aadjudicate(long_res, short_res, client=client)
+            latencies.append(time.perf_counter() - started)
+
+    async with AsyncOpenAI(max_retries=0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client) for _ in range(count)), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "adjudications": len(latencies),
+        "failures": count - len(latencies),
+        "adjudications_per_sec": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50_seconds": round(percentile(latencies, 50), 3),
+        "p99_seconds": round(percentile(latencies, 99), 3),
+    }
+
+
+def _bench_extraction(pages: int, files: int) -> dict:
+    from src.extraction import extract_documents
+    documents = [(f"synthetic_{i}.pdf", make_synthetic_pdf(pages)) for i in range(files)]
+    # Warm the worker pool so we time extraction, not process start-up
+    extract_documents(documents[:1])
+    result = extract_documents(documents)
+    return {
+        "pages": result.pages_done,
+        "extraction_seconds": round(result.elapsed, 3),
+        "pages_per_sec": round(result.pages_done / result.elapsed, 1) if result.elapsed else 0.0,
+    }
+
+
+# Metrics where bigger is better; everything else is a latency
+_HIGHER_IS_BETTER = {"adjudications_per_sec", "pages_per_sec"}
+_COMPARED = ("adjudications_per_sec", "p50_seconds", "p99_seconds", "pages_per_sec")
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns human-readable regressions beyond tolerance (e.g. 0.15 = 15%).
+    """
+    regressions = []
+    for key in _COMPARED:
+        if key not in baseline or key not in results or not baseline[key]:
+            continue
+        change = (results[key] - baseline[key]) / baseline[key]
+        worse = -change if key in _HIGHER_IS_BETTER else change
+        if worse > tolerance:
+            regressions.append(f"{key}: {baseline[key]} -> {results[key]} ({worse:+.0%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline arena pipeline benchmark.")
+    parser.add_argument("--adjudications", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Fake server median latency")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-500", type=float, default=0.0)
+    parser.add_argument("--pages", type=int, default=150, help="Pages per synthetic PDF")
+    parser.add_argument("--files", type=int, default=2, help="Synthetic PDFs to extract")
+    parser.add_argument("--base-url", default=None, help="Use an already running fake server instead")
+    parser.add_argument("--save", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Compare against a saved results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression fraction")
+    args = parser.parse_args()
+
+    # Keep the run hermetic: no cache hits, no span log, no real limits
+    os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+    os.environ["ARENA_CACHE_BYPASS"] = "1"
+    os.environ["ARENA_TELEMETRY"] = "0"
+    os.environ.setdefault("ARENA_RPM", "1000000")
+    os.environ.setdefault("ARENA_TPM", "1000000000")
+
+    server = None
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    else:
+        server = FakeOpenAIServer(FakeConfig(args.latency_ms, error_429=args.error_429, error_500=args.error_500)).start()
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+    try:
+        print(f"⚙️  {args.adjudications} adjudications @ concurrency {args.concurrency} via {os.environ['OPENAI_BASE_URL']}")
+        results = asyncio.run(_bench_adjudications(args.adjudications, args.concurrency))
+        print(f"📄 Extracting {args.files} x {args.pages}-page synthetic PDFs")
+        results.update(_bench_extraction(args.pages, args.files))
+    finally:
+        if server:
+            server.stop()
+
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ Performance regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("✅ Within tolerance of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Cold-start benchmark: what a fresh app process pays before it is useful.
+
+1. Import time of the modules app.py loads (fresh interpreter per run,
+   -X importtime), and which heavy libraries were pulled in eagerly.
+2. Latency of the first select_target / fight in a fresh process against
+   the offline fake server, versus warm calls, with and without
+   clients.prewarm(). Also counts TCP connections the server accepted, so
+   keep-alive reuse shows up as connections < requests.
+
+    python -m bench.bench_startup
+    python -m bench.bench_startup --runs 5 --latency-ms 50 --save bench/startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from bench.fake_openai import FakeConfig, FakeOpenAIServer
+
+# Everything app.py imports before its first st.* call
+APP_IMPORTS = (
+    "dotenv", "streamlit",
+    "src.arena", "src.selector", "src.schemas", "src.jobs", "src.extraction", "src.dedup",
+    "src.doc_store", "src.scheduler", "src.telemetry", "src.context", "src.messages",
+    "src.history", "src.clients",
+)
+# Libraries that should only load when a feature needs them
+HEAVY_MODULES = ("openai", "anthropic", "google.generativeai", "numpy", "pandas", "pyarrow", "fitz", "tiktoken")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _median(values: list) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def _child_env(**extra) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT, **extra)
+    env.setdefault("OPENAI_API_KEY", "fake-key")
+    return env
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """
+    Cumulative microseconds per module from -X importtime output.
+    Top-level entries (no indent) are what the -c imports cost.
+    """
+    modules, top_level = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        modules[name.strip()] = int(cumulative)
+        if not name[1:].startswith(" "):
+            top_level += int(cumulative)
+    return {"modules": modules, "total_us": top_level}
+
+
+def bench_imports(runs: int, top: int) -> dict:
+    totals, walls, last = [], [], None
+    code = f"import {', '.join(APP_IMPORTS)}"
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                              env=_child_env(), capture_output=True, text=True)
+        walls.append(time.perf_counter() - started)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        last = _parse_importtime(proc.stderr)
+        totals.append(last["total_us"] / 1000.0)
+
+    baseline = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], cwd=ROOT, env=_child_env(), check=True)
+        baseline.append(time.perf_counter() - started)
+
+    heaviest = sorted(last["modules"].items(), key=lambda kv: -kv[1])
+    heaviest = [(name, us) for name, us in heaviest if name.startswith("src.") or "." not in name][:top]
+    return {
+        "import_ms": round(_median(totals), 1),
+        "process_start_ms": round((_median(walls) - _median(baseline)) * 1000, 1),
+        "heavy_loaded_at_import": [m for m in HEAVY_MODULES if m in last["modules"]],
+        "heaviest_imports_ms": {name: round(us / 1000.0, 1) for name, us in heaviest},
+    }
+
+
+def _child_first_call(calls: int, prewarm: bool, idle: float):
+    """
+    Runs inside a fresh interpreter; prints one JSON line.
+    """
+    from bench.bench_pipeline import SCENARIO
+
+    started = time.perf_counter()
+    from src.arena import Arena
+    from src.selector import Selector
+    from src.cache import ResponseCache
+    from src import clients
+    import_ms = (time.perf_counter() - started) * 1000
+
+    if prewarm:
+        # What app.py does after the first render, then the user reads the page
+        clients.prewarm()
+        time.sleep(idle)
+
+    no_cache = ResponseCache(enabled=False)
+    selector, arena = Selector(cache=no_cache), Arena(cache=no_cache)
+
+    def timed(fn) -> float:
+        t = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t) * 1000
+
+    select_ms = [timed(lambda: selector.select_target(SCENARIO)) for _ in range(calls + 1)]
+    fight_ms = [timed(lambda: arena.fight(SCENARIO, target="ACME")) for _ in range(calls + 1)]
+    print(json.dumps({
+        "import_ms": round(import_ms, 1),
+        "first_select_ms": round(select_ms[0], 1),
+        "warm_select_ms": round(_median(select_ms[1:]), 1),
+        "first_fight_ms": round(fight_ms[0], 1),
+        "warm_fight_ms": round(_median(fight_ms[1:]), 1),
+    }))
+
+
+def bench_first_call(base_url: str, calls: int, prewarm: bool, idle: float, config: FakeConfig) -> dict:
+    before = (config.requests, config.connections) if config else (0, 0)
+    args = [sys.executable, "-m", "bench.bench_startup", "--child", "--calls", str(calls), "--idle", str(idle)]
+    if prewarm:
+        args.append("--prewarm")
+    proc = subprocess.run(args, cwd=ROOT, capture_output=True, text=True, env=_child_env(
+        OPENAI_BASE_URL=base_url, ARENA_CACHE_BYPASS="1", ARENA_TELEMETRY="0",
+        ARENA_RPM="1000000", ARENA_TPM="1000000000",
+    ))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip())
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["first_select_overhead_ms"] = round(result["first_select_ms"] - result["warm_select_ms"], 1)
+    result["first_fight_overhead_ms"] = round(result["first_fight_ms"] - result["warm_fight_ms"], 1)
+    if config:
+        result["requests"] = config.requests - before[0]
+        result["connections"] = config.connections - before[1]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="App cold-start and first-call latency benchmark.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters for the import timing")
+    parser.add_argument("--top", type=int, default=12, help="Heaviest imports to list")
+    parser.add_argument("--calls", type=int, default=3, help="Warm calls after the first one")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake server median latency")
+    parser.add_argument("--idle", type=float, default=2.0, help="Seconds between prewarm() and the first call")
+    parser.add_argument("--base-url", default=None, help="Use an already running fake server instead")
+    parser.add_argument("--save", default=None, help="Write results JSON here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--prewarm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child_first_call(args.calls, args.prewarm, args.idle)
+        return
+
+    print(f"📦 Import timing over {args.runs} fresh interpreters")
+    results = {"imports": bench_imports(args.runs, args.top)}
+
+    server = config = None
+    base_url = args.base_url
+    if not base_url:
+        config = FakeConfig(args.latency_ms, latency_sigma=0.0)
+        server = FakeOpenAIServer(config).start()
+        base_url = server.base_url
+    try:
+        print(f"⚡ First-call latency via {base_url}")
+        results["cold"] = bench_first_call(base_url, args.calls, False, args.idle, config)
+        results["prewarmed"] = bench_first_call(base_url, args.calls, True, args.idle, config)
+    finally:
+        if server:
+            server.stop()
+
+    print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
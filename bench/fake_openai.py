@@ -0,0 +1,292 @@
+"""
+Offline OpenAI-compatible stub for benchmarks and load tests.
+
+Serves POST /v1/chat/completions with schema-valid structured outputs
+generated from the request's response_format JSON schema, so PMAnalysis,
+TradeTarget and CIOVerdict all round-trip through the real SDK parsers.
+Latency is lognormal, 429/500s can be injected, and stream=true returns
+SSE chunks. Point the app at it with OPENAI_BASE_URL=http://host:port/v1.
+
+    python -m bench.fake_openai --port 8089 --latency-ms 800 --error-429 0.05
+"""
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "margin revenue guidance catalyst multiple drawdown factor exposure "
+    "positioning crowding cash flow backlog pricing churn capex leverage "
+    "beta liquidity estimate revision consensus downside upside"
+).split()
+
+
+class FakeConfig:
+    def __init__(self, latency_ms: float = 500.0, latency_sigma: float = 0.35,
+                 error_429: float = 0.0, error_500: float = 0.0,
+                 text_words: int = 120, chunk_chars: int = 24, chunk_delay_ms: float = 5.0,
+                 seed: int = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.text_words = text_words
+        self.chunk_chars = chunk_chars
+        self.chunk_delay_ms = chunk_delay_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        # Accepted TCP connections; fewer than requests means keep-alive reuse
+        self.connections = 0
+        # Prompt prefixes already "cached", for prompt_tokens_details.cached_tokens
+        self.seen_prefixes = set()
+
+    def sample_latency(self) -> float:
+        # Lognormal around the configured median
+        with self.lock:
+            return self.latency_ms / 1000.0 * math.exp(self.rng.gauss(0.0, self.latency_sigma))
+
+    def roll(self) -> int:
+        """
+        Returns an injected HTTP status (429/500) or 200.
+        """
+        with self.lock:
+            self.requests += 1
+            x = self.rng.random()
+        if x < self.error_429:
+            return 429
+        if x < self.error_429 + self.error_500:
+            return 500
+        return 200
+
+
+def _resolve(node: dict, defs: dict) -> dict:
+    ref = node.get("$ref")
+    if ref:
+        return defs[ref.split("/")[-1]]
+    return node
+
+def fake_value(node: dict, defs: dict, rng: random.Random, text_words: int, name: str = ""):
+    """
+    Generates a value that validates against a (pydantic-emitted) JSON schema node.
+    """
+    node = _resolve(node, defs)
+    if "enum" in node:
+        return rng.choice(node["enum"])
+    if "const" in node:
+        return node["const"]
+    if "anyOf" in node:
+        options = [o for o in node["anyOf"] if o.get("type") != "null"] or node["anyOf"]
+        return fake_value(options[0], defs, rng, text_words, name)
+
+    kind = node.get("type")
+    if kind == "object":
+        return {
+            key: fake_value(child, defs, rng, text_words, key)
+            for key, child in node.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [fake_value(node.get("items", {}), defs, rng, max(8, text_words // 6), name) for _ in range(3)]
+    if kind == "integer":
+        description = node.get("description", "")
+        return rng.randint(1, 100) if "100" in description else rng.randint(1, 5)
+    if kind == "number":
+        return round(rng.uniform(0.5, 10.0), 1)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if "ticker" in name:
+        return rng.choice(["NVDA", "XBI", "TLT", "SMH", "TSLA"])
+    return " ".join(rng.choice(_WORDS) for _ in range(text_words))
+
+
+def fake_payload(body: dict, config: FakeConfig) -> str:
+    fmt = body.get("response_format") or {}
+    schema = (fmt.get("json_schema") or {}).get("schema")
+    if not schema:
+        return "ok"
+    with config.lock:
+        seed = config.rng.random()
+    value = fake_value(schema, schema.get("$defs", {}), random.Random(seed), config.text_words)
+    return json.dumps(value)
+
+
+def _prompt_tokens(body: dict) -> int:
+    text = "".join(str(m.get("content", "")) for m in body.get("messages", []))
+    return max(1, len(text) // 4)
+
+def _cached_tokens(body: dict, config: FakeConfig) -> int:
+    """
+    Mimics OpenAI prefix caching: a prefix (all but the last message) of
+    1024+ tokens seen before is reported cached in 128-token increments.
+    """
+    prefix = body.get("messages", [])[:-1]
+    tokens = _prompt_tokens({"messages": prefix}) if prefix else 0
+    if tokens < 1024:
+        return 0
+    key = json.dumps(prefix, sort_keys=True)
+    with config.lock:
+        hit = key in config.seen_prefixes
+        config.seen_prefixes.add(key)
+    return tokens // 128 * 128 if hit else 0
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    config: FakeConfig = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.config.lock:
+            self.config.connections += 1
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}", "type": "not_found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        config = self.config
+
+        status = config.roll()
+        time.sleep(config.sample_latency())
+        if status == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_exceeded"}},
+                            headers={"retry-after": "0.2"})
+            return
+        if status == 500:
+            self._send_json(500, {"error": {"message": "Internal error (injected)", "type": "server_error"}})
+            return
+
+        n = int(body.get("n") or 1)
+        contents = [fake_payload(body, config) for _ in range(n)]
+        prompt_tokens = _prompt_tokens(body)
+        completion_tokens = sum(max(1, len(c) // 4) for c in contents)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": _cached_tokens(body, config)},
+        }
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "system_fingerprint": "fake",
+        }
+
+        if body.get("stream"):
+            self._stream(base, contents, usage, body)
+            return
+
+        self._send_json(200, {
+            **base,
+            "object": "chat.completion",
+            "choices": [
+                {"index": i, "finish_reason": "stop", "logprobs": None,
+                 "message": {"role": "assistant", "content": c, "refusal": None}}
+                for i, c in enumerate(contents)
+            ],
+            "usage": usage,
+        })
+
+    def _stream(self, base: dict, contents: list, usage: dict, body: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def emit(chunk: dict):
+            self.wfile.write(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', **chunk})}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        size = self.config.chunk_chars
+        delay = self.config.chunk_delay_ms / 1000.0
+        for index, content in enumerate(contents):
+            emit({"choices": [{"index": index, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+            for start in range(0, len(content), size):
+                emit({"choices": [{"index": index, "delta": {"content": content[start:start + size]}, "finish_reason": None}]})
+                if delay:
+                    time.sleep(delay)
+            emit({"choices": [{"index": index, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            emit({"choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class FakeOpenAIServer:
+    """
+    In-process server on a background thread; port=0 picks a free port.
+    """
+
+    def __init__(self, config: FakeConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeConfig()
+        handler = type("BoundHandler", (FakeOpenAIHandler,), {"config": self.config})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Median response latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.35, help="Lognormal sigma of latency")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--text-words", type=int, default=120, help="Words per generated string field")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeConfig(args.latency_ms, args.latency_sigma, args.error_429, args.error_500,
+                        args.text_words, seed=args.seed)
+    server = FakeOpenAIServer(config, args.host, args.port)
+    print(f"🧪 Fake OpenAI listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.evaluation import (
+    RubricEvaluator, items_from_history, items_from_results,
+    scores_frame, dimension_table, variant_summary, compare_variants, DEFAULT_EVAL_CONCURRENCY,
+)
+from src.history import get_default_history
+from src.llm import cache_model
+import argparse
+import time
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grade stored Long/Short pairs against the rubric (src/prompts/rubric.md).")
+    parser.add_argument("--results", action="append", default=[], help="Batch results JSONL; one file per variant (repeatable)")
+    parser.add_argument("--history", action="store_true", help="Grade pairs from the verdict history")
+    parser.add_argument("--ticker", default=None, help="History: only this ticker")
+    parser.add_argument("--days", type=float, default=None, help="History: only the last N days")
+    parser.add_argument("--limit", type=int, default=None, help="History: at most N pairs, newest first")
+    parser.add_argument("--variant-by", choices=["model", "source"], default="model", help="History: how pairs are grouped into variants")
+    parser.add_argument("--baseline", default=None, help="Variant the others are compared against, paired by scenario")
+    parser.add_argument("--model", default=None, help="Grader model (default ARENA_GRADER_MODEL or the arena default)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_EVAL_CONCURRENCY, help="Grader calls in flight at once")
+    parser.add_argument("--regrade", action="store_true", help="Ignore cached grades and grade every pair again")
+    parser.add_argument("--output", default=None, help="Write per-dimension scores here (.csv or .parquet)")
+    args = parser.parse_args()
+
+    items = []
+    for path in args.results:
+        items.extend(items_from_results(path))
+    if args.history or not args.results:
+        start = time.time() - args.days * 86400 if args.days else None
+        items.extend(items_from_history(get_default_history(), ticker=args.ticker, start=start,
+                                        variant_by=args.variant_by, limit=args.limit))
+    variants = sorted({item.variant for item in items})
+    print(f"📋 {len(items)} pairs across {len(variants)} variants: {', '.join(variants)}")
+
+    evaluator = RubricEvaluator(model=args.model, concurrency=args.concurrency)
+    evaluator.refresh = args.regrade
+    print(f"🧑‍⚖️ Grader: {cache_model(evaluator.model)}")
+    run = evaluator.grade_all(items)
+
+    print("\n📊 EVALUATION SUMMARY")
+    for key, value in run.counts().items():
+        print(f"  {key}: {value}")
+    if not run.ok:
+        raise SystemExit("No pairs were graded.")
+
+    frame = scores_frame(run)
+    print("\n📐 MEAN SCORE BY DIMENSION")
+    print(dimension_table(frame).to_string())
+    print("\n🏁 VARIANTS")
+    print(variant_summary(run).to_string())
+    if args.baseline:
+        print(f"\n⚖️ VS {args.baseline} (paired by scenario)")
+        print(compare_variants(frame, args.baseline).to_string(index=False))
+
+    if args.output:
+        if args.output.endswith(".parquet"):
+            frame.to_parquet(args.output, index=False)
+        else:
+            frame.to_csv(args.output, index=False)
+        print(f"\n💾 Scores written to {args.output}")
@@ -1,4 +1,13 @@
 from src.arena import Arena
+from src.extraction import extract_files, EXTRACTION_MODES
+from src.doc_store import get_default_store
+from src.dedup import dedupe_pages
+from src.context import ContextIndex, build_query, ARENA_TOKEN_BUDGET
+from src.history import get_default_history
+from src.deadline import Deadline
+from src.debate import Debate
+from src import llm
+import argparse
 import json
 
 # A Simple Test Scenario (Tesla-style Volatility)
@@ -14,10 +23,44 @@ Macro environment: Rates are expected to stay higher for longer.
 """
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a single Long/Short duel.")
+    parser.add_argument("pdfs", nargs="*", help="Research PDFs to debate (defaults to the built-in test scenario)")
+    parser.add_argument("--ticker", default=None, help="Trading target to focus the debate on")
+    parser.add_argument("--samples", type=int, default=1, help="Ensemble mode: analyses drawn per PM in one request")
+    parser.add_argument("--rounds", type=int, default=0, help="Rebuttal rounds after the opening pitches (single-sample mode)")
+    parser.add_argument("--extract-mode", choices=EXTRACTION_MODES, default=None,
+                        help="PDF text extraction: 'tables' (default; delimited tables, [p. N] tags) or 'layout'")
+    parser.add_argument("--sla", type=float, default=None, help="End-to-end deadline in seconds for extraction + duel")
+    args = parser.parse_args()
+
+    stages = ("extract", "fight", "debate") if args.rounds else ("extract", "fight")
+    deadline = Deadline(args.sla, stages) if args.sla else None
+
+    scenario = TEST_SCENARIO
+    digests = []
+    if args.pdfs:
+        # Previously seen PDFs are served from the document store without re-parsing
+        extraction = extract_files(args.pdfs, store=get_default_store(), mode=args.extract_mode,
+                                   deadline_seconds=deadline.budget("extract") if deadline else None)
+        print(f"📄 Extracted {extraction.pages_done} pages in {extraction.elapsed:.1f}s")
+        digests = extraction.digests
+        dedup = dedupe_pages(extraction.pages)
+        print(f"🧹 Removed {dedup.chars_removed:,} duplicate/boilerplate characters ({dedup.removed_ratio:.0%})")
+        index = ContextIndex.from_pages(dedup.pages)
+        scenario = index.pack(build_query(args.ticker), ARENA_TOKEN_BUDGET)
+
     arena = Arena()
     
     # Run the Duel
-    long_res, short_res = arena.fight(TEST_SCENARIO)
+    ensembles = debate = None
+    if args.samples > 1:
+        ensembles = arena.fight_ensemble(scenario, args.samples, target=args.ticker, deadline=deadline)
+        long_res, short_res = (e.consensus if e else None for e in ensembles)
+    elif args.rounds:
+        long_pos, short_pos, debate = Debate(arena, args.rounds).fight(scenario, target=args.ticker, deadline=deadline)
+        long_res, short_res = (getattr(p, "consensus", p) for p in (long_pos, short_pos))
+    else:
+        long_res, short_res = arena.fight(scenario, target=args.ticker, deadline=deadline)
     
     # Print Results
     if long_res and short_res:
@@ -31,8 +74,20 @@ if __name__ == "__main__":
         
         # Save detailed JSON for debugging/grading
         with open("data/scenarios/duel_result.json", "w") as f:
-            json.dump({
+            result = {
                 "long": long_res.model_dump(), 
                 "short": short_res.model_dump()
-            }, f, indent=2)
-            print("\n💾 Full detailed analysis saved to data/scenarios/duel_result.json")
\ No newline at end of file
+            }
+            if ensembles:
+                result["ensemble"] = {"long": ensembles[0].to_dict(), "short": ensembles[1].to_dict()}
+            if debate:
+                result["debate"] = debate.to_dict()
+            json.dump(result, f, indent=2)
+            print("\n💾 Full detailed analysis saved to data/scenarios/duel_result.json")
+
+        # Keep every run, not just the last one (no CIO verdict in a plain duel)
+        history_id = get_default_history().record(
+            args.ticker or "UNKNOWN", long_res, short_res, None,
+            doc_hashes=digests, model_ids=llm.model_ids(deadline, ("fight",)), source="main",
+        )
+        print(f"🗂️ Recorded in verdict history as #{history_id}")
@@ -1,63 +1,256 @@
-import os
-from openai import OpenAI
+import asyncio
+from typing import TYPE_CHECKING, NamedTuple
 from src.schemas import PMAnalysis
+from src.ensemble import PMEnsemble, aggregate
+from src.clients import get_client, get_async_client, run_sync
+from src.deadline import Deadline
+from src.context import count_tokens, pack_text
+from src.cache import ResponseCache, get_default_cache
+from src import llm
+from src.messages import pm_messages
+from src import telemetry
+from src.scheduler import INTERACTIVE
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Wall-clock ceiling for a single PM call before it is cancelled
+AGENT_TIMEOUT_SECONDS = 180
+
+class FightPlan(NamedTuple):
+    # What both PMs are sent: the (possibly packed) enriched document,
+    # the per-call timeout and the model. Rebuttal rounds reuse it.
+    document: str
+    timeout: float
+    model: str
 
 class Arena:
-    def __init__(self):
-        # Ensure your API Key is set in your environment
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    def _load_prompt(self, filename: str) -> str:
-        # Looks for prompts in the src/prompts folder
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        path = os.path.join(base_dir, "prompts", filename)
-        
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Prompt file not found: {path}")
-            
-        with open(path, "r") as f:
-            return f.read()
+    def __init__(self, agent_timeout: float = AGENT_TIMEOUT_SECONDS, cache: ResponseCache = None):
+        self.agent_timeout = agent_timeout
+        self.cache = cache if cache is not None else get_default_cache()
+        # When True, skip cached answers (fresh answers are still stored)
+        self.bypass_cache = False
+        # Scheduler priority class; batch runs set scheduler.BATCH
+        self.priority = INTERACTIVE
+
+    @property
+    def client(self):
+        # Shared pooled client (src.clients); reads OPENAI_API_KEY on first use
+        return get_client()
+
+    def _build_messages(self, role: str, scenario: str) -> list:
+        # Shared document first, role mandate last (see messages.pm_messages)
+        return pm_messages(role, scenario)
+
+    def _enrich_scenario(self, scenario: str, target: str = None) -> str:
+        # We inject the Ticker into the prompt context dynamically
+        context_enrichment = ""
+        if target:
+            context_enrichment = f"\n\n🚨 TRADING TARGET: {target}\nFocus your thesis specifically on {target} as the vehicle to express this view.\n"
+        return context_enrichment + scenario
 
     def run_agent(self, role: str, scenario: str) -> PMAnalysis:
         """
         Runs a single agent (Long or Short) against the scenario.
         """
         print(f"🤖 Activating {role}...")
-        
-        # Select the correct system prompt file
-        prompt_file = "long_pm.md" if role == "Long" else "short_pm.md"
-        system_prompt = self._load_prompt(prompt_file)
+        messages = self._build_messages(role, scenario)
+
+        try:
+            with telemetry.span(f"pm.{role}"):
+                return llm.parse(
+                    self.client, llm.DEFAULT_MODEL, messages, PMAnalysis,
+                    cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+                )
+        except Exception as e:
+            print(f"❌ Error running {role}: {e}")
+            return None
+
+    def _async_client(self) -> "AsyncOpenAI":
+        # One pooled client per event loop; sync fight() calls all run on
+        # the shared loop, so they reuse its warm connections.
+        return get_async_client()
+
+    async def arun_agent(self, role: str, scenario: str, timeout: float = None, client: "AsyncOpenAI" = None,
+                         model: str = None) -> PMAnalysis:
+        """
+        Async variant of run_agent. Returns None on error or when the agent
+        exceeds its timeout (the in-flight request is cancelled).
+        """
+        print(f"🤖 Activating {role}...")
+        messages = self._build_messages(role, scenario)
+        timeout = self.agent_timeout if timeout is None else timeout
+        client = client or self._async_client()
+
+        try:
+            with telemetry.span(f"pm.{role}"):
+                return await asyncio.wait_for(
+                    llm.aparse(
+                        client, model or llm.DEFAULT_MODEL, messages, PMAnalysis,
+                        cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+                    ),
+                    timeout=timeout,
+                )
+        except asyncio.TimeoutError:
+            print(f"⏱️ {role} timed out after {timeout}s")
+            return None
+        except Exception as e:
+            print(f"❌ Error running {role}: {e}")
+            return None
+
+    def plan_fight(self, scenario: str, target: str = None, timeout: float = None,
+                   deadline: Deadline = None) -> FightPlan:
+        """
+        FightPlan for one fight. Under a deadline the fight gets its share
+        of the time left; a short share means the fallback model and a
+        proportionally smaller relevance-packed context. Callers that
+        continue on the same document (src.debate) plan once and pass the
+        plan to both the fight and the rounds.
+        """
+        model = llm.DEFAULT_MODEL
+        if deadline is not None:
+            plan = deadline.plan("fight", model)
+            if plan.context_scale < 1.0:
+                scenario = pack_text(scenario, max(1, int(count_tokens(scenario) * plan.context_scale)), ticker=target)
+            timeout = plan.seconds if timeout is None else min(timeout, plan.seconds)
+            model = plan.model
+        return FightPlan(self._enrich_scenario(scenario, target), timeout, model)
+
+    async def afight(self, scenario: str, target: str = None, timeout: float = None, client: "AsyncOpenAI" = None,
+                     deadline: Deadline = None, plan: FightPlan = None):
+        """
+        Runs both PMs concurrently. Each side fails independently, so a
+        timeout or error on one side still returns the other's analysis.
+        Pass a client to share one connection pool across many duels, and
+        a plan (plan_fight) to reuse one already made for this document.
+        """
+        client = client or self._async_client()
+        full_scenario, timeout, model = plan or self.plan_fight(scenario, target, timeout, deadline)
+
+        print("\n🥊 --- STARTING DUEL --- 🥊\n")
+
+        with telemetry.span("fight", model=model):
+            long_output, short_output = await asyncio.gather(
+                self.arun_agent("Long", full_scenario, timeout=timeout, client=client, model=model),
+                self.arun_agent("Short", full_scenario, timeout=timeout, client=client, model=model),
+            )
+        return long_output, short_output
+
+    async def arun_ensemble(self, role: str, scenario: str, samples: int, timeout: float = None,
+                            client: "AsyncOpenAI" = None, model: str = None) -> PMEnsemble:
+        """
+        Self-consistency mode: draws `samples` analyses in one request and
+        aggregates them (median sizing, dispersion, clustered drivers).
+        Returns None on error or timeout, like arun_agent.
+        """
+        print(f"🤖 Activating {role} (ensemble of {samples})...")
+        messages = self._build_messages(role, scenario)
+        timeout = self.agent_timeout if timeout is None else timeout
+        client = client or self._async_client()
 
         try:
-            completion = self.client.beta.chat.completions.parse(
-                model="gpt-4o-2024-08-06",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Here is the market scenario:\n\n{scenario}"}
-                ],
-                response_format=PMAnalysis,
+            with telemetry.span(f"pm.{role}", samples=samples):
+                analyses = await asyncio.wait_for(
+                    llm.aparse_n(
+                        client, model or llm.DEFAULT_MODEL, messages, PMAnalysis, samples,
+                        cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+                    ),
+                    timeout=timeout,
+                )
+            return aggregate(analyses)
+        except asyncio.TimeoutError:
+            print(f"⏱️ {role} timed out after {timeout}s")
+            return None
+        except Exception as e:
+            print(f"❌ Error running {role}: {e}")
+            return None
+
+    async def afight_ensemble(self, scenario: str, samples: int, target: str = None, timeout: float = None,
+                              client: "AsyncOpenAI" = None, deadline: Deadline = None, plan: FightPlan = None):
+        """
+        afight() in ensemble mode; returns (PMEnsemble, PMEnsemble).
+        """
+        client = client or self._async_client()
+        full_scenario, timeout, model = plan or self.plan_fight(scenario, target, timeout, deadline)
+
+        print(f"\n🥊 --- STARTING DUEL (ENSEMBLE x{samples}) --- 🥊\n")
+        with telemetry.span("fight", model=model):
+            long_output, short_output = await asyncio.gather(
+                self.arun_ensemble("Long", full_scenario, samples, timeout=timeout, client=client, model=model),
+                self.arun_ensemble("Short", full_scenario, samples, timeout=timeout, client=client, model=model),
             )
-            return completion.choices[0].message.parsed
+        return long_output, short_output
+
+    async def arun_agent_stream(self, role: str, scenario: str, on_partial, timeout: float = None,
+                                client: "AsyncOpenAI" = None, model: str = None) -> PMAnalysis:
+        """
+        Streaming variant of arun_agent. on_partial(role, partial_dict) gets
+        the growing analytical_process / thesis_summary as tokens arrive.
+        """
+        print(f"🤖 Activating {role} (streaming)...")
+        messages = self._build_messages(role, scenario)
+        timeout = self.agent_timeout if timeout is None else timeout
+        client = client or self._async_client()
+
+        try:
+            with telemetry.span(f"pm.{role}"):
+                return await asyncio.wait_for(
+                    llm.astream_parse(
+                        client, model or llm.DEFAULT_MODEL, messages, PMAnalysis,
+                        on_partial=lambda partial: on_partial(role, partial),
+                        cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+                    ),
+                    timeout=timeout,
+                )
+        except asyncio.TimeoutError:
+            print(f"⏱️ {role} timed out after {timeout}s")
+            return None
         except Exception as e:
             print(f"❌ Error running {role}: {e}")
             return None
 
-    def fight(self, scenario: str, target: str = None):
+    async def afight_stream(self, scenario: str, on_partial, target: str = None, timeout: float = None,
+                            client: "AsyncOpenAI" = None, deadline: Deadline = None, plan: FightPlan = None):
         """
-        Runs the duel. 
+        afight() with both PMs streaming their partial analyses.
+        """
+        client = client or self._async_client()
+        full_scenario, timeout, model = plan or self.plan_fight(scenario, target, timeout, deadline)
+
+        print("\n🥊 --- STARTING DUEL (STREAMING) --- 🥊\n")
+        with telemetry.span("fight", model=model):
+            long_output, short_output = await asyncio.gather(
+                self.arun_agent_stream("Long", full_scenario, on_partial, timeout=timeout, client=client, model=model),
+                self.arun_agent_stream("Short", full_scenario, on_partial, timeout=timeout, client=client, model=model),
+            )
+        return long_output, short_output
+
+    def fight_stream(self, scenario: str, on_partial, target: str = None, timeout: float = None,
+                     deadline: Deadline = None, plan: FightPlan = None):
+        """
+        Sync entry point for fight with streaming. Callbacks run on the
+        shared event loop thread (src.clients), so on_partial must be
+        thread-safe, e.g. a job reporter rather than a Streamlit widget.
+        """
+        return run_sync(self.afight_stream(scenario, on_partial, target=target, timeout=timeout, deadline=deadline,
+                                          plan=plan))
+
+    def fight(self, scenario: str, target: str = None, timeout: float = None, deadline: Deadline = None,
+              plan: FightPlan = None):
+        """
+        Runs the duel.
         target: The specific Ticker (e.g. 'XBI') to focus the debate on.
+        Sync entry point for app.py / main.py; both PMs run concurrently.
+        deadline: request-level budget (see src.deadline); the fight takes
+        its share and degrades when that share is short.
         """
-        print("\n🥊 --- STARTING DUEL --- 🥊\n")
-        
-        # We inject the Ticker into the prompt context dynamically
-        context_enrichment = ""
-        if target:
-            context_enrichment = f"\n\n🚨 TRADING TARGET: {target}\nFocus your thesis specifically on {target} as the vehicle to express this view.\n"
-        
-        # Pass this enriched scenario to the agents
-        full_scenario = context_enrichment + scenario
-        
-        long_output = self.run_agent("Long", full_scenario)
-        short_output = self.run_agent("Short", full_scenario)
-        
-        return long_output, short_output
\ No newline at end of file
+        return run_sync(self.afight(scenario, target=target, timeout=timeout, deadline=deadline, plan=plan))
+
+    def fight_ensemble(self, scenario: str, samples: int, target: str = None, timeout: float = None,
+                       deadline: Deadline = None, plan: FightPlan = None):
+        """
+        Sync entry point for afight_ensemble().
+        """
+        return run_sync(self.afight_ensemble(scenario, samples, target=target, timeout=timeout, deadline=deadline,
+                                            plan=plan))
+
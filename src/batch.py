@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional
+
+from src.arena import Arena
+from src.judge import Judge
+from src.selector import Selector
+from src.schemas import PMAnalysis, TradeTarget, CIOVerdict
+from src.extraction import extract_files, store_key
+from src.doc_store import DocumentStore, get_default_store
+from src.dedup import dedupe_pages
+from src import llm
+from src import telemetry
+from src.history import VerdictHistory, get_default_history
+from src.scheduler import BATCH, get_default_scheduler
+from src.context import ContextIndex, build_query, SELECTOR_TOKEN_BUDGET, ARENA_TOKEN_BUDGET
+from src.clients import get_async_client
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+DEFAULT_CHECKPOINT_DIR = os.path.join("data", "batch", "checkpoints")
+
+@dataclass
+class ResearchPack:
+    pack_id: str
+    files: List[str]
+    ticker: Optional[str] = None
+
+
+def _safe_id(raw: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", raw).strip("_") or "pack"
+
+def discover_packs(source: str) -> List[ResearchPack]:
+    """
+    A directory yields one pack per top-level PDF plus one per
+    subdirectory of PDFs. A .jsonl manifest has one pack per line:
+    {"id": "...", "files": ["a.pdf", ...], "ticker": "XBI"} with paths
+    relative to the manifest.
+    """
+    packs = []
+    if os.path.isdir(source):
+        for entry in sorted(os.listdir(source)):
+            path = os.path.join(source, entry)
+            if os.path.isfile(path) and entry.lower().endswith(".pdf"):
+                packs.append(ResearchPack(_safe_id(os.path.splitext(entry)[0]), [path]))
+            elif os.path.isdir(path):
+                pdfs = sorted(
+                    os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(".pdf")
+                )
+                if pdfs:
+                    packs.append(ResearchPack(_safe_id(entry), pdfs))
+        return packs
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, "r") as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            spec = json.loads(line)
+            files = [p if os.path.isabs(p) else os.path.join(base_dir, p) for p in spec["files"]]
+            pack_id = _safe_id(str(spec.get("id") or f"line{line_num}"))
+            packs.append(ResearchPack(pack_id, files, spec.get("ticker")))
+    return packs
+
+
+class BatchRunner:
+    """
+    Drives research packs through extract -> select -> fight -> judge.
+
+    Every pack runs as its own pipeline, so one pack's judge call overlaps
+    another's extraction. Model stages share a concurrency limit; PDF
+    extraction has its own. Each finished stage is checkpointed per pack, so
+    rerunning after a crash resumes at the first unfinished stage. Results
+    are appended to a JSONL file as packs finish; a pack that failed and is
+    retried later appears again, and the last line for a pack_id wins.
+    """
+
+    def __init__(self, output_path: str, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR,
+                 concurrency: int = 8, extract_concurrency: int = 2,
+                 store: DocumentStore = None, fresh: bool = False, history: VerdictHistory = None):
+        self.output_path = output_path
+        self.checkpoint_dir = checkpoint_dir
+        self.concurrency = concurrency
+        self.extract_concurrency = extract_concurrency
+        self.store = store or get_default_store()
+        self.history = history or get_default_history()
+        self.fresh = fresh
+
+        self.selector = Selector()
+        self.arena = Arena()
+        self.judge = Judge()
+        # Overnight work yields to anyone using the app on the same host
+        for component in (self.selector, self.arena, self.judge):
+            component.priority = BATCH
+        self.selector.raise_errors = True
+
+    # --- Checkpoints -------------------------------------------------
+
+    def _checkpoint_path(self, pack_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{pack_id}.json")
+
+    def _load_checkpoint(self, pack_id: str) -> dict:
+        path = self._checkpoint_path(pack_id)
+        if self.fresh or not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, pack_id: str, state: dict):
+        path = self._checkpoint_path(pack_id)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    # --- Pipeline ----------------------------------------------------
+
+    async def _pages(self, pack: ResearchPack, state: dict) -> list:
+        digests = state.get("extract", {}).get("digests")
+        if digests:
+            pages = [self.store.get_pages(store_key(d)) for d in digests]
+            if all(p is not None for p in pages):
+                return pages
+
+        async with self._extract_slots:
+            extraction = await asyncio.to_thread(extract_files, pack.files, store=self.store)
+        if extraction.errors:
+            raise RuntimeError(f"extraction failed: {extraction.errors}")
+        state["extract"] = {"digests": extraction.digests, "pages": extraction.pages_done}
+        self._save_checkpoint(pack.pack_id, state)
+        return extraction.pages
+
+    async def _run_pack(self, pack: ResearchPack, client: "AsyncOpenAI") -> dict:
+        state = self._load_checkpoint(pack.pack_id)
+        if state.get("done"):
+            return None
+
+        started = time.monotonic()
+        record = {"pack_id": pack.pack_id, "files": pack.files}
+        try:
+            pages = await self._pages(pack, state)
+            record["digests"] = state["extract"]["digests"]
+            dedup = dedupe_pages(pages)
+            record["dedup_chars_removed"] = dedup.chars_removed
+            index = ContextIndex.from_pages(dedup.pages)
+
+            # Stage: select (skipped when the manifest pins a ticker)
+            if "select" not in state:
+                selection = None
+                if not pack.ticker:
+                    try:
+                        async with self._model_slots:
+                            selection = await self.selector.aselect_target(
+                                index.pack(build_query(), SELECTOR_TOKEN_BUDGET), client=client
+                            )
+                    except Exception as e:
+                        # Not checkpointed: the next run retries the selection
+                        raise RuntimeError(f"Selection failed: {e}") from e
+                state["select"] = selection.model_dump() if selection else None
+                self._save_checkpoint(pack.pack_id, state)
+            selection = TradeTarget.model_validate(state["select"]) if state["select"] else None
+            ticker = pack.ticker or selection.primary_ticker
+            record["ticker"] = ticker
+            record["selection"] = state["select"]
+
+            # Stage: fight
+            if "fight" not in state:
+                context = index.pack(
+                    build_query(ticker, selection.instrument_name if selection else None), ARENA_TOKEN_BUDGET
+                )
+                async with self._model_slots:
+                    long_res, short_res = await self.arena.afight(context, target=ticker, client=client)
+                if long_res is None or short_res is None:
+                    failed = "Long" if long_res is None else "Short"
+                    raise RuntimeError(f"{failed} PM returned no analysis")
+                state["fight"] = {"long": long_res.model_dump(), "short": short_res.model_dump()}
+                self._save_checkpoint(pack.pack_id, state)
+            long_res = PMAnalysis.model_validate(state["fight"]["long"])
+            short_res = PMAnalysis.model_validate(state["fight"]["short"])
+            record["long"] = state["fight"]["long"]
+            record["short"] = state["fight"]["short"]
+
+            # Stage: judge
+            if "judge" not in state:
+                async with self._model_slots:
+                    verdict = await self.judge.aadjudicate(long_res, short_res, client=client)
+                state["judge"] = verdict.model_dump()
+                self._save_checkpoint(pack.pack_id, state)
+            record["verdict"] = CIOVerdict.model_validate(state["judge"]).model_dump()
+
+            state["done"] = True
+            self._save_checkpoint(pack.pack_id, state)
+            self.history.record(
+                ticker, long_res, short_res, CIOVerdict.model_validate(state["judge"]),
+                doc_hashes=record["digests"], model_ids=llm.model_ids(), source="batch",
+            )
+        except Exception as e:
+            print(f"❌ {pack.pack_id}: {e}")
+            record["error"] = str(e)
+
+        record["elapsed"] = round(time.monotonic() - started, 3)
+        await self._emit(record)
+        return record
+
+    async def _traced_pack(self, pack: ResearchPack, client: "AsyncOpenAI") -> dict:
+        # One trace per pack so its spans share a trace_id in the span log
+        with telemetry.trace(f"batch.{pack.pack_id}"):
+            return await self._run_pack(pack, client)
+
+    async def _emit(self, record: dict):
+        async with self._output_lock:
+            with open(self.output_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+
+    async def arun(self, packs: List[ResearchPack]) -> dict:
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        self._model_slots = asyncio.Semaphore(self.concurrency)
+        self._extract_slots = asyncio.Semaphore(self.extract_concurrency)
+        self._output_lock = asyncio.Lock()
+
+        started = time.monotonic()
+        client = get_async_client()
+        records = await asyncio.gather(*(self._traced_pack(pack, client) for pack in packs))
+        elapsed = time.monotonic() - started
+
+        ran = [r for r in records if r is not None]
+        succeeded = [r for r in ran if "error" not in r]
+        documents = sum(len(r["files"]) for r in succeeded)
+        minutes = elapsed / 60 if elapsed > 0 else float("inf")
+        scheduler_metrics = get_default_scheduler().metrics()
+        return {
+            "packs_total": len(packs),
+            "packs_skipped": len(records) - len(ran),
+            "packs_succeeded": len(succeeded),
+            "packs_failed": len(ran) - len(succeeded),
+            "documents": documents,
+            "elapsed_seconds": round(elapsed, 2),
+            "packs_per_minute": round(len(succeeded) / minutes, 2),
+            "docs_per_minute": round(documents / minutes, 2),
+            "model_retries": scheduler_metrics["retries"],
+            "throttled_seconds": round(scheduler_metrics["throttled_seconds"], 1),
+        }
+
+    def run(self, packs: List[ResearchPack]) -> dict:
+        return asyncio.run(self.arun(packs))
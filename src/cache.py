@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Type
+from pydantic import BaseModel
+
+# Defaults: ~200MB / 5000 responses, entries expire after a week
+DEFAULT_CACHE_PATH = os.path.join("data", "cache", "responses.sqlite")
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for structured LLM responses.
+
+    Keys hash the model id, the full message list (system prompt + user
+    content) and the response schema, so any change to the prompt files,
+    the document or the pydantic model is a miss. Values are the parsed
+    payload as JSON and are re-validated against the schema on read.
+    Eviction is LRU by last access, bounded by entry count, total bytes
+    and a TTL.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 enabled: bool = True):
+        self.path = path or os.getenv("ARENA_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    schema TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+
+    @staticmethod
+    def make_key(model: str, messages: list, schema: Type[BaseModel], **params) -> str:
+        """
+        SHA-256 over everything that determines the response.
+        """
+        material = json.dumps({
+            "model": model,
+            "messages": messages,
+            "schema": schema.__name__,
+            "json_schema": schema.model_json_schema(),
+            "params": params,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+        try:
+            return schema.model_validate_json(payload)
+        except Exception:
+            # Schema drifted under the same name; treat as a miss
+            return None
+
+    def put(self, key: str, value: BaseModel):
+        if not self.enabled or value is None:
+            return
+        payload = value.model_dump_json()
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, schema, payload, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, type(value).__name__, payload, len(payload), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # Walk from least recently used until both limits hold
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        if not self.enabled:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"entries": 0, "bytes": 0}
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total}
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_default_cache() -> ResponseCache:
+    """
+    Process-wide cache shared by Selector, Arena and Judge.
+    Set ARENA_CACHE_BYPASS=1 to disable it entirely.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            bypass = os.getenv("ARENA_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+            _default_cache = ResponseCache(enabled=not bypass)
+        return _default_cache
@@ -0,0 +1,140 @@
+import os
+import asyncio
+import weakref
+import threading
+import contextvars
+import concurrent.futures
+
+# Connection pool shared by every Selector/Arena/Judge call. Idle
+# keep-alive sockets are held long enough to span a click-to-click gap,
+# so follow-up calls skip the TCP/TLS handshake.
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_SECONDS = 120
+
+_lock = threading.Lock()
+_sync_client = None
+# Async clients are bound to the loop they were created on
+_async_clients = weakref.WeakKeyDictionary()
+_loop = None
+_prewarm_thread = None
+
+
+def _limits():
+    # The SDK's own Limits type, whichever httpx flavour it ships with
+    from openai._constants import DEFAULT_CONNECTION_LIMITS
+    return type(DEFAULT_CONNECTION_LIMITS)(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=float(os.getenv("ARENA_KEEPALIVE_SECONDS", KEEPALIVE_SECONDS)),
+    )
+
+def get_client():
+    """
+    Process-wide sync OpenAI client. The SDK is imported on first use,
+    not when the app starts.
+    """
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            import openai
+            _sync_client = openai.OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), max_retries=0,
+                http_client=openai.DefaultHttpxClient(limits=_limits()),
+            )
+        return _sync_client
+
+def get_async_client():
+    """
+    AsyncOpenAI for the running event loop, created once per loop. On the
+    shared loop (see run_sync) that means once per process.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            import openai
+            client = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=_limits()),
+            )
+            _async_clients[loop] = client
+        return client
+
+def reset_clients():
+    """
+    Drops the cached clients, e.g. after OPENAI_API_KEY or
+    OPENAI_BASE_URL changed. In-flight calls keep their client.
+    """
+    global _sync_client
+    with _lock:
+        _sync_client = None
+        _async_clients.clear()
+
+
+def prewarm():
+    """
+    Imports the SDK, builds both shared clients and loads the tokenizer on
+    a background thread, so the first model call doesn't pay for them. Call it after the page
+    has rendered; repeat calls are no-ops.
+    """
+    global _prewarm_thread
+    with _lock:
+        if _prewarm_thread is not None:
+            return
+        _prewarm_thread = threading.Thread(target=_prewarm, name="arena-prewarm", daemon=True)
+        _prewarm_thread.start()
+
+def _prewarm():
+    async def build_async():
+        # Resource namespaces are imported lazily on first attribute access
+        get_async_client().beta.chat.completions
+
+    try:
+        from src.context import count_tokens
+        # Loads the tokenizer the scheduler and context packer use
+        count_tokens("")
+        get_client().beta.chat.completions
+        asyncio.run_coroutine_threadsafe(build_async(), shared_loop()).result()
+    except Exception as e:
+        # Missing key etc.: the first real call will raise it properly
+        print(f"⚠️ Client prewarm skipped: {e}")
+
+
+def shared_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop on a daemon thread. Sync callers run their
+    coroutines here, so async clients and their warm connections survive
+    from one fight to the next instead of dying with each asyncio.run.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="arena-loop", daemon=True).start()
+        return _loop
+
+def run_sync(coro):
+    """
+    Runs a coroutine to completion from sync code on the shared loop.
+    Context vars (e.g. the active telemetry trace) travel with it.
+    """
+    loop = shared_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        # Blocking the shared loop on itself would deadlock; use a private one
+        context = contextvars.copy_context()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(context.run, asyncio.run, coro).result()
+
+    # The task is created inside a copy of the caller's context
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
@@ -0,0 +1,212 @@
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from src.messages import ROLE_PROMPT_FILES, load_prompt
+from src.pagetags import is_page_tag
+
+# Budgets replace the old raw_text[:20000] / [:60000] character slices
+SELECTOR_TOKEN_BUDGET = 5000
+ARENA_TOKEN_BUDGET = 15000
+CHUNK_TOKENS = 400
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9$%.&'-]*")
+
+# Words in the PM prompts that say nothing about what to look for in a document
+_STOPWORDS = set("""
+a about above after again against all also an and any are as at be because been before being
+below between both but by can could did do does doing down during each even every few for from
+further had has have having how i if in into is it its itself just least less like long make
+many may might more most much must no nor not now of off on once only or other our out over own
+per same short should so some such than that the their them then there these they this those
+through to too under until up very via was way we were what when where whether which while who
+why will with within without would you your yours pm pms role respond provide given describe
+explain use used using e.g etc based clear clearly state briefly following structure section
+""".split())
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """
+    Token count under the gpt-4o tokenizer; ~4 chars/token if tiktoken is missing.
+    """
+    encoder = _encoder()
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+def tokenize(text: str) -> List[str]:
+    return [w.strip(".'-") for w in _WORD.findall(text.lower())]
+
+
+@lru_cache(maxsize=1)
+def prompt_terms() -> Dict[str, float]:
+    """
+    Thesis-relevant vocabulary from the Long/Short PM prompts, weighted by
+    how often the prompts use it (log-damped).
+    """
+    counts = Counter()
+    for filename in ROLE_PROMPT_FILES.values():
+        counts.update(
+            w for w in tokenize(load_prompt(filename))
+            if len(w) > 3 and w not in _STOPWORDS and not w.isdigit()
+        )
+    return {term: 1.0 + math.log(n) for term, n in counts.items()}
+
+def build_query(ticker: str = None, instrument_name: str = None) -> Dict[str, float]:
+    """
+    Query weights: the trading target dominates, prompt vocabulary fills in.
+    """
+    query = dict(prompt_terms())
+    if instrument_name:
+        for term in tokenize(instrument_name):
+            if term not in _STOPWORDS:
+                query[term] = query.get(term, 0.0) + 3.0
+    if ticker:
+        for term in tokenize(ticker):
+            query[term] = query.get(term, 0.0) + 6.0
+    return query
+
+
+@dataclass
+class Chunk:
+    file_index: int
+    page_num: int
+    text: str
+    tokens: int
+
+
+def _paragraphs(page_text: str, chunk_tokens: int):
+    # Layout-sorted pages often have no blank lines; fall back to single
+    # lines so one oversized "paragraph" can't swallow a whole page.
+    for para in re.split(r"\n\s*\n", page_text):
+        para = para.strip()
+        if not para:
+            continue
+        para_tokens = count_tokens(para)
+        if para_tokens <= chunk_tokens:
+            yield para, para_tokens
+            continue
+        for line in para.split("\n"):
+            line = line.strip()
+            if line:
+                yield line, count_tokens(line)
+
+
+def chunk_pages(pages: List[List[Optional[str]]], chunk_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """
+    Splits per-file page texts into paragraph-aligned chunks of roughly
+    chunk_tokens. Chunks never span pages, so each keeps its source page;
+    a page's [p. N] tag (tables extraction) is repeated on every chunk.
+    """
+    chunks = []
+    for file_index, file_pages in enumerate(pages):
+        for page_num, page_text in enumerate(file_pages):
+            if not page_text or not page_text.strip():
+                continue
+            buf, buf_tokens = [], 0
+            tag, tag_tokens = None, 0
+            for para, para_tokens in _paragraphs(page_text, chunk_tokens):
+                if buf_tokens > tag_tokens and buf_tokens + para_tokens > chunk_tokens:
+                    chunks.append(Chunk(file_index, page_num, "\n\n".join(buf), buf_tokens))
+                    buf, buf_tokens = ([tag], tag_tokens) if tag else ([], 0)
+                if not buf and is_page_tag(para):
+                    tag, tag_tokens = para, para_tokens
+                buf.append(para)
+                buf_tokens += para_tokens
+            if buf:
+                chunks.append(Chunk(file_index, page_num, "\n\n".join(buf), buf_tokens))
+    return chunks
+
+
+class ContextIndex:
+    """
+    In-process BM25 index over a document set's chunks. Build it once per
+    upload, then pack() the best chunks for each call's token budget.
+    """
+
+    def __init__(self, chunks: List[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[tuple]] = {}
+        self.lengths = []
+        for i, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk.text))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    @classmethod
+    def from_pages(cls, pages: List[List[Optional[str]]], chunk_tokens: int = CHUNK_TOKENS) -> "ContextIndex":
+        return cls(chunk_pages(pages, chunk_tokens))
+
+    @classmethod
+    def from_text(cls, text: str, chunk_tokens: int = CHUNK_TOKENS) -> "ContextIndex":
+        return cls.from_pages([[text]], chunk_tokens)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(c.tokens for c in self.chunks)
+
+    def score(self, query: Dict[str, float]) -> List[float]:
+        scores = [0.0] * len(self.chunks)
+        n = len(self.chunks)
+        for term, weight in query.items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = self.k1 * (1.0 - self.b + self.b * self.lengths[i] / (self.avg_length or 1.0))
+                scores[i] += weight * idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return scores
+
+    def pack(self, query: Dict[str, float], token_budget: int, lead_chunks: int = 1) -> str:
+        """
+        Greedily fills token_budget with the highest-scoring chunks, always
+        keeping the first lead_chunks of each file (cover pages usually name
+        the company), then emits them in original document order.
+        """
+        if self.total_tokens <= token_budget:
+            return "\n\n".join(c.text for c in self.chunks)
+
+        scores = self.score(query)
+        seen_per_file = Counter()
+        leads = []
+        for i, chunk in enumerate(self.chunks):
+            if seen_per_file[chunk.file_index] < lead_chunks:
+                leads.append(i)
+                seen_per_file[chunk.file_index] += 1
+
+        chosen, used = set(), 0
+        ranked = leads + sorted(range(len(self.chunks)), key=lambda i: scores[i], reverse=True)
+        for i in ranked:
+            if i in chosen:
+                continue
+            if used + self.chunks[i].tokens > token_budget:
+                continue
+            chosen.add(i)
+            used += self.chunks[i].tokens
+
+        return "\n\n".join(self.chunks[i].text for i in sorted(chosen))
+
+
+def pack_text(text: str, token_budget: int, ticker: str = None) -> str:
+    """
+    One-shot helper for callers holding a single string.
+    """
+    if count_tokens(text) <= token_budget:
+        return text
+    return ContextIndex.from_text(text).pack(build_query(ticker), token_budget)
@@ -0,0 +1,128 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+# End-to-end SLAs for the two interactive requests: upload (extract ->
+# select) and adjudication (fight -> judge)
+UPLOAD_SLA_SECONDS = 150.0
+ADJUDICATION_SLA_SECONDS = 120.0
+
+# Cheaper, faster model a stage drops to when its budget is short
+FALLBACK_MODEL = "gpt-4o-mini"
+
+# A stage's share of the remaining time is its weight over the weights of
+# the stages still to run, so a fast stage leaves more for the next one
+STAGE_WEIGHTS = {"extract": 4.0, "select": 1.0, "fight": 6.0, "debate": 3.0, "judge": 2.0}
+# Budget at which a stage runs at full quality (default model, full context)
+FULL_QUALITY_SECONDS = {"extract": 30.0, "select": 10.0, "fight": 45.0, "judge": 15.0}
+# Below this the selector and judge skip the model call and use their
+# fallbacks; extraction and the fight always run with what is left
+MIN_STAGE_SECONDS = {"select": 3.0, "judge": 4.0}
+# Degraded stages keep at least this share of their context
+MIN_CONTEXT_SCALE = 0.25
+# Stages whose callers pack less text when degraded (selector, arena); the
+# judge's prompt is already small, so a short budget only changes its model
+CONTEXT_STAGES = ("select", "fight")
+
+
+@dataclass
+class StagePlan:
+    """
+    What one stage may spend and how it should run. context_scale < 1
+    means pack proportionally less text; skip means use the fallback.
+    """
+    stage: str
+    seconds: float
+    model: str
+    context_scale: float = 1.0
+    skip: bool = False
+
+    @property
+    def degraded(self) -> bool:
+        return self.skip or self.context_scale < 1.0 or self.model == FALLBACK_MODEL
+
+
+class Deadline:
+    """
+    Request-level time budget passed through extraction, selection, the
+    fight and the judge. Each stage asks plan() for its slice of the time
+    left; short slices degrade in a fixed order: less context and the
+    fallback model first, then (selector, judge) no model call at all.
+    """
+
+    def __init__(self, seconds: float, stages: Sequence[str] = tuple(STAGE_WEIGHTS)):
+        self.seconds = float(seconds)
+        self.stages = list(stages)
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.seconds
+        # Human-readable notes of every degradation, for the UI and logs
+        self.degraded: List[str] = []
+        # Model each planned stage was told to call (skipped stages: none),
+        # so results record what actually ran
+        self.models: Dict[str, str] = {}
+
+    @classmethod
+    def for_upload(cls) -> "Deadline":
+        return cls(float(os.getenv("ARENA_UPLOAD_SLA_SECONDS", UPLOAD_SLA_SECONDS)), ("extract", "select"))
+
+    @classmethod
+    def for_adjudication(cls, seconds: float = None, rebuttal_rounds: int = 0) -> "Deadline":
+        seconds = seconds or float(os.getenv("ARENA_SLA_SECONDS", ADJUDICATION_SLA_SECONDS))
+        # Rebuttal rounds (src.debate) take their share between fight and judge
+        return cls(seconds, ("fight", "debate", "judge") if rebuttal_rounds else ("fight", "judge"))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def budget(self, stage: str) -> float:
+        """
+        Seconds this stage may use: remaining time split by weight across
+        this stage and the ones after it.
+        """
+        later = self.stages[self.stages.index(stage):] if stage in self.stages else [stage]
+        share = STAGE_WEIGHTS[stage] / sum(STAGE_WEIGHTS[s] for s in later)
+        return self.remaining() * share
+
+    def plan(self, stage: str, model: str = None) -> StagePlan:
+        """
+        How a stage with a full-quality time (FULL_QUALITY_SECONDS) should
+        run. The rebuttal debate has none: it reuses the fight's plan and
+        checks budget("debate") before each round.
+        """
+        if stage not in FULL_QUALITY_SECONDS:
+            raise ValueError(f"No full-quality time for stage {stage!r}; use budget() instead")
+        seconds = self.budget(stage)
+        full = FULL_QUALITY_SECONDS[stage]
+        if seconds >= full:
+            self.models[stage] = model
+            return StagePlan(stage, seconds, model)
+        if seconds < MIN_STAGE_SECONDS.get(stage, 0.0):
+            self.note(stage, f"skipped with {seconds:.1f}s left")
+            return StagePlan(stage, seconds, model, skip=True)
+        self.models[stage] = FALLBACK_MODEL
+        if stage not in CONTEXT_STAGES:
+            self.note(stage, f"{seconds:.0f}s budget: {FALLBACK_MODEL}")
+            return StagePlan(stage, seconds, FALLBACK_MODEL)
+        scale = max(MIN_CONTEXT_SCALE, seconds / full)
+        self.note(stage, f"{seconds:.0f}s budget: {FALLBACK_MODEL}, {scale:.0%} context")
+        return StagePlan(stage, seconds, FALLBACK_MODEL, context_scale=scale)
+
+    def note(self, stage: str, message: str):
+        self.degraded.append(f"{stage}: {message}")
+        print(f"⏳ Deadline: {stage} {message}")
+
+    def to_dict(self) -> dict:
+        return {
+            "sla_seconds": self.seconds,
+            "elapsed_seconds": round(self.elapsed(), 2),
+            "met": self.elapsed() <= self.seconds,
+            "degraded": list(self.degraded),
+        }
@@ -0,0 +1,355 @@
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple, TYPE_CHECKING
+
+from src.schemas import PMAnalysis, ConvictionLever, Rebuttal, LeverChange
+from src.arena import Arena, FightPlan
+from src.clients import get_async_client, run_sync
+from src.context import count_tokens
+from src.deadline import Deadline
+from src.messages import debate_messages, pm_messages
+from src import llm
+from src import telemetry
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Rebuttal rounds after the opening statements
+DEFAULT_REBUTTAL_ROUNDS = 2
+MAX_REBUTTAL_ROUNDS = 4
+# Sizing has converged when neither side moved more than this in a round
+CONVERGENCE_RISK_UNITS = 0.5
+CONVERGENCE_CONFIDENCE = 5
+# Compaction limits: what of a position / round survives into the next prompt
+STATE_THESIS_CHARS = 800
+STATE_LEVERS = 6
+STATE_POINTS = 4
+STATE_POINT_CHARS = 300
+# Don't start a round with less debate budget than this (or the last round took)
+MIN_ROUND_SECONDS = 8.0
+
+ROLES = ("Long", "Short")
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+def apply_rebuttal(analysis: PMAnalysis, rebuttal: Rebuttal) -> PMAnalysis:
+    """
+    The position after one round: revised sizing and confidence, levers
+    added / re-weighted / dropped by name. Thesis and reasoning trace stay
+    those of the opening statement.
+    """
+    levers = {lever.lever_name.strip().lower(): lever for lever in analysis.conviction_levers}
+    for change in rebuttal.lever_changes:
+        key = change.lever_name.strip().lower()
+        if change.action == "drop":
+            levers.pop(key, None)
+        else:
+            levers[key] = ConvictionLever(
+                lever_name=levers[key].lever_name if key in levers else change.lever_name.strip(),
+                impact_description=change.impact_description,
+                sensitivity_score=min(5, max(1, change.sensitivity_score)),
+            )
+    return analysis.model_copy(update={
+        "conviction_levers": list(levers.values()),
+        "confidence_score": min(100, max(1, rebuttal.revised_confidence)),
+        "risk_sizing": analysis.risk_sizing.model_copy(update={
+            "risk_units": min(10.0, max(0.0, rebuttal.revised_risk_units)),
+        }),
+    })
+
+
+@dataclass
+class SideDelta:
+    """
+    What one side changed in one round. Earlier rounds reach later prompts
+    only as these deltas, never as the raw transcript.
+    """
+    role: str
+    round: int
+    risk_units: Tuple[float, float]
+    confidence: Tuple[int, int]
+    lever_changes: List[LeverChange]
+    points: List[str]
+    concessions: List[str]
+    rationale: str
+
+    @property
+    def risk_moved(self) -> float:
+        return abs(self.risk_units[1] - self.risk_units[0])
+
+    @property
+    def confidence_moved(self) -> int:
+        return abs(self.confidence[1] - self.confidence[0])
+
+    def lever_summary(self) -> str:
+        marks = {"add": "+", "revise": "~", "drop": "-"}
+        return ", ".join(
+            f"{marks[c.action]}{c.lever_name}" + ("" if c.action == "drop" else f" ({c.sensitivity_score})")
+            for c in self.lever_changes
+        ) or "none"
+
+    def summary(self) -> str:
+        before, after = self.risk_units
+        return (f"R{self.round} {self.role}: {before:g}→{after:g} units, confidence "
+                f"{self.confidence[0]}→{self.confidence[1]}; levers {self.lever_summary()}")
+
+    def to_dict(self) -> dict:
+        return {
+            "role": self.role,
+            "round": self.round,
+            "risk_units": list(self.risk_units),
+            "confidence": list(self.confidence),
+            "lever_changes": [c.model_dump() for c in self.lever_changes],
+            "points": self.points,
+            "concessions": self.concessions,
+            "rationale": self.rationale,
+        }
+
+
+@dataclass
+class DebatePosition:
+    """
+    One side after the rebuttal rounds. `consensus` is the opening analysis
+    with every round's delta applied, so display, the verdict history and
+    heuristic_verdict treat it like a single answer (as with PMEnsemble).
+    """
+    opening: PMAnalysis
+    consensus: PMAnalysis
+    deltas: List[SideDelta] = field(default_factory=list)
+
+    @property
+    def risk_path(self) -> List[float]:
+        return [self.opening.risk_sizing.risk_units] + [d.risk_units[1] for d in self.deltas]
+
+    @property
+    def confidence_path(self) -> List[int]:
+        return [self.opening.confidence_score] + [d.confidence[1] for d in self.deltas]
+
+    def pitch_lines(self) -> List[str]:
+        """
+        Pitch for the Judge: final sizing with how it moved under rebuttal,
+        the surviving levers, and the last round's arguments and concessions.
+        """
+        final = self.consensus
+        levers = "; ".join(f"{l.lever_name} {l.sensitivity_score}" for l in final.conviction_levers[:STATE_LEVERS])
+        lines = [
+            f"Risk Units: {final.risk_sizing.risk_units} (debate path {' → '.join(f'{u:g}' for u in self.risk_path)})",
+            f"Confidence: {final.confidence_score} (debate path {' → '.join(str(c) for c in self.confidence_path)})",
+            f"Thesis: {final.thesis_summary}",
+            f"Key Drivers: {final.key_drivers}",
+            f"Conviction Levers (1-5): {levers}",
+        ]
+        if self.deltas:
+            last = self.deltas[-1]
+            lines.append(f"Final Rebuttal: {' | '.join(_clip(p, STATE_POINT_CHARS) for p in last.points[:STATE_POINTS])}")
+            conceded = [c for d in self.deltas for c in d.concessions]
+            if conceded:
+                lines.append(f"Conceded: {' | '.join(_clip(c, STATE_POINT_CHARS) for c in conceded[:STATE_POINTS])}")
+        return lines
+
+    def to_dict(self) -> dict:
+        return {
+            "risk_path": self.risk_path,
+            "confidence_path": self.confidence_path,
+            "deltas": [d.to_dict() for d in self.deltas],
+            "consensus": self.consensus.model_dump(),
+        }
+
+
+@dataclass
+class DebateResult:
+    long: Optional[DebatePosition]
+    short: Optional[DebatePosition]
+    rounds: int = 0
+    converged: bool = False
+    stop_reason: str = ""
+    # Prompt tokens per PM call by round (0 = opening), to show the state stays flat
+    round_tokens: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "converged": self.converged,
+            "stop_reason": self.stop_reason,
+            "round_tokens": self.round_tokens,
+            "long": self.long.to_dict() if self.long else None,
+            "short": self.short.to_dict() if self.short else None,
+        }
+
+
+def _position_block(analysis: PMAnalysis) -> str:
+    levers = sorted(analysis.conviction_levers, key=lambda l: -l.sensitivity_score)[:STATE_LEVERS]
+    lever_lines = "\n".join(
+        f"  - {l.lever_name} ({l.sensitivity_score}/5): {_clip(l.impact_description, 160)}" for l in levers
+    )
+    return (
+        f"Size: {analysis.risk_sizing.risk_units:g} risk units ({analysis.risk_sizing.role_in_book}), "
+        f"confidence {analysis.confidence_score}\n"
+        f"Thesis: {_clip(analysis.thesis_summary, STATE_THESIS_CHARS)}\n"
+        f"Conviction levers:\n{lever_lines or '  (none)'}"
+    )
+
+def _ledger_line(position: DebatePosition, role: str) -> str:
+    return (f"{role}: units {' → '.join(f'{u:g}' for u in position.risk_path)}; "
+            f"confidence {' → '.join(str(c) for c in position.confidence_path)}")
+
+
+class Debate:
+    """
+    Multi-round rebuttal on top of Arena's opening statements. Both PMs
+    rebut at once each round, against a compacted state: current positions,
+    the sizing ledger and only the latest round's arguments, so per-round
+    prompt size stays roughly flat and the document remains a cached
+    prefix. Stops early once both sides' sizing has converged.
+    """
+
+    def __init__(self, arena: Arena = None, rounds: int = DEFAULT_REBUTTAL_ROUNDS):
+        self.arena = arena or Arena()
+        self.rounds = min(MAX_REBUTTAL_ROUNDS, max(0, rounds))
+
+    def _state(self, role: str, positions: dict, round_no: int) -> str:
+        other = "Short" if role == "Long" else "Long"
+        mine, theirs = positions[role], positions[other]
+        if theirs.deltas:
+            latest = theirs.deltas[-1]
+            arguments = "\n".join(f"- {_clip(p, STATE_POINT_CHARS)}" for p in latest.points[:STATE_POINTS])
+            arguments += "".join(f"\n- (concedes) {_clip(c, STATE_POINT_CHARS)}" for c in latest.concessions[:2])
+        else:
+            arguments = "\n".join(f"- {_clip(d, STATE_POINT_CHARS)}" for d in theirs.consensus.key_drivers[:STATE_POINTS])
+        changes = "\n".join(
+            p.deltas[-1].summary() for p in (positions["Long"], positions["Short"]) if p.deltas
+        )
+        return (
+            f"DEBATE STATE — rebuttal round {round_no} of {self.rounds}\n\n"
+            f"YOUR CURRENT POSITION ({role} PM)\n{_position_block(mine.consensus)}\n\n"
+            f"OPPONENT'S CURRENT POSITION ({other} PM)\n{_position_block(theirs.consensus)}\n\n"
+            f"SIZING LEDGER\n{_ledger_line(positions['Long'], 'Long')}\n{_ledger_line(positions['Short'], 'Short')}\n"
+            + (f"Last round:\n{changes}\n" if changes else "")
+            + f"\nOPPONENT'S LATEST ARGUMENTS\n{arguments}\n\n"
+            f"Deliver your round {round_no} rebuttal as the {role} PM."
+        )
+
+    async def _arebut(self, role: str, messages: list, timeout: float, client: "AsyncOpenAI",
+                      model: str) -> Optional[Rebuttal]:
+        try:
+            with telemetry.span(f"rebut.{role}"):
+                return await asyncio.wait_for(
+                    llm.aparse(
+                        client, model, messages, Rebuttal,
+                        cache=self.arena.cache, refresh=self.arena.bypass_cache, priority=self.arena.priority,
+                    ),
+                    timeout=timeout,
+                )
+        except asyncio.TimeoutError:
+            print(f"⏱️ {role} rebuttal timed out after {timeout:.0f}s")
+            return None
+        except Exception as e:
+            print(f"❌ Error running {role} rebuttal: {e}")
+            return None
+
+    async def arebut(self, scenario: str, long_res: PMAnalysis, short_res: PMAnalysis, target: str = None,
+                     client: "AsyncOpenAI" = None, deadline: Deadline = None,
+                     on_round: Callable[[int, SideDelta, SideDelta], None] = None,
+                     plan: FightPlan = None) -> DebateResult:
+        """
+        Rebuttal rounds from two opening analyses (e.g. Arena.fight output).
+        plan must be the FightPlan the opening ran with, so every round
+        sends the same (possibly packed) document as a byte-identical
+        prefix, on the same model; without one, scenario/target are
+        enriched as an undeadlined fight would. A round that fails or
+        times out on either side ends the debate with the positions of the
+        last full round.
+        """
+        client = client or get_async_client()
+        document, _, model = plan or self.arena.plan_fight(scenario, target)
+        positions = {"Long": DebatePosition(long_res, long_res), "Short": DebatePosition(short_res, short_res)}
+        opening = pm_messages("Long", document)
+        result = DebateResult(positions["Long"], positions["Short"], stop_reason="max_rounds")
+        result.round_tokens.append({"round": 0, "prompt_tokens": sum(count_tokens(m["content"]) for m in opening),
+                                    "state_tokens": count_tokens(opening[-1]["content"])})
+        last_round_seconds = MIN_ROUND_SECONDS
+
+        print(f"\n🗣️ --- REBUTTAL ({self.rounds} rounds max) --- 🗣️\n")
+        for round_no in range(1, self.rounds + 1):
+            timeout = self.arena.agent_timeout
+            if deadline is not None:
+                budget = deadline.budget("debate")
+                if budget < last_round_seconds:
+                    deadline.note("debate", f"stopped after round {round_no - 1} with {budget:.0f}s budget")
+                    result.stop_reason = "deadline"
+                    break
+                timeout = min(timeout, budget)
+
+            messages = {role: debate_messages(role, document, self._state(role, positions, round_no)) for role in ROLES}
+            started = time.monotonic()
+            with telemetry.span("debate.round", round=round_no):
+                rebuttals = await asyncio.gather(*(self._arebut(role, messages[role], timeout, client, model) for role in ROLES))
+            if any(r is None for r in rebuttals):
+                result.stop_reason = "error"
+                break
+            last_round_seconds = max(MIN_ROUND_SECONDS, time.monotonic() - started)
+
+            deltas = []
+            for role, rebuttal in zip(ROLES, rebuttals):
+                position = positions[role]
+                before = position.consensus
+                position.consensus = apply_rebuttal(before, rebuttal)
+                delta = SideDelta(
+                    role=role, round=round_no,
+                    risk_units=(before.risk_sizing.risk_units, position.consensus.risk_sizing.risk_units),
+                    confidence=(before.confidence_score, position.consensus.confidence_score),
+                    lever_changes=rebuttal.lever_changes, points=rebuttal.rebuttal_points,
+                    concessions=rebuttal.concessions, rationale=rebuttal.sizing_rationale,
+                )
+                position.deltas.append(delta)
+                deltas.append(delta)
+                print(f"  {delta.summary()}")
+            result.rounds = round_no
+            result.round_tokens.append({
+                "round": round_no,
+                "prompt_tokens": max(sum(count_tokens(m["content"]) for m in messages[role]) for role in ROLES),
+                "state_tokens": max(count_tokens(messages[role][-1]["content"]) for role in ROLES),
+            })
+            if on_round:
+                on_round(round_no, *deltas)
+
+            if all(d.risk_moved <= CONVERGENCE_RISK_UNITS and d.confidence_moved <= CONVERGENCE_CONFIDENCE for d in deltas):
+                result.converged, result.stop_reason = True, "converged"
+                print(f"🤝 Sizing converged after round {round_no}")
+                break
+        return result
+
+    async def afight(self, scenario: str, target: str = None, client: "AsyncOpenAI" = None,
+                     deadline: Deadline = None, on_round: Callable = None):
+        """
+        Opening statements (Arena.afight) followed by the rebuttal rounds.
+        Returns (long, short, DebateResult); long/short are None when that
+        PM's opening failed, and the debate is then skipped.
+        """
+        client = client or get_async_client()
+        plan = self.arena.plan_fight(scenario, target, deadline=deadline)
+        long_res, short_res = await self.arena.afight(scenario, target=target, client=client, plan=plan)
+        if long_res is None or short_res is None or not self.rounds:
+            return long_res, short_res, None
+        with telemetry.span("debate", rounds=self.rounds):
+            result = await self.arebut(scenario, long_res, short_res, target=target, client=client,
+                                       deadline=deadline, on_round=on_round, plan=plan)
+        return result.long, result.short, result
+
+    def rebut(self, scenario: str, long_res: PMAnalysis, short_res: PMAnalysis, target: str = None,
+              deadline: Deadline = None, on_round: Callable = None, plan: FightPlan = None) -> DebateResult:
+        """
+        Sync entry point for arebut(); on_round runs on the shared loop thread.
+        """
+        return run_sync(self.arebut(scenario, long_res, short_res, target=target, deadline=deadline,
+                                    on_round=on_round, plan=plan))
+
+    def fight(self, scenario: str, target: str = None, deadline: Deadline = None, on_round: Callable = None):
+        """
+        Sync entry point for afight().
+        """
+        return run_sync(self.afight(scenario, target=target, deadline=deadline, on_round=on_round))
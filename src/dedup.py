@@ -0,0 +1,232 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src import telemetry
+from src.pagetags import is_page_tag
+
+# Lines this close to the top/bottom of a page are header/footer candidates
+EDGE_LINES = 3
+# ...and are boilerplate once they repeat on this many pages (or this share of all pages)
+MIN_EDGE_REPEATS = 3
+EDGE_REPEAT_FRACTION = 0.2
+
+# Paragraphs shorter than this are never dropped (table rows, labels)
+MIN_UNIT_CHARS = 60
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+LSH_BANDS = 16
+# Estimated Jaccard above which a later paragraph counts as a repeat
+NEAR_DUP_THRESHOLD = 0.8
+
+_MERSENNE = (1 << 61) - 1
+_NUMERIC = re.compile(r"\d[\d,.]*%?")
+# One varying token per edge line is allowed: a page counter or a date
+_PAGE_COUNTER = re.compile(r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?\b|\b\d+\s*(?:of|/)\s*\d+\b|^[-–\s]*\d+[-–\s]*$")
+_DATE = re.compile(
+    r"\b(?:\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{2,4}|"
+    r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2},? \d{4})\b"
+)
+_MASK = "\x00"
+_SPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class DedupResult:
+    pages: List[List[Optional[str]]]
+    chars_before: int
+    chars_after: int
+    boilerplate_lines: int = 0
+    duplicate_units: int = 0
+    removed_by_file: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def chars_removed(self) -> int:
+        return self.chars_before - self.chars_after
+
+    @property
+    def removed_ratio(self) -> float:
+        return self.chars_removed / self.chars_before if self.chars_before else 0.0
+
+    @property
+    def text(self) -> str:
+        # Same layout as ExtractionResult.text
+        return "".join(p + "\n\n" for file_pages in self.pages for p in file_pages if p is not None)
+
+
+def _normalize(line: str) -> str:
+    # Exact-match key: case and spacing only, figures stay significant
+    return _SPACE.sub(" ", line.strip().lower())
+
+def _is_data_line(line: str) -> bool:
+    # Table rows (delimited, or two or more figures) are content, never boilerplate
+    return "|" in line or "\t" in line or len(_NUMERIC.findall(line)) >= 2
+
+def _edge_key(line: str) -> Optional[str]:
+    """
+    Key under which a header/footer candidate is counted: its exact text,
+    with a single page-number or date token masked so "Page 3 of 12" and
+    "Page 4 of 12" match. None for data rows and lines with two or more
+    figures, which are always kept.
+    """
+    text = _normalize(line)
+    if not text or is_page_tag(text) or "|" in text or "\t" in line:
+        return None
+    masked = _PAGE_COUNTER.sub(_MASK, _DATE.sub(_MASK, text))
+    if masked.count(_MASK) + len(_NUMERIC.findall(masked)) >= 2:
+        return None
+    # Any other figure must repeat exactly
+    return masked.replace(_MASK, "#")
+
+def _edges(lines: List[str]) -> List[int]:
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    return sorted(set(content[:EDGE_LINES] + content[-EDGE_LINES:]))
+
+def find_boilerplate(pages: List[List[Optional[str]]]) -> set:
+    """
+    Edge-line keys (see _edge_key) that open or close many pages across
+    the corpus: running headers, footers, page x of y, "Please see
+    disclosures". Rows of figures are never counted.
+    """
+    counts = Counter()
+    total_pages = 0
+    for file_pages in pages:
+        for page in file_pages:
+            if not page:
+                continue
+            total_pages += 1
+            lines = page.split("\n")
+            # [p. N] tags open every page by design; _edge_key skips them
+            counts.update(key for key in {_edge_key(lines[i]) for i in _edges(lines)} if key)
+    threshold = max(MIN_EDGE_REPEATS, int(EDGE_REPEAT_FRACTION * total_pages))
+    return {key for key, n in counts.items() if n >= threshold}
+
+
+class MinHashLSH:
+    """
+    Banded MinHash index. Each unit is hashed once into NUM_PERM minima
+    over its word shingles, so the whole pass is linear in corpus size;
+    only bucket collisions are compared. numpy is imported on first use
+    so extraction-only callers never load it.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = LSH_BANDS, seed: int = 7):
+        import numpy as np
+
+        self.prime = np.uint64(_MERSENNE)
+        rng = np.random.default_rng(seed)
+        # a, b < 2**31 and 32-bit shingle hashes keep a*h+b inside uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = defaultdict(list)
+        self.signatures = []
+
+    def signature(self, text: str) -> "np.ndarray":
+        import numpy as np
+
+        words = _WORD.findall(text.lower())
+        if len(words) < SHINGLE_WORDS:
+            shingles = [" ".join(words)]
+        else:
+            shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in set(shingles)), dtype=np.uint64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % self.prime).min(axis=1)
+
+    def _band_keys(self, signature: "np.ndarray"):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def seen(self, signature: "np.ndarray", threshold: float) -> bool:
+        """
+        True if a similar unit was added before; otherwise adds this one.
+        """
+        keys = list(self._band_keys(signature))
+        candidates = {i for key in keys for i in self.buckets.get(key, ())}
+        for i in candidates:
+            if (self.signatures[i] == signature).mean() >= threshold:
+                return True
+        index = len(self.signatures)
+        self.signatures.append(signature)
+        for key in keys:
+            self.buckets[key].append(index)
+        return False
+
+
+def _units(page: str) -> tuple:
+    # Paragraphs when the extractor left blank lines, otherwise lines
+    paragraphs = re.split(r"\n\s*\n", page)
+    if len(paragraphs) > 1:
+        return paragraphs, "\n\n"
+    return page.split("\n"), "\n"
+
+def dedupe_pages(pages: List[List[Optional[str]]], threshold: float = NEAR_DUP_THRESHOLD) -> DedupResult:
+    """
+    Cross-document cleanup between extraction and prompting. Drops
+    repeated header/footer lines, then any paragraph that (near-)duplicates
+    one seen earlier in this or a previous file, so the first occurrence is
+    kept in document order. Page structure is preserved for chunking.
+    """
+    with telemetry.span("dedup") as span:
+        result = _dedupe_pages(pages, threshold)
+        span.set(chars_before=result.chars_before, chars_removed=result.chars_removed,
+                 boilerplate_lines=result.boilerplate_lines, duplicate_units=result.duplicate_units)
+        return result
+
+def _dedupe_pages(pages: List[List[Optional[str]]], threshold: float) -> DedupResult:
+    boilerplate = find_boilerplate(pages)
+    lsh = MinHashLSH()
+    exact = set()
+    cleaned, removed_by_file = [], {}
+    before = after = boilerplate_lines = duplicate_units = 0
+
+    for file_index, file_pages in enumerate(pages):
+        out_pages = []
+        file_before = file_after = 0
+        for page in file_pages:
+            if not page:
+                out_pages.append(page)
+                continue
+            file_before += len(page)
+
+            lines = page.split("\n")
+            edges = set(_edges(lines))
+            kept_lines = []
+            for i, line in enumerate(lines):
+                if i in edges and _edge_key(line) in boilerplate:
+                    boilerplate_lines += 1
+                    continue
+                kept_lines.append(line)
+
+            units, separator = _units("\n".join(kept_lines))
+            kept_units = []
+            for unit in units:
+                body = unit.strip()
+                if len(body) < MIN_UNIT_CHARS:
+                    kept_units.append(unit)
+                    continue
+                key = _normalize(body)
+                # Tables that differ only in their figures look near-identical
+                # to MinHash; they are only dropped on an exact repeat
+                lines_in_unit = body.split("\n")
+                tabular = sum(map(_is_data_line, lines_in_unit)) * 2 > len(lines_in_unit)
+                if key in exact or (not tabular and lsh.seen(lsh.signature(body), threshold)):
+                    duplicate_units += 1
+                    continue
+                exact.add(key)
+                kept_units.append(unit)
+
+            new_page = separator.join(kept_units).strip("\n")
+            file_after += len(new_page)
+            out_pages.append(new_page)
+
+        cleaned.append(out_pages)
+        removed_by_file[file_index] = file_before - file_after
+        before += file_before
+        after += file_after
+
+    return DedupResult(cleaned, before, after, boilerplate_lines, duplicate_units, removed_by_file)
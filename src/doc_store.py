@@ -0,0 +1,96 @@
+import os
+import mmap
+import array
+import hashlib
+import threading
+from typing import List, Optional
+
+DEFAULT_STORE_DIR = os.path.join("data", "docstore")
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class DocumentStore:
+    """
+    Extracted per-page text keyed by the SHA-256 of the source PDF bytes.
+
+    Each document is two files under <root>/<digest[:2]>/:
+      <digest>.txt  UTF-8 page texts back to back
+      <digest>.idx  uint64 byte offsets, one per page plus the end offset
+    The text file is memory-mapped on read, so single pages or page
+    ranges can be sliced out without loading the whole document.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.getenv("ARENA_DOCSTORE_DIR", DEFAULT_STORE_DIR)
+
+    def _paths(self, digest: str):
+        shard = os.path.join(self.root, digest[:2])
+        return os.path.join(shard, f"{digest}.txt"), os.path.join(shard, f"{digest}.idx")
+
+    def has(self, digest: str) -> bool:
+        # The index is written last, so its presence means the entry is complete
+        return os.path.exists(self._paths(digest)[1])
+
+    def put(self, digest: str, pages: List[str]):
+        text_path, idx_path = self._paths(digest)
+        os.makedirs(os.path.dirname(text_path), exist_ok=True)
+
+        offsets = array.array("Q", [0])
+        tmp_suffix = f".tmp{os.getpid()}.{threading.get_ident()}"
+        with open(text_path + tmp_suffix, "wb") as f:
+            for page in pages:
+                encoded = page.encode("utf-8")
+                f.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+        with open(idx_path + tmp_suffix, "wb") as f:
+            offsets.tofile(f)
+
+        os.replace(text_path + tmp_suffix, text_path)
+        os.replace(idx_path + tmp_suffix, idx_path)
+
+    def _offsets(self, digest: str) -> array.array:
+        offsets = array.array("Q")
+        with open(self._paths(digest)[1], "rb") as f:
+            offsets.frombytes(f.read())
+        return offsets
+
+    def page_count(self, digest: str) -> int:
+        return len(self._offsets(digest)) - 1
+
+    def get_pages(self, digest: str, start: int = 0, stop: int = None) -> Optional[List[str]]:
+        """
+        Returns pages[start:stop] for a stored document, or None if unknown.
+        """
+        if not self.has(digest):
+            return None
+        offsets = self._offsets(digest)
+        n_pages = len(offsets) - 1
+        start, stop, _ = slice(start, stop).indices(n_pages)
+        if start >= stop:
+            return []
+
+        text_path = self._paths(digest)[0]
+        if offsets[-1] == 0:
+            return [""] * (stop - start)
+        with open(text_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return [mm[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(start, stop)]
+
+    def get_page(self, digest: str, page_num: int) -> Optional[str]:
+        pages = self.get_pages(digest, page_num, page_num + 1)
+        return pages[0] if pages else None
+
+    def delete(self, digest: str):
+        # Index first so a concurrent reader never sees a half-deleted entry
+        for path in reversed(self._paths(digest)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+_default_store = None
+
+def get_default_store() -> DocumentStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = DocumentStore()
+    return _default_store
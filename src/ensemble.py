@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from src.schemas import PMAnalysis
+from src.context import tokenize, _STOPWORDS
+
+# Jaccard overlap of content words needed to merge two drivers / lever names
+DRIVER_SIMILARITY = 0.3
+LEVER_SIMILARITY = 0.5
+# Drivers raised by at least this share of samples make the consensus list
+CONSENSUS_SUPPORT = 0.5
+
+
+@dataclass
+class DriverCluster:
+    label: str
+    members: List[str]
+    support: float  # share of samples that raised it
+
+
+@dataclass
+class LeverStat:
+    lever_name: str
+    sensitivity_median: float
+    sensitivity_std: float
+    support: float
+
+
+@dataclass
+class PMEnsemble:
+    """
+    N self-consistency samples from one PM plus their aggregate view.
+    `consensus` is a regular PMAnalysis (the medoid sample, re-sized to the
+    medians) so display code can treat it like a single answer.
+    """
+    samples: List[PMAnalysis]
+    consensus: PMAnalysis
+    risk_units_median: float
+    risk_units_iqr: Tuple[float, float]
+    risk_units_std: float
+    confidence_median: float
+    confidence_std: float
+    drivers: List[DriverCluster] = field(default_factory=list)
+    levers: List[LeverStat] = field(default_factory=list)
+
+    @property
+    def n(self) -> int:
+        return len(self.samples)
+
+    def pitch_lines(self) -> List[str]:
+        """
+        Consolidated pitch for the Judge: sizing distribution instead of a
+        single number, drivers ranked by how many samples raised them.
+        """
+        low, high = self.risk_units_iqr
+        drivers = "; ".join(f"{d.label} ({d.support:.0%})" for d in self.drivers[:8])
+        levers = "; ".join(
+            f"{l.lever_name} {l.sensitivity_median:.1f}±{l.sensitivity_std:.1f}" for l in self.levers[:6]
+        )
+        return [
+            f"Risk Units: median {self.risk_units_median:.1f} (IQR {low:.1f}-{high:.1f}, sd {self.risk_units_std:.2f}, n={self.n})",
+            f"Confidence: median {self.confidence_median:.0f} (sd {self.confidence_std:.1f})",
+            f"Thesis: {self.consensus.thesis_summary}",
+            f"Key Drivers (share of samples): {drivers}",
+            f"Lever Sensitivity (median±sd, 1-5): {levers}",
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            "n": self.n,
+            "risk_units_median": self.risk_units_median,
+            "risk_units_iqr": list(self.risk_units_iqr),
+            "risk_units_std": self.risk_units_std,
+            "confidence_median": self.confidence_median,
+            "confidence_std": self.confidence_std,
+            "drivers": [vars(d) for d in self.drivers],
+            "levers": [vars(l) for l in self.levers],
+            "consensus": self.consensus.model_dump(),
+        }
+
+
+# numpy is imported inside the functions below: this module sits on the
+# app's import path (via Judge) but only ensemble runs need it
+
+def _similarity(texts: List[str]) -> "np.ndarray":
+    """
+    Pairwise Jaccard similarity of content-word sets, as one matrix product.
+    """
+    import numpy as np
+
+    term_sets = [
+        {w for w in tokenize(t) if len(w) > 2 and w not in _STOPWORDS} or {t.lower()}
+        for t in texts
+    ]
+    vocab = {term: i for i, term in enumerate(sorted(set().union(*term_sets)))}
+    x = np.zeros((len(texts), len(vocab)), dtype=np.float32)
+    for row, terms in enumerate(term_sets):
+        x[row, [vocab[t] for t in terms]] = 1.0
+    inter = x @ x.T
+    sizes = x.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - inter
+    return inter / np.maximum(union, 1.0)
+
+def cluster_texts(texts: List[str], sample_ids: List[int], n_samples: int, threshold: float) -> List[Tuple[str, "np.ndarray", float]]:
+    """
+    Leader clustering on the similarity graph: the best-connected text
+    seeds a cluster and absorbs its unassigned neighbours. Returns
+    (label, member indices, support) sorted by support.
+    """
+    import numpy as np
+
+    if not texts:
+        return []
+    sim = _similarity(texts)
+    linked = sim >= threshold
+    ids = np.asarray(sample_ids)
+    assigned = np.full(len(texts), -1)
+    clusters = []
+    for seed in np.argsort(-linked.sum(axis=1), kind="stable"):
+        if assigned[seed] >= 0:
+            continue
+        members = np.flatnonzero(linked[seed] & (assigned < 0))
+        assigned[members] = len(clusters)
+        # Most central member names the cluster
+        label = texts[members[np.argmax(sim[np.ix_(members, members)].sum(axis=1))]]
+        support = len(np.unique(ids[members])) / n_samples
+        clusters.append((label, members, support))
+    clusters.sort(key=lambda c: (-c[2], -len(c[1])))
+    return clusters
+
+def aggregate(samples: List[PMAnalysis]) -> PMEnsemble:
+    import numpy as np
+
+    if not samples:
+        raise ValueError("Cannot aggregate an empty ensemble")
+    n = len(samples)
+    risk = np.array([s.risk_sizing.risk_units for s in samples], dtype=float)
+    confidence = np.array([s.confidence_score for s in samples], dtype=float)
+    risk_median, conf_median = float(np.median(risk)), float(np.median(confidence))
+    q25, q75 = np.percentile(risk, [25, 75])
+
+    driver_texts, driver_ids = [], []
+    for i, s in enumerate(samples):
+        driver_texts.extend(s.key_drivers)
+        driver_ids.extend([i] * len(s.key_drivers))
+    drivers = [
+        DriverCluster(label, [driver_texts[m] for m in members], support)
+        for label, members, support in cluster_texts(driver_texts, driver_ids, n, DRIVER_SIMILARITY)
+    ]
+
+    lever_names, lever_scores, lever_ids = [], [], []
+    for i, s in enumerate(samples):
+        for lever in s.conviction_levers:
+            lever_names.append(lever.lever_name)
+            lever_scores.append(lever.sensitivity_score)
+            lever_ids.append(i)
+    scores = np.array(lever_scores, dtype=float)
+    levers = [
+        LeverStat(label, float(np.median(scores[members])), float(np.std(scores[members])), support)
+        for label, members, support in cluster_texts(lever_names, lever_ids, n, LEVER_SIMILARITY)
+    ]
+
+    # Medoid: the sample whose sizing and confidence sit closest to the medians
+    spread = np.abs(risk - risk_median) / max(float(np.ptp(risk)), 1.0) \
+        + np.abs(confidence - conf_median) / max(float(np.ptp(confidence)), 1.0)
+    medoid = samples[int(np.argmin(spread))]
+    consensus_drivers = [d.label for d in drivers if d.support >= CONSENSUS_SUPPORT] or [d.label for d in drivers[:5]]
+    consensus = medoid.model_copy(update={
+        "key_drivers": consensus_drivers,
+        "confidence_score": int(round(conf_median)),
+        "risk_sizing": medoid.risk_sizing.model_copy(update={"risk_units": risk_median}),
+    })
+
+    return PMEnsemble(
+        samples=samples,
+        consensus=consensus,
+        risk_units_median=risk_median,
+        risk_units_iqr=(float(q25), float(q75)),
+        risk_units_std=float(np.std(risk)),
+        confidence_median=conf_median,
+        confidence_std=float(np.std(confidence)),
+        drivers=drivers,
+        levers=levers,
+    )
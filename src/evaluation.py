@@ -0,0 +1,356 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src import llm
+from src import telemetry
+from src.schemas import PMAnalysis, RubricGrade
+from src.cache import ResponseCache
+from src.clients import get_async_client, run_sync
+from src.messages import load_prompt, document_block
+from src.context import ContextIndex, build_query
+from src.doc_store import DocumentStore, get_default_store
+from src.extraction import EXTRACTION_MODES, default_mode, store_key
+from src.history import VerdictHistory
+from src.scheduler import BATCH
+
+RUBRIC_FILE = "rubric.md"
+DEFAULT_GRADER_MODEL = llm.DEFAULT_MODEL
+DEFAULT_EVAL_CONCURRENCY = 8
+# Scenario excerpt shown to the grader for Factual Grounding
+EVAL_CONTEXT_TOKENS = 6000
+
+# Grades live in their own cache: long TTL and room for many runs, so a
+# re-run only pays for pairs it has not graded before
+DEFAULT_GRADE_CACHE_PATH = os.path.join("data", "eval", "grades.sqlite")
+GRADE_CACHE_TTL_SECONDS = 365 * 24 * 3600
+GRADE_CACHE_MAX_ENTRIES = 200000
+
+GRADER_SYSTEM_PROMPT = (
+    "You are an independent evaluator of long/short equity research. Grade the Long PM and "
+    "Short PM outputs that follow against the rubric below, scoring every numbered dimension "
+    "1-5 using its anchors (2 and 4 sit between them). Grade each side on its own merits, then "
+    "pick the winner as described in the Comparative Outcome section.\n\n"
+)
+
+_SECTION = re.compile(r"^## (\d+)\.\s+(.+?)\s*$", re.MULTILINE)
+_ANCHOR = re.compile(r"^- ([1-5])\s*[–-]\s*(.+)$")
+
+
+@dataclass
+class RubricDimension:
+    number: int
+    name: str
+    question: str
+    anchors: Dict[int, str]
+
+    @property
+    def key(self) -> str:
+        return re.sub(r"[^a-z0-9]+", "_", self.name.lower()).strip("_")
+
+
+def parse_rubric(text: str) -> List[RubricDimension]:
+    """
+    Numbered sections that carry a **Question:** and 1-5 score anchors.
+    Narrative sections (winner, logging, trajectories) are skipped.
+    """
+    dimensions = []
+    matches = list(_SECTION.finditer(text))
+    for i, match in enumerate(matches):
+        body = text[match.end():matches[i + 1].start() if i + 1 < len(matches) else len(text)]
+        question = re.search(r"\*\*Question:\*\*\s*(.+?)(?:\n\s*\n)", body, re.DOTALL)
+        anchors, current = {}, None
+        for line in body.splitlines():
+            anchor = _ANCHOR.match(line.strip()) if not line.startswith("  - ") else None
+            if anchor:
+                current = int(anchor.group(1))
+                anchors[current] = anchor.group(2).strip()
+            elif current is not None and line.startswith(" ") and line.strip() and not line.strip().startswith("- "):
+                anchors[current] += " " + line.strip()
+            elif not line.strip() or line.startswith(("-", "#")):
+                current = None
+        if question and len(anchors) >= 2:
+            name = re.sub(r"\s*\(.*\)$", "", match.group(2)).strip()
+            dimensions.append(RubricDimension(int(match.group(1)), name, " ".join(question.group(1).split()), anchors))
+    return dimensions
+
+def load_rubric(filename: str = RUBRIC_FILE) -> List[RubricDimension]:
+    return parse_rubric(load_prompt(filename))
+
+
+@dataclass
+class EvalItem:
+    """
+    One Long/Short pair to grade. Items sharing a scenario_id across
+    variants are compared head to head.
+    """
+    scenario_id: str
+    variant: str
+    long: PMAnalysis
+    short: PMAnalysis
+    scenario: str = ""
+    ticker: str = ""
+    source_id: Optional[str] = None
+
+
+@dataclass
+class GradedPair:
+    item: EvalItem
+    grade: Optional[RubricGrade] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class EvalRun:
+    graded: List[GradedPair] = field(default_factory=list)
+    dimensions: List[RubricDimension] = field(default_factory=list)
+
+    @property
+    def ok(self) -> List[GradedPair]:
+        return [g for g in self.graded if g.grade is not None]
+
+    def counts(self) -> dict:
+        return {
+            "pairs": len(self.graded),
+            "graded_new": sum(1 for g in self.ok if not g.cached),
+            "from_cache": sum(1 for g in self.ok if g.cached),
+            "failed": sum(1 for g in self.graded if g.grade is None),
+        }
+
+
+# --- Loading pairs --------------------------------------------------
+
+def scenario_id_for(doc_hashes: List[str], fallback: str) -> str:
+    # Same source documents -> same scenario, whichever run produced the pair
+    if not doc_hashes:
+        return fallback
+    return hashlib.sha256("|".join(sorted(doc_hashes)).encode("utf-8")).hexdigest()[:16]
+
+def scenario_text(doc_hashes: List[str], ticker: str = None, store: DocumentStore = None,
+                  token_budget: int = EVAL_CONTEXT_TOKENS) -> str:
+    """
+    Relevance-packed excerpt of the stored source documents, or "" when
+    the document store no longer has them. Each document is read in
+    whichever extraction mode it was stored under, the current default
+    first.
+    """
+    store = store or get_default_store()
+    modes = sorted(EXTRACTION_MODES, key=lambda mode: mode != default_mode())
+    stored = (next((p for p in (store.get_pages(store_key(d, mode)) for mode in modes) if p), None) for d in doc_hashes)
+    pages = [p for p in stored if p]
+    if not pages:
+        return ""
+    return ContextIndex.from_pages(pages).pack(build_query(ticker), token_budget)
+
+def items_from_history(history: VerdictHistory, ticker: str = None, start: float = None, end: float = None,
+                       variant_by: str = "model", limit: int = None, with_scenario: bool = True) -> List[EvalItem]:
+    """
+    Pairs from the verdict history. variant_by: "model" (model ids) or
+    "source" (app / batch / main).
+    """
+    items = []
+    for row in history.query(ticker=ticker, start=start, end=end, limit=limit):
+        record = history.get(row["id"])
+        variant = (",".join(record["model_ids"]) or "unknown") if variant_by == "model" else record["source"]
+        items.append(EvalItem(
+            scenario_id=scenario_id_for(record["doc_hashes"], f"{record['ticker']}#{record['id']}"),
+            variant=variant,
+            long=record["long"],
+            short=record["short"],
+            scenario=scenario_text(record["doc_hashes"], record["ticker"]) if with_scenario else "",
+            ticker=record["ticker"],
+            source_id=f"history:{record['id']}",
+        ))
+    return items
+
+def items_from_results(path: str, variant: str = None, with_scenario: bool = True) -> List[EvalItem]:
+    """
+    Pairs from a batch results JSONL (batch.py --output). The variant
+    defaults to the file name, so one file per prompt/model variant.
+    """
+    variant = variant or os.path.splitext(os.path.basename(path))[0]
+    items = []
+    with open(path, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("error") or not record.get("long") or not record.get("short"):
+                continue
+            digests = record.get("digests") or []
+            items.append(EvalItem(
+                scenario_id=scenario_id_for(digests, record["pack_id"]),
+                variant=variant,
+                long=PMAnalysis.model_validate(record["long"]),
+                short=PMAnalysis.model_validate(record["short"]),
+                scenario=scenario_text(digests, record.get("ticker")) if with_scenario else "",
+                ticker=record.get("ticker") or "",
+                source_id=f"{path}:{record['pack_id']}",
+            ))
+    return items
+
+
+# --- Grading ---------------------------------------------------------
+
+def _side_block(label: str, analysis: PMAnalysis) -> str:
+    return f"### {label} OUTPUT\n{analysis.model_dump_json(indent=2)}"
+
+class RubricEvaluator:
+    """
+    Scores Long/Short pairs against rubric.md with concurrent grader
+    calls at batch priority. The rubric is the shared system prompt, so
+    every call after the first reuses it as a cached prefix.
+    """
+
+    def __init__(self, model: str = None, cache: ResponseCache = None,
+                 concurrency: int = DEFAULT_EVAL_CONCURRENCY, rubric: List[RubricDimension] = None):
+        self.model = model or os.getenv("ARENA_GRADER_MODEL", DEFAULT_GRADER_MODEL)
+        self.cache = cache if cache is not None else ResponseCache(
+            path=os.getenv("ARENA_EVAL_CACHE_PATH", DEFAULT_GRADE_CACHE_PATH),
+            max_entries=GRADE_CACHE_MAX_ENTRIES, ttl_seconds=GRADE_CACHE_TTL_SECONDS,
+        )
+        self.concurrency = concurrency
+        self.dimensions = rubric or load_rubric()
+        self.system_prompt = GRADER_SYSTEM_PROMPT + load_prompt(RUBRIC_FILE)
+        # When True, re-grade even pairs that are already cached
+        self.refresh = False
+
+    def _build_messages(self, item: EvalItem) -> list:
+        scenario = item.scenario or "(Source documents unavailable: grade Factual Grounding on internal consistency.)"
+        dimension_list = "\n".join(f"{d.number}. {d.name}" for d in self.dimensions)
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": document_block(scenario)},
+            {"role": "user", "content": (
+                f"{_side_block('LONG PM', item.long)}\n\n{_side_block('SHORT PM', item.short)}\n\n"
+                f"Score both sides on exactly these dimensions, using these names:\n{dimension_list}"
+            )},
+        ]
+
+    async def agrade(self, item: EvalItem, client=None) -> GradedPair:
+        messages = self._build_messages(item)
+        hit = None if self.refresh else llm.cache_get(self.cache, self.model, messages, RubricGrade)
+        if hit is not None:
+            return GradedPair(item, hit, cached=True)
+        try:
+            with telemetry.span("eval.grade", variant=item.variant):
+                grade = await llm.aparse(
+                    client or get_async_client(), self.model, messages, RubricGrade,
+                    cache=self.cache, refresh=True, priority=BATCH,
+                )
+            return GradedPair(item, grade)
+        except Exception as e:
+            print(f"❌ Grading {item.source_id or item.scenario_id} failed: {e}")
+            return GradedPair(item, error=str(e))
+
+    async def agrade_all(self, items: List[EvalItem], on_graded: Callable[[GradedPair], None] = None) -> EvalRun:
+        slots = asyncio.Semaphore(self.concurrency)
+        client = get_async_client()
+
+        async def one(item):
+            async with slots:
+                graded = await self.agrade(item, client)
+            if on_graded:
+                on_graded(graded)
+            return graded
+
+        with telemetry.trace("eval"):
+            graded = await asyncio.gather(*(one(item) for item in items))
+        return EvalRun(list(graded), self.dimensions)
+
+    def grade_all(self, items: List[EvalItem], on_graded: Callable[[GradedPair], None] = None) -> EvalRun:
+        return run_sync(self.agrade_all(items, on_graded))
+
+
+# --- Aggregation -----------------------------------------------------
+
+def _match_scores(side, dimensions: List[RubricDimension]) -> Dict[str, float]:
+    """
+    Grader scores keyed by rubric dimension. Names are matched loosely,
+    then by position; out-of-range scores are clipped to 1-5.
+    """
+    by_name = {d.key: d for d in dimensions}
+    matched = {}
+    for position, entry in enumerate(side.scores):
+        key = re.sub(r"[^a-z0-9]+", "_", re.sub(r"^\d+\.\s*", "", entry.dimension.lower())).strip("_")
+        dim = by_name.get(key) or next((d for d in dimensions if d.key.startswith(key) or key.startswith(d.key)), None)
+        if dim is None and position < len(dimensions):
+            dim = dimensions[position]
+        if dim is not None and dim.key not in matched:
+            matched[dim.key] = float(min(5, max(1, entry.score)))
+    return matched
+
+def scores_frame(run: EvalRun):
+    """
+    Long-format pandas DataFrame: one row per (pair, side, dimension).
+    """
+    import pandas as pd
+
+    rows = []
+    for graded in run.ok:
+        item = graded.item
+        for side, grade in (("Long", graded.grade.long_pm), ("Short", graded.grade.short_pm)):
+            scores = _match_scores(grade, run.dimensions)
+            for dim in run.dimensions:
+                rows.append({
+                    "scenario_id": item.scenario_id, "variant": item.variant, "ticker": item.ticker,
+                    "side": side, "dimension": dim.name, "score": scores.get(dim.key, float("nan")),
+                })
+    return pd.DataFrame(rows, columns=["scenario_id", "variant", "ticker", "side", "dimension", "score"])
+
+def dimension_table(frame, by_side: bool = True):
+    """
+    Mean score per variant (and side) x dimension, plus an overall column.
+    """
+    index = ["variant", "side"] if by_side else ["variant"]
+    order = list(dict.fromkeys(frame["dimension"]))
+    table = frame.pivot_table(index=index, columns="dimension", values="score", aggfunc="mean").reindex(columns=order)
+    table["overall"] = table.mean(axis=1)
+    return table.round(2)
+
+def variant_summary(run: EvalRun):
+    """
+    Per variant: pairs graded, mean overall score per side and the
+    grader's winner split.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = scores_frame(run)
+    overall = frame.groupby(["variant", "side"])["score"].mean().unstack("side")
+    winners = pd.DataFrame([(g.item.variant, g.grade.winner) for g in run.ok], columns=["variant", "winner"])
+    shares = pd.crosstab(winners["variant"], winners["winner"], normalize="index")
+    summary = pd.DataFrame({
+        "pairs": winners.groupby("variant").size(),
+        "long_mean": overall.get("Long"),
+        "short_mean": overall.get("Short"),
+        "score_std": frame.groupby("variant")["score"].agg(lambda s: float(np.nanstd(s.to_numpy()))),
+    })
+    for outcome in ("Long", "Short", "Split"):
+        summary[f"{outcome.lower()}_wins"] = shares[outcome] if outcome in shares else 0.0
+    return summary.round(3)
+
+def compare_variants(frame, baseline: str):
+    """
+    Paired comparison against a baseline variant on the scenarios both
+    graded: mean score difference per dimension with a normal 95% CI.
+    """
+    import numpy as np
+    import pandas as pd
+
+    wide = frame.pivot_table(index=["scenario_id", "side", "dimension"], columns="variant", values="score")
+    if baseline not in wide:
+        raise ValueError(f"Baseline variant '{baseline}' has no graded pairs")
+    rows = []
+    for variant in (v for v in wide.columns if v != baseline):
+        paired = wide[[baseline, variant]].dropna()
+        for dimension, group in paired.groupby(level="dimension", sort=False):
+            diff = group[variant].to_numpy() - group[baseline].to_numpy()
+            n = len(diff)
+            half = 1.96 * np.std(diff, ddof=1) / np.sqrt(n) if n > 1 else float("nan")
+            rows.append({"variant": variant, "dimension": dimension, "n": n,
+                         "mean_diff": float(np.mean(diff)), "ci95": float(half)})
+    return pd.DataFrame(rows, columns=["variant", "dimension", "n", "mean_diff", "ci95"]).round(3)
@@ -0,0 +1,367 @@
+import io
+import os
+import re
+import time
+import tempfile
+import threading
+import multiprocessing
+import concurrent.futures as cf
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from src import telemetry
+from src.doc_store import DocumentStore, content_hash
+from src.pagetags import page_tag
+
+# Pages per work unit sent to a worker process
+DEFAULT_SHARD_PAGES = 16
+# Below this many pages the process pool costs more than it saves
+MIN_PARALLEL_PAGES = 24
+
+# "layout": PyMuPDF's layout-sorted plain text (the original path).
+# "tables": ruled tables as delimited rows, prose as unsorted text blocks,
+# each page opened with a [p. N] tag so later stages can cite it.
+LAYOUT = "layout"
+TABLES = "tables"
+EXTRACTION_MODES = (LAYOUT, TABLES)
+DEFAULT_EXTRACTION_MODE = TABLES
+# Drawn rectangles covering more than this share of the page are
+# backgrounds or frames, not table rules
+MAX_RULE_AREA_FRACTION = 0.8
+
+ProgressCallback = Callable[[int, str, int, int], None]
+
+_NUMBER = re.compile(r"\(?[-$€£]?\d[\d,.]*%?\)?")
+_WIDE_GAP = re.compile(r"\s{2,}")
+
+@dataclass
+class ExtractionResult:
+    """
+    Per-file, per-page text in page order. Pages that did not finish
+    before the deadline (or failed) are None.
+    """
+    names: List[str]
+    pages: List[List[Optional[str]]]
+    digests: List[str] = field(default_factory=list)
+    timed_out: bool = False
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    mode: str = LAYOUT
+
+    @property
+    def pages_done(self) -> int:
+        return sum(1 for file_pages in self.pages for p in file_pages if p is not None)
+
+    @property
+    def pages_total(self) -> int:
+        return sum(len(file_pages) for file_pages in self.pages)
+
+    @property
+    def text(self) -> str:
+        buf = io.StringIO()
+        for file_pages in self.pages:
+            for page_text in file_pages:
+                if page_text is not None:
+                    buf.write(page_text)
+                    buf.write("\n\n")
+        return buf.getvalue()
+
+
+def default_mode() -> str:
+    return os.getenv("ARENA_EXTRACT_MODE", DEFAULT_EXTRACTION_MODE)
+
+def store_key(digest: str, mode: str = None) -> str:
+    """
+    DocumentStore key for a document extracted in `mode`. Layout pages keep
+    the bare content hash, so stores written before modes existed stay valid.
+    """
+    mode = mode or default_mode()
+    return digest if mode == LAYOUT else f"{digest}.{mode}"
+
+
+def _ruled_area(page):
+    """
+    Bounding box of the page's straight strokes and thin rectangles, or
+    None. find_tables() cost scales with the characters it inspects, so it
+    only runs inside this area, and not at all on pages without rules.
+    """
+    import fitz
+    page_area = abs(page.rect)
+    area = None
+    for path in page.get_cdrawings():
+        if any(item[0] not in ("l", "re") for item in path["items"]):
+            continue
+        rect = fitz.Rect(path["rect"])
+        if abs(rect) > MAX_RULE_AREA_FRACTION * page_area:
+            continue
+        # Rules are zero-width/height; pad them so the union doesn't skip them
+        rect = rect + (-1, -1, 1, 1)
+        area = rect if area is None else area | rect
+    return area
+
+def _table_rows(table) -> str:
+    rows = []
+    for row in table.extract():
+        cells = [" ".join((cell or "").split()) for cell in row]
+        if any(cells):
+            rows.append("|".join(cells))
+    return "\n".join(rows)
+
+def _compact_block(text: str) -> str:
+    # Whitespace-aligned numeric rows (unruled tables) become delimited rows;
+    # everything else just loses its padding
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _WIDE_GAP.search(line) and len(_NUMBER.findall(line)) >= 2:
+            lines.append(_WIDE_GAP.sub("|", line))
+        else:
+            lines.append(" ".join(line.split()))
+    return "\n".join(lines)
+
+def _tables_page_text(page) -> str:
+    import fitz
+    tables = []
+    area = _ruled_area(page)
+    if area is not None:
+        try:
+            tables = page.find_tables(clip=area).tables
+        except Exception as e:
+            # Odd vector content; the page still extracts as prose
+            print(f"⚠️ Table detection failed on page {page.number + 1}: {e}")
+    boxes = [fitz.Rect(table.bbox) for table in tables]
+
+    items = []
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+        if block_type != 0:
+            continue
+        # Text inside a detected table is emitted by the table itself
+        if any(fitz.Point((x0 + x1) / 2, (y0 + y1) / 2) in box for box in boxes):
+            continue
+        text = _compact_block(text)
+        if text:
+            items.append((y0, x0, text))
+    if tables:
+        for table in tables:
+            rows = _table_rows(table)
+            if rows:
+                items.append((table.bbox[1], table.bbox[0], f"[table]\n{rows}"))
+        # Blocks stay in content order unless a table has to be slotted in
+        items.sort(key=lambda item: (item[0], item[1]))
+    return "\n\n".join([page_tag(page.number)] + [text for _, _, text in items])
+
+def page_text(page, mode: str = LAYOUT) -> str:
+    if mode == TABLES:
+        return _tables_page_text(page)
+    return page.get_text(sort=True)
+
+
+def _extract_shard(path: str, start: int, stop: int, mode: str = LAYOUT) -> List[str]:
+    # Runs in a worker process; import here so the parent stays light
+    import fitz
+    with fitz.open(path) as doc:
+        return [page_text(doc[i], mode) for i in range(start, stop)]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool(max_workers: int) -> cf.ProcessPoolExecutor:
+    # One long-lived pool per process: spawning workers and importing
+    # PyMuPDF in them is the fixed cost we don't want to pay per upload.
+    # "spawn" avoids forking a multi-threaded Streamlit server.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = cf.ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _page_count(data: bytes) -> int:
+    import fitz
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def extract_documents(documents: List[Tuple[str, bytes]],
+                      progress_callback: ProgressCallback = None,
+                      deadline_seconds: float = None,
+                      shard_pages: int = DEFAULT_SHARD_PAGES,
+                      max_workers: int = None,
+                      store: DocumentStore = None,
+                      mode: str = None) -> ExtractionResult:
+    """
+    Extracts text from (name, pdf_bytes) pairs, sharding page ranges
+    across a process pool and reassembling them in page order.
+
+    progress_callback(file_index, file_name, pages_done, pages_total) is
+    called from the calling thread as shards complete.
+    With deadline_seconds set, returns whatever pages finished in time.
+    With a store, documents seen before are read back without PyMuPDF
+    and fully extracted new ones are saved.
+    mode: "tables" or "layout" (see EXTRACTION_MODES); defaults to
+    ARENA_EXTRACT_MODE, else "tables".
+    """
+    mode = mode or default_mode()
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode: {mode}")
+    with telemetry.span("extract", files=len(documents), mode=mode) as span:
+        result = _extract_documents(documents, progress_callback, deadline_seconds,
+                                    shard_pages, max_workers, store, mode)
+        span.set(pages=result.pages_done, pages_total=result.pages_total,
+                 timed_out=result.timed_out, errors=len(result.errors),
+                 pages_per_second=round(result.pages_done / result.elapsed, 1) if result.elapsed else None)
+        return result
+
+
+def _extract_documents(documents, progress_callback, deadline_seconds, shard_pages, max_workers, store, mode):
+    start_time = time.monotonic()
+    names = [name for name, _ in documents]
+    digests = [content_hash(data) for _, data in documents]
+    result = ExtractionResult(names=names, pages=[[] for _ in documents], digests=digests, mode=mode)
+
+    counts = []
+    for index, (name, data) in enumerate(documents):
+        stored = store.get_pages(store_key(digests[index], mode)) if store is not None else None
+        if stored is not None:
+            telemetry.add("from_store", 1)
+            result.pages[index] = stored
+            counts.append(0)
+            if progress_callback:
+                progress_callback(index, name, len(stored), len(stored))
+            continue
+        try:
+            counts.append(_page_count(data))
+        except Exception as e:
+            result.errors[name] = str(e)
+            counts.append(0)
+        result.pages[index] = [None] * counts[-1]
+
+    done_per_file = [0] * len(documents)
+
+    def _record(file_index: int, start: int, texts: List[str]):
+        result.pages[file_index][start:start + len(texts)] = texts
+        done_per_file[file_index] += len(texts)
+        if progress_callback:
+            progress_callback(file_index, names[file_index], done_per_file[file_index], counts[file_index])
+
+    def _expired() -> bool:
+        return deadline_seconds is not None and time.monotonic() - start_time > deadline_seconds
+
+    if not any(counts):
+        # Every document came from the store (or could not be opened), so
+        # PyMuPDF is never imported
+        result.elapsed = time.monotonic() - start_time
+        return result
+
+    workers = max_workers or os.cpu_count() or 1
+    if sum(counts) < MIN_PARALLEL_PAGES or workers < 2:
+        _extract_inline(documents, counts, result, _record, _expired, mode)
+    else:
+        try:
+            _extract_parallel(documents, counts, result, _record, start_time,
+                              deadline_seconds, shard_pages, workers, mode)
+        except BrokenProcessPool as e:
+            # A crashed worker poisons the pool; finish in-process
+            print(f"⚠️ Extraction pool failed ({e}); continuing serially")
+            _reset_pool()
+            _extract_inline(documents, counts, result, _record, _expired, mode)
+
+    if store is not None:
+        for index, file_pages in enumerate(result.pages):
+            complete = counts[index] and names[index] not in result.errors and None not in file_pages
+            if complete:
+                store.put(store_key(digests[index], mode), file_pages)
+
+    result.elapsed = time.monotonic() - start_time
+    return result
+
+
+def extract_files(paths: List[str], **kwargs) -> ExtractionResult:
+    """
+    Headless convenience wrapper: extract_documents() over PDF paths.
+    """
+    documents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            documents.append((os.path.basename(path), f.read()))
+    return extract_documents(documents, **kwargs)
+
+
+def _extract_inline(documents, counts, result, record, expired, mode):
+    import fitz
+    for file_index, (name, data) in enumerate(documents):
+        if not counts[file_index]:
+            continue
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                for page_num in range(doc.page_count):
+                    if result.pages[file_index][page_num] is not None:
+                        continue
+                    if expired():
+                        result.timed_out = True
+                        return
+                    record(file_index, page_num, [page_text(doc[page_num], mode)])
+        except Exception as e:
+            result.errors[name] = str(e)
+
+
+def _extract_parallel(documents, counts, result, record, start_time,
+                      deadline_seconds, shard_pages, max_workers, mode):
+    pool = _get_pool(max_workers)
+    temp_paths = []
+    futures = {}
+    try:
+        # Workers open the PDF from disk so each shard doesn't pickle the whole file
+        for file_index, (name, data) in enumerate(documents):
+            if not counts[file_index]:
+                continue
+            fd, path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            temp_paths.append(path)
+            for start in range(0, counts[file_index], shard_pages):
+                stop = min(start + shard_pages, counts[file_index])
+                futures[pool.submit(_extract_shard, path, start, stop, mode)] = (file_index, start)
+
+        pending = set(futures)
+        while pending:
+            timeout = None
+            if deadline_seconds is not None:
+                timeout = max(0.0, deadline_seconds - (time.monotonic() - start_time))
+            done, pending = cf.wait(pending, timeout=timeout, return_when=cf.FIRST_COMPLETED)
+            if not done:
+                result.timed_out = True
+                break
+            for future in done:
+                file_index, start = futures[future]
+                try:
+                    texts = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    result.errors[result.names[file_index]] = str(e)
+                    continue
+                record(file_index, start, texts)
+    finally:
+        for future in futures:
+            future.cancel()
+        for path in temp_paths:
+            # A worker still reading a timed-out shard keeps its own handle open
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+from src.schemas import PMAnalysis, CIOVerdict
+
+DEFAULT_HISTORY_PATH = os.path.join("data", "history", "verdicts.sqlite")
+
+# Scalar columns copied out of the JSON so listing thousands of verdicts
+# never has to parse the full analyses
+SUMMARY_COLUMNS = (
+    "id", "ticker", "created_at", "source", "winner", "net_risk_units",
+    "long_risk_units", "short_risk_units", "long_confidence", "short_confidence",
+)
+
+# Extra columns of a full=True export: digests and model ids as JSON
+# arrays, the analyses and verdict as JSON records
+FULL_COLUMNS = ("doc_hashes", "model_ids", "long_analysis", "short_analysis", "verdict")
+
+@lru_cache(maxsize=None)
+def arrow_schema(full: bool = False):
+    """
+    Declared rather than inferred, so an empty export or an all-NULL column
+    (winner/verdict before any judge ran) still has the real column types.
+    Built on first export so importing the history never loads pyarrow.
+    """
+    import pyarrow as pa
+
+    fields = [
+        ("id", pa.int64()),
+        ("ticker", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("source", pa.string()),
+        ("winner", pa.string()),
+        ("net_risk_units", pa.float64()),
+        ("long_risk_units", pa.float64()),
+        ("short_risk_units", pa.float64()),
+        ("long_confidence", pa.int64()),
+        ("short_confidence", pa.int64()),
+    ]
+    if full:
+        fields += [(name, pa.string()) for name in FULL_COLUMNS]
+    return pa.schema(fields)
+
+
+class VerdictHistory:
+    """
+    Append-only store of every adjudication: the PMAnalysis pair, the
+    CIOVerdict, and what produced them (document digests, model ids).
+    Indexed by (ticker, created_at) for per-name timelines.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("ARENA_HISTORY_PATH", DEFAULT_HISTORY_PATH)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticker TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    source TEXT NOT NULL,
+                    doc_hashes TEXT NOT NULL,
+                    model_ids TEXT NOT NULL,
+                    winner TEXT,
+                    net_risk_units REAL,
+                    long_risk_units REAL,
+                    short_risk_units REAL,
+                    long_confidence INTEGER,
+                    short_confidence INTEGER,
+                    long_analysis TEXT NOT NULL,
+                    short_analysis TEXT NOT NULL,
+                    verdict TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_ticker ON verdicts(ticker, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_created ON verdicts(created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def record(self, ticker: str, long_res: PMAnalysis, short_res: PMAnalysis, verdict: Optional[CIOVerdict],
+               doc_hashes: List[str] = (), model_ids: List[str] = (), source: str = "app",
+               created_at: float = None) -> int:
+        """
+        Stores one adjudication and returns its row id.
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO verdicts (ticker, created_at, source, doc_hashes, model_ids, winner, net_risk_units, "
+                "long_risk_units, short_risk_units, long_confidence, short_confidence, "
+                "long_analysis, short_analysis, verdict) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ticker.upper(), created_at or time.time(), source,
+                    json.dumps(list(doc_hashes)), json.dumps(list(model_ids)),
+                    verdict.winner if verdict else None,
+                    verdict.net_risk_units if verdict else None,
+                    long_res.risk_sizing.risk_units, short_res.risk_sizing.risk_units,
+                    long_res.confidence_score, short_res.confidence_score,
+                    long_res.model_dump_json(), short_res.model_dump_json(),
+                    verdict.model_dump_json() if verdict else None,
+                ),
+            )
+            return cursor.lastrowid
+
+    def _where(self, ticker: str = None, start: float = None, end: float = None) -> tuple:
+        clauses, params = [], []
+        if ticker:
+            clauses.append("ticker = ?")
+            params.append(ticker.upper())
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("created_at < ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, ticker: str = None, start: float = None, end: float = None, limit: int = None) -> List[dict]:
+        """
+        Summary rows (no JSON blobs), newest first. start/end are epoch
+        seconds; end is exclusive.
+        """
+        where, params = self._where(ticker, start, end)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM verdicts{where} ORDER BY created_at DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]
+
+    def get(self, verdict_id: int) -> Optional[dict]:
+        """
+        One full record with the analyses re-validated into their schemas.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)}, doc_hashes, model_ids, long_analysis, short_analysis, verdict "
+                "FROM verdicts WHERE id = ?", (verdict_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(SUMMARY_COLUMNS, row))
+        doc_hashes, model_ids, long_json, short_json, verdict_json = row[len(SUMMARY_COLUMNS):]
+        record["doc_hashes"] = json.loads(doc_hashes)
+        record["model_ids"] = json.loads(model_ids)
+        record["long"] = PMAnalysis.model_validate_json(long_json)
+        record["short"] = PMAnalysis.model_validate_json(short_json)
+        record["verdict"] = CIOVerdict.model_validate_json(verdict_json) if verdict_json else None
+        return record
+
+    def tickers(self) -> List[tuple]:
+        """
+        (ticker, verdict count, last created_at), most recently judged first.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT ticker, COUNT(*), MAX(created_at) FROM verdicts GROUP BY ticker ORDER BY MAX(created_at) DESC"
+            ).fetchall()
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def to_arrow(self, ticker: str = None, start: float = None, end: float = None, full: bool = False):
+        """
+        Columnar export as a pyarrow.Table. full=True adds the document
+        digests, model ids and the analyses/verdict as JSON strings.
+        """
+        import pyarrow as pa
+
+        schema = arrow_schema(full)
+        columns = schema.names
+        where, params = self._where(ticker, start, end)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM verdicts{where} ORDER BY ticker, created_at", params
+            ).fetchall()
+        data = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+        # created_at is stored as epoch seconds; export a real timestamp
+        data["created_at"] = [int(t * 1e6) for t in data["created_at"]]
+        return pa.table(data, schema=schema)
+
+    def export_parquet(self, where, **filters) -> int:
+        """
+        Writes to_arrow(**filters) as Parquet to a path or binary file
+        object; returns the row count.
+        """
+        import pyarrow.parquet as pq
+
+        table = self.to_arrow(**filters)
+        if isinstance(where, str):
+            os.makedirs(os.path.dirname(os.path.abspath(where)), exist_ok=True)
+        pq.write_table(table, where, compression="zstd")
+        return table.num_rows
+
+
+_default_history = None
+_history_lock = threading.Lock()
+
+def get_default_history() -> VerdictHistory:
+    """
+    Shared history store; path from ARENA_HISTORY_PATH.
+    """
+    global _default_history
+    with _history_lock:
+        if _default_history is None:
+            _default_history = VerdictHistory()
+        return _default_history
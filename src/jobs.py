@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+import traceback
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from src import telemetry
+from src.arena import Arena
+from src.judge import Judge
+from src.debate import Debate
+from src import llm
+from src.history import get_default_history
+from src.deadline import Deadline
+
+DEFAULT_JOBS_PATH = os.path.join("data", "jobs", "jobs.sqlite")
+DEFAULT_JOB_WORKERS = 4
+# Progress updates are coalesced so streaming deltas don't hammer SQLite
+PROGRESS_FLUSH_SECONDS = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    status: str
+    payload: dict
+    progress: dict = field(default_factory=dict)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    @property
+    def elapsed(self) -> float:
+        end = self.updated_at if not self.active else time.time()
+        return end - self.created_at
+
+
+def request_key(kind: str, payload: dict) -> str:
+    material = json.dumps({"kind": kind, "payload": payload}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    SQLite job table. Rows outlive the Streamlit session that created
+    them, so a reloaded page can find its job again by id.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("ARENA_JOBS_PATH", DEFAULT_JOBS_PATH)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    request_key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_request ON jobs(request_key, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def create_or_join(self, kind: str, payload: dict) -> tuple:
+        """
+        Returns (job_id, created). An identical request that is still
+        queued or running is joined instead of started again.
+        """
+        key = request_key(kind, payload)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT job_id FROM jobs WHERE request_key = ? AND status IN ({','.join('?' * len(ACTIVE_STATES))}) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key, *ACTIVE_STATES),
+            ).fetchone()
+            if row:
+                return row[0], False
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, request_key, status, payload, worker_pid, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, QUEUED, json.dumps(payload, default=str), os.getpid(), now, now),
+            )
+            return job_id, True
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        for name in ("progress", "result"):
+            if name in fields and fields[name] is not None:
+                fields[name] = json.dumps(fields[name], default=str)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id, kind, status, payload, progress, result, error, created_at, updated_at "
+                "FROM jobs WHERE job_id = ?", (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, status, payload, progress, result, error, created_at, updated_at = row
+        return Job(job_id, kind, status, json.loads(payload), json.loads(progress or "{}"),
+                   json.loads(result) if result else None, error, created_at, updated_at)
+
+    def recent(self, limit: int = 20) -> list:
+        with self._connect() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            )]
+        return [self.get(job_id) for job_id in ids]
+
+    def mark_orphans(self) -> int:
+        """
+        Active jobs whose worker process is gone (server restart) can
+        never finish; mark them interrupted so the UI stops polling.
+        """
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT job_id, worker_pid FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATES))})",
+                ACTIVE_STATES,
+            ).fetchall()
+            orphans = [job_id for job_id, pid in rows if pid != os.getpid() and not _pid_alive(pid)]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                [(INTERRUPTED, "Server restarted while the job was running", time.time(), j) for j in orphans],
+            )
+        return len(orphans)
+
+
+class JobExecutor:
+    """
+    Runs registered job kinds on a thread pool, outside any Streamlit
+    script run. Handlers are called as handler(payload, report) and return
+    a JSON-serialisable result; report(**fields) publishes progress that
+    pollers read back from the job table.
+    """
+
+    def __init__(self, store: JobStore = None, max_workers: int = None):
+        self.store = store or JobStore()
+        workers = max_workers or int(os.getenv("ARENA_JOB_WORKERS", DEFAULT_JOB_WORKERS))
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arena-job")
+        self._handlers: Dict[str, Callable] = {}
+        self.store.mark_orphans()
+
+    def register(self, kind: str, handler: Callable):
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload: dict) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job_id, created = self.store.create_or_join(kind, payload)
+        if created:
+            self._pool.submit(self._run, job_id, kind, payload)
+        else:
+            print(f"🔗 Joined in-flight {kind} job {job_id}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def _reporter(self, job_id: str) -> Callable:
+        progress = {}
+        last_flush = [0.0]
+        lock = threading.Lock()
+
+        def report(**fields):
+            with lock:
+                stage_changed = "stage" in fields and fields["stage"] != progress.get("stage")
+                progress.update(fields)
+                now = time.monotonic()
+                if not stage_changed and now - last_flush[0] < PROGRESS_FLUSH_SECONDS:
+                    return
+                last_flush[0] = now
+                snapshot = dict(progress)
+            self.store.update(job_id, progress=snapshot)
+        return report
+
+    def _run(self, job_id: str, kind: str, payload: dict):
+        self.store.update(job_id, status=RUNNING)
+        try:
+            result = self._handlers[kind](payload, self._reporter(job_id))
+        except Exception as e:
+            print(f"❌ Job {job_id} ({kind}) failed: {e}")
+            self.store.update(job_id, status=FAILED, error=traceback.format_exc())
+            return
+        self.store.update(job_id, status=DONE, result=result)
+
+
+# --- Job handlers ----------------------------------------------------
+
+ADJUDICATE = "adjudicate"
+
+def run_adjudication(payload: dict, report: Callable) -> dict:
+    """
+    Fight -> judge for one packed context. payload: context, ticker,
+    samples (ensemble size, 1 = streaming single sample), rebuttal_rounds
+    (0 = one-shot; see src.debate), bypass_cache, digests (source documents,
+    for the verdict history), sla_seconds (end-to-end deadline for fight,
+    rebuttal and judge; see src.deadline).
+    Partial PM reasoning (long/short) and thesis (long_thesis/short_thesis)
+    and the live executive summary go to report().
+    """
+    arena, judge = Arena(), Judge()
+    arena.bypass_cache = judge.bypass_cache = bool(payload.get("bypass_cache"))
+    ticker, samples = payload["ticker"], int(payload.get("samples") or 1)
+    rounds = int(payload.get("rebuttal_rounds") or 0)
+    deadline = Deadline.for_adjudication(payload.get("sla_seconds"), rebuttal_rounds=rounds)
+    result = {"ticker": ticker, "long": None, "short": None, "verdict": None, "ensemble": None,
+              "debate": None, "failure": None}
+
+    with telemetry.trace(ADJUDICATE) as run_trace:
+        report(stage="debate")
+        # Planned once so the rebuttal rounds reuse the fight's document and model
+        plan = arena.plan_fight(payload["context"], ticker, deadline=deadline)
+        long_ens = short_ens = None
+        if samples > 1:
+            long_ens, short_ens = arena.fight_ensemble(payload["context"], samples, target=ticker, plan=plan)
+            long_res = long_ens.consensus if long_ens else None
+            short_res = short_ens.consensus if short_ens else None
+            if long_ens and short_ens:
+                result["ensemble"] = {"long": long_ens.to_dict(), "short": short_ens.to_dict()}
+        else:
+            long_res, short_res = arena.fight_stream(
+                payload["context"],
+                lambda role, partial: report(**{
+                    role.lower(): partial.get("analytical_process", ""),
+                    f"{role.lower()}_thesis": partial.get("thesis_summary", ""),
+                }),
+                target=ticker, plan=plan,
+            )
+
+        long_pitch, short_pitch = long_ens or long_res, short_ens or short_res
+        if rounds and long_res is not None and short_res is not None:
+            report(stage="rebuttal")
+            debate = Debate(arena, rounds).rebut(
+                payload["context"], long_res, short_res, target=ticker, deadline=deadline, plan=plan,
+                on_round=lambda n, long_delta, short_delta: report(
+                    rebuttal_round=n, long=long_delta.rationale, short=short_delta.rationale,
+                ),
+            )
+            if debate.rounds:
+                long_pitch, short_pitch = debate.long, debate.short
+                long_res, short_res = debate.long.consensus, debate.short.consensus
+            result["debate"] = debate.to_dict()
+        result["long"] = long_res.model_dump() if long_res else None
+        result["short"] = short_res.model_dump() if short_res else None
+
+        if long_res is None or short_res is None:
+            result["failure"] = "both" if long_res is None and short_res is None else (
+                "Long" if long_res is None else "Short"
+            )
+        else:
+            report(stage="judge")
+            verdict = judge.adjudicate_stream(
+                long_pitch, short_pitch,
+                lambda partial: report(verdict=partial.get("executive_summary", "")),
+                deadline=deadline,
+            )
+            result["verdict"] = verdict.model_dump() if verdict else None
+            result["history_id"] = get_default_history().record(
+                ticker, long_res, short_res, verdict,
+                doc_hashes=payload.get("digests") or [], model_ids=llm.model_ids(deadline), source="app",
+            )
+
+    result["deadline"] = deadline.to_dict()
+    result["trace"] = run_trace.rows()
+    return result
+
+
+_default_executor = None
+_executor_lock = threading.Lock()
+
+def get_default_executor() -> JobExecutor:
+    """
+    Process-wide executor, so jobs keep running across Streamlit reruns
+    and sessions. Pool size from ARENA_JOB_WORKERS.
+    """
+    global _default_executor
+    with _executor_lock:
+        if _default_executor is None:
+            _default_executor = JobExecutor()
+            _default_executor.register(ADJUDICATE, run_adjudication)
+        return _default_executor
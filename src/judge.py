@@ -1,17 +1,20 @@
 # src/judge.py
-import os
-from openai import OpenAI
+import asyncio
+from typing import TYPE_CHECKING
 from src.schemas import CIOVerdict
+from src.ensemble import PMEnsemble
+from src.debate import DebatePosition
+from src.cache import ResponseCache, get_default_cache
+from src import llm
+from src import telemetry
+from src.scheduler import INTERACTIVE
+from src.clients import get_client, get_async_client, run_sync
+from src.deadline import Deadline
 
-class Judge:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-    def adjudicate(self, long_data, short_data):
-        """
-        Compares the Long and Short outputs to render a final verdict.
-        """
-        system_prompt = """
+SYSTEM_PROMPT = """
         You are the Chief Investment Officer (CIO) of a multi-manager hedge fund.
         Two of your Senior PMs (Long and Short) have just pitched you on the same name.
         
@@ -25,24 +28,152 @@ class Judge:
         - If the Short Thesis ignores a fundamental catalyst, side with the Long.
         """
 
+def heuristic_verdict(long_data, short_data, reason: str) -> CIOVerdict:
+    """
+    Rule-based stand-in when the CIO call is skipped or runs out of time:
+    net risk is each side's risk units weighted by its confidence.
+    """
+    long_res = getattr(long_data, "consensus", long_data)
+    short_res = getattr(short_data, "consensus", short_data)
+    long_units = long_res.risk_sizing.risk_units * long_res.confidence_score / 100
+    short_units = short_res.risk_sizing.risk_units * short_res.confidence_score / 100
+    net = round(long_units - short_units, 1)
+    winner = "Long" if net > 0 else "Short" if net < 0 else "Neutral"
+    return CIOVerdict(
+        winner=winner,
+        net_risk_units=net,
+        executive_summary=(
+            f"Heuristic verdict ({reason}). Long sizes {long_res.risk_sizing.risk_units} units at "
+            f"{long_res.confidence_score}% confidence, Short {short_res.risk_sizing.risk_units} units at "
+            f"{short_res.confidence_score}%; the CIO did not review the pitches."
+        ),
+        deciding_factor="Confidence-weighted sizing (no CIO review)",
+    )
+
+
+class Judge:
+    def __init__(self, cache: ResponseCache = None):
+        self.cache = cache if cache is not None else get_default_cache()
+        # When True, skip cached answers (fresh answers are still stored)
+        self.bypass_cache = False
+        # Scheduler priority class; batch runs set scheduler.BATCH
+        self.priority = INTERACTIVE
+
+    @property
+    def client(self):
+        # Shared pooled client (src.clients); reads OPENAI_API_KEY on first use
+        return get_client()
+
+    def _pitch(self, data) -> str:
+        # Ensembles carry a sizing distribution and clustered drivers;
+        # debated positions their sizing path and final rebuttal
+        if isinstance(data, (PMEnsemble, DebatePosition)):
+            lines = data.pitch_lines()
+        else:
+            lines = [
+                f"Risk Units: {data.risk_sizing.risk_units}",
+                f"Thesis: {data.thesis_summary}",
+                f"Key Drivers: {data.key_drivers}",
+            ]
+        return "\n        ".join(lines)
+
+    def _build_messages(self, long_data, short_data) -> list:
+        """
+        long_data / short_data: PMAnalysis, PMEnsemble from ensemble mode,
+        or DebatePosition after rebuttal rounds.
+        """
         user_content = f"""
         🔵 LONG PM PITCH:
-        Risk Units: {long_data.risk_sizing.risk_units}
-        Thesis: {long_data.thesis_summary}
-        Key Drivers: {long_data.key_drivers}
+        {self._pitch(long_data)}
         
         🔴 SHORT PM PITCH:
-        Risk Units: {short_data.risk_sizing.risk_units}
-        Thesis: {short_data.thesis_summary}
-        Key Drivers: {short_data.key_drivers}
-        """
-
-        completion = self.client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content}
-            ],
-            response_format=CIOVerdict
-        )
-        return completion.choices[0].message.parsed
\ No newline at end of file
+        {self._pitch(short_data)}
+        """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ]
+
+    def _plan(self, long_data, short_data, deadline: Deadline):
+        """
+        (model, timeout, fallback verdict or None) for this adjudication.
+        The judge's prompt is already small, so a short budget only swaps
+        in the fallback model; with almost no time left it is skipped.
+        """
+        if deadline is None:
+            return llm.DEFAULT_MODEL, None, None
+        plan = deadline.plan("judge", llm.DEFAULT_MODEL)
+        if plan.skip:
+            return plan.model, plan.seconds, heuristic_verdict(long_data, short_data, "judge skipped: deadline")
+        return plan.model, plan.seconds, None
+
+    async def _bounded(self, call, long_data, short_data, timeout: float, deadline: Deadline):
+        try:
+            return await asyncio.wait_for(call, timeout=timeout)
+        except asyncio.TimeoutError:
+            deadline.note("judge", f"timed out after {timeout:.0f}s; heuristic verdict")
+            return heuristic_verdict(long_data, short_data, "judge timed out")
+
+    def adjudicate(self, long_data, short_data, deadline: Deadline = None):
+        """
+        Compares the Long and Short outputs to render a final verdict.
+        With a deadline the CIO call is bounded by the judge's share of it
+        and falls back to heuristic_verdict() when there is no time.
+        """
+        if deadline is not None:
+            return run_sync(self.aadjudicate(long_data, short_data, deadline=deadline))
+        with telemetry.span("judge"):
+            return llm.parse(
+                self.client, llm.DEFAULT_MODEL, self._build_messages(long_data, short_data), CIOVerdict,
+                cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+            )
+
+    async def aadjudicate(self, long_data, short_data, client: "AsyncOpenAI" = None, deadline: Deadline = None):
+        """
+        Async variant of adjudicate.
+        """
+        client = client or get_async_client()
+        model, timeout, fallback = self._plan(long_data, short_data, deadline)
+        if fallback is not None:
+            return fallback
+        with telemetry.span("judge", model=model):
+            call = llm.aparse(
+                client, model, self._build_messages(long_data, short_data), CIOVerdict,
+                cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+            )
+            if deadline is None:
+                return await call
+            return await self._bounded(call, long_data, short_data, timeout, deadline)
+
+    def adjudicate_stream(self, long_data, short_data, on_partial, deadline: Deadline = None):
+        """
+        adjudicate() streaming the partial verdict to on_partial(dict).
+        """
+        if deadline is not None:
+            return run_sync(self.aadjudicate_stream(long_data, short_data, on_partial, deadline=deadline))
+        with telemetry.span("judge"):
+            return llm.stream_parse(
+                self.client, llm.DEFAULT_MODEL, self._build_messages(long_data, short_data), CIOVerdict,
+                on_partial=on_partial,
+                cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+            )
+
+    async def aadjudicate_stream(self, long_data, short_data, on_partial, client: "AsyncOpenAI" = None,
+                                 deadline: Deadline = None):
+        """
+        Async variant of adjudicate_stream; on_partial runs on the event
+        loop thread.
+        """
+        client = client or get_async_client()
+        model, timeout, fallback = self._plan(long_data, short_data, deadline)
+        if fallback is not None:
+            return fallback
+        with telemetry.span("judge", model=model):
+            call = llm.astream_parse(
+                client, model, self._build_messages(long_data, short_data), CIOVerdict,
+                on_partial=on_partial,
+                cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+            )
+            if deadline is None:
+                return await call
+            return await self._bounded(call, long_data, short_data, timeout, deadline)
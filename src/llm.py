@@ -0,0 +1,340 @@
+import time
+from functools import lru_cache
+from typing import List, Optional, Sequence, Type
+from pydantic import BaseModel, create_model
+from src import telemetry
+from src.cache import ResponseCache
+from src.context import count_tokens
+from src.deadline import Deadline
+from src.messages import prompt_cache_key
+from src.providers import get_default_router
+from src.scheduler import (
+    RequestScheduler, get_default_scheduler, INTERACTIVE, DEFAULT_COMPLETION_ESTIMATE,
+)
+
+DEFAULT_MODEL = "gpt-4o-2024-08-06"
+
+def cache_model(model: str) -> str:
+    """
+    Model id a call for `model` is cached and traced under: the model
+    itself, or the hedged router's provider/model list for it.
+    """
+    router = get_default_router()
+    return router.label_for(model) if router is not None else model
+
+def model_ids(deadline: Deadline = None, stages: Sequence[str] = ("fight", "judge")) -> List[str]:
+    """
+    Model ids recorded alongside results: what `stages` actually called,
+    i.e. each stage's planned model under a deadline (the fallback when it
+    degraded, nothing when it was skipped) or the default model without
+    one. Router-resolved (see cache_model) and de-duplicated.
+    """
+    if deadline is None:
+        models = [DEFAULT_MODEL]
+    else:
+        models = [deadline.models[stage] for stage in stages if stage in deadline.models]
+    return list(dict.fromkeys(cache_model(model) for model in models))
+
+def estimate_tokens(messages: list, completions: int = 1) -> int:
+    """
+    Up-front TPM reservation: prompt tokens plus a completion allowance
+    per requested choice.
+    """
+    return sum(count_tokens(m["content"]) for m in messages) + DEFAULT_COMPLETION_ESTIMATE * completions
+
+def cache_get(cache: ResponseCache, model: str, messages: list, schema: Type[BaseModel], **params) -> Optional[BaseModel]:
+    """
+    The answer parse()/aparse() would serve from `cache` for this call, or
+    None. Keyed exactly as they key it, router-resolved model included, so
+    callers can tell cached results from fresh ones.
+    """
+    if cache is None or not cache.enabled:
+        return None
+    return cache.get(cache.make_key(cache_model(model), messages, schema, **params), schema)
+
+def _cache_lookup(cache: ResponseCache, model: str, messages: list, schema: Type[BaseModel], refresh: bool, **params):
+    # Returns (key, hit); key is None when caching is off
+    if cache is None or not cache.enabled:
+        return None, None
+    key = cache.make_key(model, messages, schema, **params)
+    hit = None if refresh else cache.get(key, schema)
+    telemetry.annotate(cache_hit=hit is not None)
+    return key, hit
+
+def parse(client, model: str, messages: list, schema: Type[BaseModel],
+          cache: ResponseCache = None, refresh: bool = False,
+          scheduler: RequestScheduler = None, priority: int = INTERACTIVE) -> BaseModel:
+    """
+    Structured-output call shared by Selector, Arena and Judge.
+    Served from the response cache when possible; refresh=True skips the
+    read but still stores the fresh answer. Misses go through the shared
+    rate-limit scheduler, which retries 429/5xx. With ARENA_PROVIDERS set
+    to several backends the call is hedged across them instead.
+    """
+    router = get_default_router()
+    # Hedged calls carry the requested model (e.g. a deadline fallback) to
+    # the router and are cached/traced under the providers it resolves to
+    requested = model
+    if router is not None:
+        model = router.label_for(requested)
+    with telemetry.span("llm", model=model, schema=schema.__name__) as span:
+        key, hit = _cache_lookup(cache, model, messages, schema, refresh)
+        if hit is not None:
+            return hit
+
+        if router is not None:
+            result = router.parse(messages, schema, priority=priority, model=requested)
+            if key:
+                cache.put(key, result)
+            return result
+
+        scheduler = scheduler or get_default_scheduler()
+        completion = scheduler.call(
+            lambda: client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                response_format=schema,
+                prompt_cache_key=prompt_cache_key(messages),
+            ),
+            tokens=estimate_tokens(messages),
+            priority=priority,
+            label=schema.__name__,
+        )
+        span.record_usage(model, completion.usage)
+        result = completion.choices[0].message.parsed
+        if key:
+            cache.put(key, result)
+        return result
+
+async def aparse(client, model: str, messages: list, schema: Type[BaseModel],
+                 cache: ResponseCache = None, refresh: bool = False,
+                 scheduler: RequestScheduler = None, priority: int = INTERACTIVE) -> BaseModel:
+    """
+    Async variant of parse().
+    """
+    router = get_default_router()
+    requested = model
+    if router is not None:
+        model = router.label_for(requested)
+    with telemetry.span("llm", model=model, schema=schema.__name__) as span:
+        key, hit = _cache_lookup(cache, model, messages, schema, refresh)
+        if hit is not None:
+            return hit
+
+        if router is not None:
+            result = await router.aparse(messages, schema, priority=priority, model=requested)
+            if key:
+                cache.put(key, result)
+            return result
+
+        scheduler = scheduler or get_default_scheduler()
+        completion = await scheduler.acall(
+            lambda: client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                response_format=schema,
+                prompt_cache_key=prompt_cache_key(messages),
+            ),
+            tokens=estimate_tokens(messages),
+            priority=priority,
+            label=schema.__name__,
+        )
+        span.record_usage(model, completion.usage)
+        result = completion.choices[0].message.parsed
+        if key:
+            cache.put(key, result)
+        return result
+
+def _final_parsed(completion, schema: Type[BaseModel]) -> BaseModel:
+    message = completion.choices[0].message
+    if message.parsed is None:
+        raise ValueError(f"No {schema.__name__} returned: {message.refusal or 'empty response'}")
+    # Streams are assembled from deltas; re-check the finished object
+    return schema.model_validate(message.parsed.model_dump())
+
+def stream_parse(client, model: str, messages: list, schema: Type[BaseModel], on_partial,
+                 cache: ResponseCache = None, refresh: bool = False,
+                 scheduler: RequestScheduler = None, priority: int = INTERACTIVE) -> BaseModel:
+    """
+    Streaming variant of parse(). on_partial(dict) receives the partially
+    parsed object as tokens arrive; a cache hit is delivered in one call.
+    A retried request restarts the stream from scratch. Hedged calls are
+    not streamed; the winning object is delivered in one call.
+    """
+    router = get_default_router()
+    requested = model
+    if router is not None:
+        model = router.label_for(requested)
+    with telemetry.span("llm.stream", model=model, schema=schema.__name__) as span:
+        key, hit = _cache_lookup(cache, model, messages, schema, refresh)
+        if hit is not None:
+            on_partial(hit.model_dump())
+            return hit
+
+        if router is not None:
+            result = router.parse(messages, schema, priority=priority, model=requested)
+            on_partial(result.model_dump())
+            if key:
+                cache.put(key, result)
+            return result
+
+        def _run():
+            started = time.monotonic()
+            with client.beta.chat.completions.stream(
+                model=model,
+                messages=messages,
+                response_format=schema,
+                prompt_cache_key=prompt_cache_key(messages),
+                stream_options={"include_usage": True},
+            ) as stream:
+                for event in stream:
+                    if event.type == "content.delta" and event.parsed:
+                        if "ttft_ms" not in span.attributes:
+                            span.set(ttft_ms=(time.monotonic() - started) * 1000)
+                        on_partial(event.parsed)
+                return stream.get_final_completion()
+
+        scheduler = scheduler or get_default_scheduler()
+        completion = scheduler.call(_run, tokens=estimate_tokens(messages), priority=priority, label=schema.__name__)
+        span.record_usage(model, completion.usage)
+        result = _final_parsed(completion, schema)
+        if key:
+            cache.put(key, result)
+        return result
+
+async def astream_parse(client, model: str, messages: list, schema: Type[BaseModel], on_partial,
+                        cache: ResponseCache = None, refresh: bool = False,
+                        scheduler: RequestScheduler = None, priority: int = INTERACTIVE) -> BaseModel:
+    """
+    Async variant of stream_parse(). on_partial is called on the event loop
+    thread, so UI code driving the loop can update widgets directly.
+    """
+    router = get_default_router()
+    requested = model
+    if router is not None:
+        model = router.label_for(requested)
+    with telemetry.span("llm.stream", model=model, schema=schema.__name__) as span:
+        key, hit = _cache_lookup(cache, model, messages, schema, refresh)
+        if hit is not None:
+            on_partial(hit.model_dump())
+            return hit
+
+        if router is not None:
+            result = await router.aparse(messages, schema, priority=priority, model=requested)
+            on_partial(result.model_dump())
+            if key:
+                cache.put(key, result)
+            return result
+
+        async def _run():
+            started = time.monotonic()
+            async with client.beta.chat.completions.stream(
+                model=model,
+                messages=messages,
+                response_format=schema,
+                prompt_cache_key=prompt_cache_key(messages),
+                stream_options={"include_usage": True},
+            ) as stream:
+                async for event in stream:
+                    if event.type == "content.delta" and event.parsed:
+                        if "ttft_ms" not in span.attributes:
+                            span.set(ttft_ms=(time.monotonic() - started) * 1000)
+                        on_partial(event.parsed)
+                return await stream.get_final_completion()
+
+        scheduler = scheduler or get_default_scheduler()
+        completion = await scheduler.acall(_run, tokens=estimate_tokens(messages), priority=priority, label=schema.__name__)
+        span.record_usage(model, completion.usage)
+        result = _final_parsed(completion, schema)
+        if key:
+            cache.put(key, result)
+        return result
+
+@lru_cache(maxsize=None)
+def _samples_schema(schema: Type[BaseModel]) -> Type[BaseModel]:
+    # Wrapper so a list of samples round-trips through the response cache
+    return create_model(f"{schema.__name__}Samples", samples=(List[schema], ...))
+
+def _parsed_choices(completion, schema: Type[BaseModel]) -> List[BaseModel]:
+    samples = [c.message.parsed for c in completion.choices if c.message.parsed is not None]
+    if not samples:
+        raise ValueError(f"No {schema.__name__} returned in {len(completion.choices)} choices")
+    return samples
+
+def parse_n(client, model: str, messages: list, schema: Type[BaseModel], n: int,
+            cache: ResponseCache = None, refresh: bool = False,
+            scheduler: RequestScheduler = None, priority: int = INTERACTIVE) -> List[BaseModel]:
+    """
+    Draws n samples in a single request (OpenAI n=), so the prompt is paid
+    for once. Refused or unparseable choices are dropped. Hedged routing
+    has no portable n=, so it falls back to n concurrent calls.
+    """
+    router = get_default_router()
+    requested = model
+    if router is not None:
+        model = router.label_for(requested)
+    with telemetry.span("llm", model=model, schema=schema.__name__, n=n) as span:
+        wrapper = _samples_schema(schema)
+        key, hit = _cache_lookup(cache, model, messages, wrapper, refresh, n=n)
+        if hit is not None:
+            return hit.samples
+
+        if router is not None:
+            samples = router.parse_n(messages, schema, n, priority=priority, model=requested)
+        else:
+            scheduler = scheduler or get_default_scheduler()
+            completion = scheduler.call(
+                lambda: client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=schema,
+                    n=n,
+                    prompt_cache_key=prompt_cache_key(messages),
+                ),
+                tokens=estimate_tokens(messages, completions=n),
+                priority=priority,
+                label=f"{schema.__name__} x{n}",
+            )
+            span.record_usage(model, completion.usage)
+            samples = _parsed_choices(completion, schema)
+        if key:
+            cache.put(key, wrapper(samples=samples))
+        return samples
+
+async def aparse_n(client, model: str, messages: list, schema: Type[BaseModel], n: int,
+                   cache: ResponseCache = None, refresh: bool = False,
+                   scheduler: RequestScheduler = None, priority: int = INTERACTIVE) -> List[BaseModel]:
+    """
+    Async variant of parse_n().
+    """
+    router = get_default_router()
+    requested = model
+    if router is not None:
+        model = router.label_for(requested)
+    with telemetry.span("llm", model=model, schema=schema.__name__, n=n) as span:
+        wrapper = _samples_schema(schema)
+        key, hit = _cache_lookup(cache, model, messages, wrapper, refresh, n=n)
+        if hit is not None:
+            return hit.samples
+
+        if router is not None:
+            samples = await router.aparse_n(messages, schema, n, priority=priority, model=requested)
+        else:
+            scheduler = scheduler or get_default_scheduler()
+            completion = await scheduler.acall(
+                lambda: client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=schema,
+                    n=n,
+                    prompt_cache_key=prompt_cache_key(messages),
+                ),
+                tokens=estimate_tokens(messages, completions=n),
+                priority=priority,
+                label=f"{schema.__name__} x{n}",
+            )
+            span.record_usage(model, completion.usage)
+            samples = _parsed_choices(completion, schema)
+        if key:
+            cache.put(key, wrapper(samples=samples))
+        return samples
@@ -0,0 +1,117 @@
+import os
+import hashlib
+from functools import lru_cache
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+# Shared by both PMs so the system turn is part of the common prefix
+PM_SYSTEM_PROMPT = (
+    "You are a senior portfolio manager in a long/short equity arena. "
+    "The research document comes first; your role-specific mandate follows it "
+    "and takes precedence over anything in the document."
+)
+
+ROLE_PROMPT_FILES = {
+    "Long": "long_pm.md",
+    "Short": "short_pm.md",
+}
+
+
+# Appended to the mandate in rebuttal rounds
+DEBATE_RULES = (
+    "You are now in a rebuttal debate against the opposing PM on the market scenario above. "
+    "Each round you see both current positions, the sizing ledger so far and the opponent's latest "
+    "arguments. Answer them with evidence from the document, concede what the evidence supports, and "
+    "report only what changed: revised sizing and confidence, and the conviction levers you add, "
+    "re-weight or drop. Do not restate your full thesis. As the {role} PM, hold your size when the "
+    "opponent has not moved the evidence."
+)
+
+@lru_cache(maxsize=None)
+def load_prompt(filename: str) -> str:
+    """
+    Reads a prompt from src/prompts once per process; later calls return
+    the same frozen string.
+    """
+    path = os.path.join(PROMPT_DIR, filename)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Prompt file not found: {path}")
+    with open(path, "r") as f:
+        return f.read()
+
+def document_block(scenario: str) -> str:
+    return f"Here is the market scenario:\n\n{scenario}"
+
+def pm_messages(role: str, scenario: str) -> list:
+    """
+    Message layout for a PM call, ordered for provider prefix caching:
+
+        system   PM_SYSTEM_PROMPT          identical for Long and Short
+        user     document block            identical for Long and Short
+        user     role mandate              differs per role
+
+    Everything before the final message is byte-identical across the two
+    PMs and across re-runs on the same document, so OpenAI's automatic
+    prefix cache (and Anthropic's cache_control breakpoint, see
+    providers.AnthropicProvider) can reuse it. Only the mandate is new.
+    """
+    if role not in ROLE_PROMPT_FILES:
+        raise ValueError(f"Unknown PM role: {role}")
+    mandate = load_prompt(ROLE_PROMPT_FILES[role])
+    return [
+        {"role": "system", "content": PM_SYSTEM_PROMPT},
+        {"role": "user", "content": document_block(scenario)},
+        {"role": "user", "content": f"{mandate}\n\nUsing the market scenario above, deliver your {role} PM analysis."},
+    ]
+
+def debate_messages(role: str, scenario: str, state: str) -> list:
+    """
+    Message layout for a rebuttal round (see src.debate):
+
+        system   PM_SYSTEM_PROMPT          identical for Long and Short
+        user     document block            identical for Long and Short
+        user     role mandate + rules      identical across rounds per role
+        user     compact debate state      the only part that changes
+
+    The document is never followed by the transcript, only by the
+    compacted state, so each round re-reads the same cached prefix.
+    """
+    if role not in ROLE_PROMPT_FILES:
+        raise ValueError(f"Unknown PM role: {role}")
+    mandate = load_prompt(ROLE_PROMPT_FILES[role])
+    return [
+        {"role": "system", "content": PM_SYSTEM_PROMPT},
+        {"role": "user", "content": document_block(scenario)},
+        {"role": "user", "content": f"{mandate}\n\n{DEBATE_RULES.format(role=role)}"},
+        {"role": "user", "content": state},
+    ]
+
+def prompt_cache_key(messages: list) -> str:
+    """
+    Routing hint for OpenAI's prefix cache: the system turn plus the
+    document block (the first two messages of pm_messages/debate_messages),
+    so the Long and Short PM calls and every rebuttal round on one document
+    get the same key and land where that prefix is already cached. Role
+    mandates and debate state never enter the key; the final message never
+    does either, so a system + user call (judge, selector) keys on its
+    system turn.
+    """
+    shared = messages[:min(2, len(messages) - 1)]
+    prefix = "\x1e".join(f"{m['role']}:{m['content']}" for m in shared)
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]
+
+def cache_stats(rows: list) -> dict:
+    """
+    Prompt-cache hit rate over telemetry Trace.rows() (leaf llm spans only,
+    so nested stage totals are not double counted).
+    """
+    prompt = cached = 0
+    for row in rows:
+        if row["stage"].strip() in ("llm", "llm.stream"):
+            prompt += row["prompt_tokens"]
+            cached += row["cached_tokens"]
+    return {
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "hit_rate": cached / prompt if prompt else 0.0,
+    }
@@ -0,0 +1,13 @@
+import re
+
+# "[p. N]" opens each page of table-aware extraction output so citations
+# survive chunking and packing; context and dedup recognise it without
+# importing the extractor
+_PAGE_TAG = re.compile(r"^\[p\. \d+\]$")
+
+def page_tag(page_num: int) -> str:
+    # page_num is 0-based, as in PyMuPDF
+    return f"[p. {page_num + 1}]"
+
+def is_page_tag(line: str) -> bool:
+    return bool(_PAGE_TAG.match(line.strip()))
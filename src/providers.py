@@ -0,0 +1,520 @@
+import os
+import abc
+import json
+import time
+import asyncio
+import weakref
+import threading
+from collections import deque
+from typing import List, Optional, Type
+from pydantic import BaseModel
+
+from src import telemetry
+from src.clients import get_async_client, run_sync
+from src.context import count_tokens
+from src.deadline import FALLBACK_MODEL
+from src.messages import prompt_cache_key
+from src.scheduler import (
+    RequestScheduler, get_default_scheduler, is_openai_retryable, INTERACTIVE, DEFAULT_COMPLETION_ESTIMATE,
+)
+
+DEFAULT_MODELS = {
+    "openai": "gpt-4o-2024-08-06",
+    "anthropic": "claude-sonnet-4-5",
+    "gemini": "gemini-2.5-pro",
+}
+# Faster tier each provider drops to when a deadline asks for FALLBACK_MODEL
+FALLBACK_MODELS = {
+    "openai": FALLBACK_MODEL,
+    "anthropic": "claude-haiku-4-5",
+    "gemini": "gemini-2.5-flash",
+}
+# An explicitly requested model id is only sent to the provider it belongs to
+MODEL_PREFIXES = {
+    "openai": ("gpt-", "chatgpt-", "o1", "o3", "o4"),
+    "anthropic": ("claude-",),
+    "gemini": ("gemini-",),
+}
+
+
+class Usage:
+    """
+    Provider-neutral token usage, shaped like OpenAI's so telemetry and
+    the scheduler can read it without caring where it came from.
+    """
+
+    def __init__(self, prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+        self.prompt_tokens_details = type("Details", (), {"cached_tokens": cached_tokens})()
+
+
+class ProviderHealth:
+    """
+    Rolling latency window plus a circuit breaker: after
+    `trip_after` consecutive failures the provider is avoided for
+    `cooldown` seconds, then half-open: one probe request is let through
+    while it stays avoided for the rest. A successful probe closes the
+    breaker; a failed one opens it for another cooldown.
+    """
+
+    def __init__(self, window: int = 50, trip_after: int = 3, cooldown: float = 60.0):
+        self.latencies = deque(maxlen=window)
+        self.trip_after = trip_after
+        self.cooldown = cooldown
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        # True while the half-open probe is in flight
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def tripped(self) -> bool:
+        return self.consecutive_failures >= self.trip_after
+
+    def begin(self) -> bool:
+        """
+        Called before each request; True when it is the half-open probe
+        (cooldown over, breaker still tripped, no probe in flight).
+        """
+        with self._lock:
+            if self.tripped and not self.probing and time.monotonic() >= self.open_until:
+                self.probing = True
+                return True
+            return False
+
+    def release_probe(self):
+        # The probe was cancelled (lost a hedge race): no verdict either way
+        with self._lock:
+            self.probing = False
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            self.probing = False
+
+    def record_failure(self, probe: bool = False):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.tripped:
+                self.open_until = time.monotonic() + self.cooldown
+            if probe:
+                self.probing = False
+
+    @property
+    def healthy(self) -> bool:
+        if not self.tripped:
+            return True
+        return time.monotonic() >= self.open_until and not self.probing
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < 5:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "probing": self.probing,
+            "successes": self.successes,
+            "failures": self.failures,
+            "p50_seconds": self.latency_quantile(0.5),
+            "p90_seconds": self.latency_quantile(0.9),
+        }
+
+
+class Provider(abc.ABC):
+    """
+    One model backend that can return a validated instance of a pydantic
+    schema for an OpenAI-style message list. Subclasses implement
+    _make_client and _call.
+    """
+    name = "base"
+
+    def __init__(self, model: str = None, scheduler: RequestScheduler = None):
+        self.model = model or os.getenv(f"ARENA_{self.name.upper()}_MODEL", DEFAULT_MODELS.get(self.name))
+        self.fallback_model = os.getenv(f"ARENA_{self.name.upper()}_FALLBACK_MODEL", FALLBACK_MODELS.get(self.name))
+        self.scheduler = scheduler or RequestScheduler(
+            requests_per_minute=float(os.getenv(f"ARENA_{self.name.upper()}_RPM", 0)) or None,
+            tokens_per_minute=float(os.getenv(f"ARENA_{self.name.upper()}_TPM", 0)) or None,
+        )
+        self.health = ProviderHealth()
+        # Async SDK clients are bound to the loop they were first used on
+        self._clients = weakref.WeakKeyDictionary()
+
+    def resolve(self, model: str = None) -> Optional[str]:
+        """
+        This provider's model for a requested one: its own model for the
+        arena default, its fast tier for the deadline fallback, the id
+        itself when it names one of this provider's models, else None
+        (the request is not sent here).
+        """
+        if model is None or model == DEFAULT_MODELS["openai"]:
+            return self.model
+        if model == FALLBACK_MODEL:
+            return self.fallback_model
+        if model.startswith(MODEL_PREFIXES.get(self.name, ())):
+            return model
+        return None
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._make_client()
+            self._clients[loop] = client
+        return client
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Whether the scheduler should retry this error with backoff: rate
+        limits, 5xx and overload responses. Subclasses add their SDK's
+        connection and timeout errors.
+        """
+        status = getattr(error, "status_code", None)
+        if not isinstance(status, int):
+            status = getattr(error, "code", None)
+        return isinstance(status, int) and (status == 429 or status >= 500)
+
+    @abc.abstractmethod
+    def _make_client(self):
+        """
+        SDK client for the running event loop (cached per loop by _client).
+        """
+
+    @abc.abstractmethod
+    async def _call(self, messages: list, schema: Type[BaseModel], model: str):
+        """
+        Returns (parsed_instance, Usage).
+        """
+
+    async def aparse(self, messages: list, schema: Type[BaseModel], priority: int = INTERACTIVE,
+                     model: str = None) -> tuple:
+        tokens = sum(count_tokens(m["content"]) for m in messages) + DEFAULT_COMPLETION_ESTIMATE
+        model = model or self.model
+        probe = self.health.begin()
+        started = time.monotonic()
+        try:
+            result, usage = await self.scheduler.acall(
+                lambda: self._call(messages, schema, model), tokens=tokens, priority=priority,
+                label=f"{self.name}:{schema.__name__}", retryable=self.is_retryable,
+            )
+        except asyncio.CancelledError:
+            # Losing a hedge race says nothing about the provider's health
+            if probe:
+                self.health.release_probe()
+            raise
+        except Exception:
+            self.health.record_failure(probe=probe)
+            raise
+        self.health.record_success(time.monotonic() - started)
+        return result, usage
+
+
+def _split_system(messages: list):
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    rest = [m for m in messages if m["role"] != "system"]
+    return system, rest
+
+def _anthropic_turns(messages: list) -> list:
+    """
+    Merges consecutive same-role messages into one turn of text blocks and
+    puts a cache_control breakpoint on the block before the final one, so
+    the shared document prefix is cached and only the role mandate is new.
+    """
+    turns = []
+    for m in messages:
+        block = {"type": "text", "text": m["content"]}
+        if turns and turns[-1]["role"] == m["role"]:
+            turns[-1]["content"].append(block)
+        else:
+            turns.append({"role": m["role"], "content": [block]})
+    blocks = [b for turn in turns for b in turn["content"]]
+    if len(blocks) > 1:
+        blocks[-2]["cache_control"] = {"type": "ephemeral"}
+    return turns
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, model: str = None, scheduler: RequestScheduler = None):
+        # Shares the app-wide OpenAI scheduler so limits are counted once
+        super().__init__(model, scheduler or get_default_scheduler())
+
+    def is_retryable(self, error: Exception) -> bool:
+        return is_openai_retryable(error)
+
+    def _make_client(self):
+        # Same pooled per-loop client the plain OpenAI path uses
+        return get_async_client()
+
+    async def _call(self, messages, schema, model):
+        completion = await self._client().beta.chat.completions.parse(
+            model=model, messages=messages, response_format=schema,
+            prompt_cache_key=prompt_cache_key(messages),
+        )
+        parsed = completion.choices[0].message.parsed
+        if parsed is None:
+            raise ValueError(f"OpenAI returned no {schema.__name__}")
+        usage = completion.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        return parsed, Usage(usage.prompt_tokens, usage.completion_tokens,
+                             getattr(details, "cached_tokens", 0) or 0)
+
+
+class AnthropicProvider(Provider):
+    """
+    Structured output via a single forced tool whose input_schema is the
+    pydantic model's JSON schema.
+    """
+    name = "anthropic"
+
+    def is_retryable(self, error: Exception) -> bool:
+        # 529 overloaded arrives as InternalServerError; status covers 429/5xx
+        import anthropic
+        return isinstance(error, anthropic.APIConnectionError) or super().is_retryable(error)
+
+    def _make_client(self):
+        import anthropic
+        return anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+
+    async def _call(self, messages, schema, model):
+        system, rest = _split_system(messages)
+        tool_name = schema.__name__
+        response = await self._client().messages.create(
+            model=model,
+            max_tokens=8192,
+            system=[{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}] if system else [],
+            messages=_anthropic_turns(rest),
+            tools=[{
+                "name": tool_name,
+                "description": f"Return the answer as a {tool_name} object.",
+                "input_schema": schema.model_json_schema(),
+            }],
+            tool_choice={"type": "tool", "name": tool_name},
+        )
+        block = next((b for b in response.content if b.type == "tool_use"), None)
+        if block is None:
+            raise ValueError(f"Anthropic returned no {tool_name} tool call")
+        usage = response.usage
+        # input_tokens excludes cache reads/writes; fold them back in so the
+        # hit rate is cached / total prompt like OpenAI's
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        return schema.model_validate(block.input), Usage(
+            usage.input_tokens + cache_read + cache_write, usage.output_tokens, cache_read,
+        )
+
+
+class GeminiProvider(Provider):
+    """
+    Structured output via JSON mode with response_schema built from the
+    pydantic model; the text is re-validated with pydantic.
+    """
+    name = "gemini"
+
+    def is_retryable(self, error: Exception) -> bool:
+        # google.api_core errors carry the HTTP status as .code
+        # (ResourceExhausted 429, ServiceUnavailable 503, DeadlineExceeded 504)
+        return isinstance(error, (ConnectionError, TimeoutError)) or super().is_retryable(error)
+
+    def _make_client(self):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
+        return genai
+
+    async def _call(self, messages, schema, model):
+        genai = self._client()
+        system, rest = _split_system(messages)
+        generative = genai.GenerativeModel(model, system_instruction=system or None)
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+            for m in rest
+        ]
+        response = await generative.generate_content_async(
+            contents,
+            generation_config={"response_mime_type": "application/json", "response_schema": schema},
+        )
+        meta = response.usage_metadata
+        return schema.model_validate(json.loads(response.text)), Usage(
+            meta.prompt_token_count, meta.candidates_token_count,
+            getattr(meta, "cached_content_token_count", 0) or 0,
+        )
+
+
+PROVIDER_CLASSES = {
+    "openai": OpenAIProvider,
+    "anthropic": AnthropicProvider,
+    "gemini": GeminiProvider,
+}
+
+
+class HedgedRouter:
+    """
+    Sends each request to the preferred healthy provider and, if it has
+    not answered by its own `hedge_quantile` latency (learned from recent
+    calls), fires a backup at the next provider. The first schema-valid
+    response wins and the loser is cancelled. A provider that errors
+    before the deadline triggers the backup immediately.
+    """
+
+    def __init__(self, providers: List[Provider], hedge_quantile: float = 0.9,
+                 default_hedge_delay: float = 30.0, min_hedge_delay: float = 2.0):
+        self.providers = providers
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+
+    @property
+    def label(self) -> str:
+        return self.label_for(None)
+
+    def label_for(self, model: str = None) -> str:
+        """
+        Provider/model list a request for `model` is hedged across; the
+        cache key and telemetry model for that request.
+        """
+        return "hedged:" + ",".join(f"{p.name}/{m}" for p, m in self._serving(model))
+
+    def _serving(self, model: str = None) -> List[tuple]:
+        # (provider, resolved model) for providers that serve the request
+        return [(p, m) for p, m in ((p, p.resolve(model)) for p in self.providers) if m]
+
+    def _ranked(self, model: str = None) -> List[tuple]:
+        # Healthy providers first, configured order otherwise preserved
+        serving = self._serving(model)
+        if not serving:
+            raise ValueError(f"No provider in ARENA_PROVIDERS serves {model}")
+        return sorted(serving, key=lambda pm: not pm[0].health.healthy)
+
+    def _hedge_delay(self, provider: Provider) -> float:
+        quantile = provider.health.latency_quantile(self.hedge_quantile)
+        if quantile is None:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, quantile)
+
+    async def aparse(self, messages: list, schema: Type[BaseModel], priority: int = INTERACTIVE,
+                     model: str = None) -> BaseModel:
+        """
+        model is the caller's requested model (see Provider.resolve), so a
+        deadline's fallback model still applies when hedging.
+        """
+        ranked = self._ranked(model)
+        pending = {}
+        last_error = None
+
+        def launch(candidate: tuple):
+            provider, provider_model = candidate
+            task = asyncio.ensure_future(provider.aparse(messages, schema, priority=priority, model=provider_model))
+            pending[task] = candidate
+
+        launch(ranked[0])
+        backups = iter(ranked[1:])
+        deadline = self._hedge_delay(ranked[0][0])
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=deadline, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Primary is slower than its usual tail: hedge
+                    backup = next(backups, None)
+                    if backup is not None:
+                        telemetry.annotate(hedged=True)
+                        launch(backup)
+                        deadline = self._hedge_delay(backup[0])
+                    else:
+                        deadline = None
+                    continue
+
+                for task in done:
+                    provider, provider_model = pending.pop(task)
+                    try:
+                        result, usage = task.result()
+                    except Exception as e:
+                        print(f"⚠️ {provider.name} failed: {e}")
+                        last_error = e
+                        continue
+                    span = telemetry.current_span()
+                    if span is not None:
+                        span.set(provider=provider.name, provider_model=provider_model)
+                        span.record_usage(provider_model, usage)
+                    return result
+
+                # Everything in flight failed: move straight to the next backup
+                if not pending:
+                    backup = next(backups, None)
+                    if backup is not None:
+                        telemetry.annotate(hedged=True)
+                        launch(backup)
+                        deadline = self._hedge_delay(backup[0])
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error or RuntimeError("No provider available")
+
+    async def aparse_n(self, messages: list, schema: Type[BaseModel], n: int, priority: int = INTERACTIVE,
+                       model: str = None) -> List[BaseModel]:
+        """
+        n independent hedged calls; failed samples are dropped. With the
+        shared prefix cached, only the first pays full prompt price.
+        """
+        results = await asyncio.gather(
+            *(self.aparse(messages, schema, priority=priority, model=model) for _ in range(n)),
+            return_exceptions=True,
+        )
+        samples = [r for r in results if not isinstance(r, BaseException)]
+        if not samples:
+            raise results[0]
+        return samples
+
+    def parse_n(self, messages: list, schema: Type[BaseModel], n: int, priority: int = INTERACTIVE,
+                model: str = None) -> List[BaseModel]:
+        return run_sync(self.aparse_n(messages, schema, n, priority=priority, model=model))
+
+    def parse(self, messages: list, schema: Type[BaseModel], priority: int = INTERACTIVE,
+              model: str = None) -> BaseModel:
+        """
+        Sync entry point for the non-async Selector/Arena/Judge paths.
+        """
+        return run_sync(self.aparse(messages, schema, priority=priority, model=model))
+
+    def health(self) -> dict:
+        return {p.name: p.health.snapshot() for p in self.providers}
+
+
+_default_router = None
+_router_lock = threading.Lock()
+
+def get_default_router() -> Optional[HedgedRouter]:
+    """
+    Built from ARENA_PROVIDERS (e.g. "openai,anthropic"), in preference
+    order. Returns None for the default single-provider OpenAI setup, so
+    callers keep the plain OpenAI path.
+    """
+    global _default_router
+    names = [n.strip().lower() for n in os.getenv("ARENA_PROVIDERS", "openai").split(",") if n.strip()]
+    if len(names) < 2:
+        return None
+    with _router_lock:
+        if _default_router is None:
+            unknown = [n for n in names if n not in PROVIDER_CLASSES]
+            if unknown:
+                raise ValueError(f"Unknown providers in ARENA_PROVIDERS: {unknown}")
+            _default_router = HedgedRouter(
+                [PROVIDER_CLASSES[n]() for n in names],
+                hedge_quantile=float(os.getenv("ARENA_HEDGE_QUANTILE", 0.9)),
+            )
+        return _default_router
@@ -0,0 +1,297 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+from functools import lru_cache
+from typing import Callable
+
+from src import telemetry
+
+# Priority classes: lower runs first
+INTERACTIVE = 0
+BATCH = 1
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+# Completion tokens we reserve up front; reconciled against usage afterwards
+DEFAULT_COMPLETION_ESTIMATE = 1500
+# How often a queued request re-checks for capacity
+POLL_SECONDS = 0.05
+
+@lru_cache(maxsize=1)
+def retryable_errors() -> tuple:
+    # The SDK is only needed once a call has failed; keep it off the import path
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+    )
+
+def is_openai_retryable(error: Exception) -> bool:
+    # 429, 5xx, timeouts and dropped connections from the OpenAI SDK
+    if isinstance(error, retryable_errors()):
+        return True
+    import openai
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+class TokenBucket:
+    """
+    Continuous-refill bucket holding up to one minute of capacity.
+    Not thread-safe on its own; RequestScheduler holds the lock.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        # Positive delta returns over-reserved capacity, negative charges more
+        self.level = min(self.capacity, self.level + delta)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "tokens")
+
+    def __init__(self, priority: int, seq: int, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RequestScheduler:
+    """
+    Process-wide admission control for model calls.
+
+    Requests wait in a priority queue and are admitted only when both the
+    requests/min and tokens/min buckets have room, so interactive calls
+    overtake queued batch work. Admitted calls that fail with 429/5xx or a
+    connection error are retried with full-jitter exponential backoff,
+    honouring Retry-After when the provider sends it.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        rpm = requests_per_minute or float(os.getenv("ARENA_RPM", DEFAULT_RPM))
+        tpm = tokens_per_minute or float(os.getenv("ARENA_TPM", DEFAULT_TPM))
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._metrics = {
+            "in_flight": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "throttled_seconds": 0.0,
+        }
+
+    # --- Admission ---------------------------------------------------
+
+    def _enqueue(self, tokens: int, priority: int) -> _Ticket:
+        ticket = _Ticket(priority, next(self._seq), tokens)
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _try_admit(self, ticket: _Ticket) -> float:
+        """
+        Returns 0 once admitted, otherwise how long to wait before retrying.
+        """
+        with self._lock:
+            if self._waiting[0] is not ticket:
+                return POLL_SECONDS
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(ticket.tokens, now))
+            if wait > 0:
+                return min(wait, POLL_SECONDS * 4)
+            self.requests.take(1)
+            self.tokens.take(ticket.tokens)
+            heapq.heappop(self._waiting)
+            self._metrics["in_flight"] += 1
+            return 0.0
+
+    def _abandon(self, ticket: _Ticket):
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+
+    def _acquire(self, tokens: int, priority: int) -> float:
+        ticket = self._enqueue(tokens, priority)
+        started = time.monotonic()
+        try:
+            while True:
+                wait = self._try_admit(ticket)
+                if wait == 0:
+                    return self._record_wait(started)
+                time.sleep(wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    async def _aacquire(self, tokens: int, priority: int) -> float:
+        ticket = self._enqueue(tokens, priority)
+        started = time.monotonic()
+        try:
+            while True:
+                wait = self._try_admit(ticket)
+                if wait == 0:
+                    return self._record_wait(started)
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Includes cancellation from a per-agent timeout
+            self._abandon(ticket)
+            raise
+
+    def _record_wait(self, started: float) -> float:
+        waited = time.monotonic() - started
+        with self._lock:
+            self._metrics["throttled_seconds"] += waited
+        telemetry.add("queue_ms", waited * 1000)
+        return waited
+
+    def _release(self, reserved: int, result, failed: bool = False):
+        actual = _usage_tokens(result)
+        with self._lock:
+            self._metrics["in_flight"] -= 1
+            self._metrics["failed" if failed else "completed"] += 1
+            if actual is not None:
+                self.tokens.adjust(reserved - actual)
+
+    # --- Retry policy ------------------------------------------------
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return is_openai_retryable(error)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _note_retry(self, label: str, attempt: int, error: Exception, delay: float):
+        with self._lock:
+            self._metrics["retries"] += 1
+        telemetry.add("retries", 1)
+        print(f"🔁 {label or 'request'} retry {attempt + 1}/{self.max_retries} in {delay:.1f}s: {error}")
+
+    # --- Public API --------------------------------------------------
+
+    def call(self, fn: Callable, tokens: int, priority: int = INTERACTIVE, label: str = None,
+             retryable: Callable[[Exception], bool] = None):
+        """
+        Runs fn() once admitted, retrying transient provider errors.
+        tokens is the up-front estimate (prompt + expected completion).
+        retryable classifies errors for non-OpenAI SDKs (see
+        providers.Provider.is_retryable); OpenAI's are the default.
+        """
+        retryable = retryable or self._is_retryable
+        attempt = 0
+        while True:
+            self._acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                self._release(tokens, None, failed=True)
+                if attempt >= self.max_retries or not retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                self._note_retry(label, attempt, e, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release(tokens, result)
+            return result
+
+    async def acall(self, fn: Callable, tokens: int, priority: int = INTERACTIVE, label: str = None,
+                    retryable: Callable[[Exception], bool] = None):
+        """
+        Async variant of call(); fn() must return an awaitable.
+        """
+        retryable = retryable or self._is_retryable
+        attempt = 0
+        while True:
+            await self._aacquire(tokens, priority)
+            try:
+                result = await fn()
+            except BaseException as e:
+                self._release(tokens, None, failed=True)
+                if not isinstance(e, Exception) or attempt >= self.max_retries or not retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                self._note_retry(label, attempt, e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._release(tokens, result)
+            return result
+
+    def metrics(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot["queue_depth"] = len(self._waiting)
+            snapshot["queue_depth_interactive"] = sum(1 for t in self._waiting if t.priority == INTERACTIVE)
+            snapshot["queue_depth_batch"] = len(self._waiting) - snapshot["queue_depth_interactive"]
+            snapshot["requests_available"] = round(self.requests.level, 1)
+            snapshot["tokens_available"] = round(self.tokens.level)
+        return snapshot
+
+
+def _usage_tokens(result):
+    usage = getattr(result, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+def get_default_scheduler() -> RequestScheduler:
+    """
+    The scheduler shared by every Selector, Arena and Judge in this process.
+    Limits come from ARENA_RPM / ARENA_TPM.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
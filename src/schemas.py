@@ -35,4 +35,35 @@ class CIOVerdict(BaseModel):
     winner: str
     net_risk_units: float
     executive_summary: str
-    deciding_factor: str
\ No newline at end of file
+    deciding_factor: str
+
+class LeverChange(BaseModel):
+    lever_name: str = Field(..., description="Existing lever name to revise/drop, or a new lever to add")
+    action: Literal['add', 'revise', 'drop']
+    sensitivity_score: int = Field(..., description="1-5 after this round (ignored when dropped)")
+    impact_description: str = Field(..., description="Why its weight changed this round")
+
+class Rebuttal(BaseModel):
+    rebuttal_points: List[str] = Field(..., description="2-4 direct responses to the opponent's strongest arguments")
+    concessions: List[str] = Field(..., description="Opponent points you accept; empty if none")
+    lever_changes: List[LeverChange] = Field(..., description="Only levers whose weight changed this round")
+    revised_risk_units: float = Field(..., description="Your size in Risk Units (1-10) after this round")
+    revised_confidence: int = Field(..., description="1-100 confidence after this round")
+    sizing_rationale: str = Field(..., description="One sentence: why the size moved or held")
+
+class DimensionScore(BaseModel):
+    dimension: str = Field(..., description="Rubric dimension name, exactly as listed")
+    score: int = Field(..., description="1-5 against the rubric's anchors")
+    rationale: str = Field(..., description="One or two sentences pointing at the output")
+
+class SideGrade(BaseModel):
+    scores: List[DimensionScore]
+    failure_modes: str = Field(..., description="Notable failure modes, esp. conviction levers, event paths, risk usage")
+
+class RubricGrade(BaseModel):
+    long_pm: SideGrade
+    short_pm: SideGrade
+    winner: Literal['Long', 'Short', 'Split']
+    deciding_dimensions: List[str]
+    critical_missing_feature: str = Field(..., description="A KPI or event that would have changed the winner if recognized")
+    reason: str
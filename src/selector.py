@@ -1,16 +1,18 @@
-import os
-from openai import OpenAI
+import asyncio
+from typing import TYPE_CHECKING
 from src.schemas import TradeTarget
+from src.cache import ResponseCache, get_default_cache
+from src import llm
+from src import telemetry
+from src.scheduler import INTERACTIVE
+from src.clients import get_client, get_async_client, run_sync
+from src.deadline import Deadline
+from src.context import SELECTOR_TOKEN_BUDGET, pack_text
 
-class Selector:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-    def select_target(self, text: str) -> TradeTarget:
-        """
-        Analyzes the text to pick the best trading vehicle (Stock or ETF).
-        """
-        system_prompt = """
+SYSTEM_PROMPT = """
         You are a Senior Research Analyst at a Hedge Fund.
         
         YOUR TASK:
@@ -29,23 +31,92 @@ class Selector:
         - If multiple options exist, pick the one with the highest beta to the theme.
         """
 
+class Selector:
+    def __init__(self, cache: ResponseCache = None):
+        self.cache = cache if cache is not None else get_default_cache()
+        # When True, skip cached answers (fresh answers are still stored)
+        self.bypass_cache = False
+        # Scheduler priority class; batch runs set scheduler.BATCH
+        self.priority = INTERACTIVE
+        # When True, errors and timeouts raise instead of returning the
+        # fallback target; batch runs set it so a failed selection is retried
+        # on resume rather than checkpointed as SPY
+        self.raise_errors = False
+
+    @property
+    def client(self):
+        # Shared pooled client (src.clients); reads OPENAI_API_KEY on first use
+        return get_client()
+
+    def _build_messages(self, text: str, token_budget: int = SELECTOR_TOKEN_BUDGET) -> list:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Analyze this research:\n\n{pack_text(text, token_budget)}"}
+        ]
+
+    def _fallback(self) -> TradeTarget:
+        return TradeTarget(
+            is_sector_report=True, 
+            primary_ticker="SPY", 
+            instrument_name="S&P 500", 
+            reasoning="Fallback: Could not identify specific target.", 
+            confidence=1
+        )
+
+    def select_target(self, text: str, deadline: Deadline = None) -> TradeTarget:
+        """
+        Analyzes the text to pick the best trading vehicle (Stock or ETF).
+        Text over the selector's token budget is relevance-packed, not sliced.
+        With a deadline the call is bounded by the selector's share of it.
+        """
+        if deadline is not None:
+            return run_sync(self.aselect_target(text, deadline=deadline))
         try:
-            completion = self.client.beta.chat.completions.parse(
-                model="gpt-4o-2024-08-06",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Analyze this research:\n\n{text[:20000]}"} 
-                ],
-                response_format=TradeTarget,
-            )
-            return completion.choices[0].message.parsed
+            with telemetry.span("select"):
+                return llm.parse(
+                    self.client, llm.DEFAULT_MODEL, self._build_messages(text), TradeTarget,
+                    cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+                )
         except Exception as e:
+            if self.raise_errors:
+                raise
             print(f"Selection Error: {e}")
             # Fallback default
-            return TradeTarget(
-                is_sector_report=True, 
-                primary_ticker="SPY", 
-                instrument_name="S&P 500", 
-                reasoning="Fallback: Could not identify specific target.", 
-                confidence=1
-            )
\ No newline at end of file
+            return self._fallback()
+
+    async def aselect_target(self, text: str, client: "AsyncOpenAI" = None, deadline: Deadline = None) -> TradeTarget:
+        """
+        Async variant of select_target. Under a short deadline it packs less
+        text for the fallback model; with almost no time left, or if the
+        call overruns, it returns the fallback target without waiting.
+        """
+        client = client or get_async_client()
+        model, token_budget, timeout = llm.DEFAULT_MODEL, SELECTOR_TOKEN_BUDGET, None
+        if deadline is not None:
+            plan = deadline.plan("select", model)
+            if plan.skip:
+                return self._fallback()
+            model, timeout = plan.model, plan.seconds
+            token_budget = int(SELECTOR_TOKEN_BUDGET * plan.context_scale)
+        try:
+            with telemetry.span("select", model=model):
+                return await asyncio.wait_for(
+                    llm.aparse(
+                        client, model, self._build_messages(text, token_budget), TradeTarget,
+                        cache=self.cache, refresh=self.bypass_cache, priority=self.priority,
+                    ),
+                    timeout=timeout,
+                )
+        except asyncio.TimeoutError:
+            if self.raise_errors:
+                raise
+            if deadline is not None:
+                deadline.note("select", f"timed out after {timeout:.0f}s; fallback target")
+            else:
+                print("⏱️ Selection timed out; fallback target")
+            return self._fallback()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            print(f"Selection Error: {e}")
+            return self._fallback()
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+DEFAULT_SPANS_PATH = os.path.join("data", "telemetry", "spans.jsonl")
+# The span log rolls over to spans.jsonl.1 .. .N once it reaches this size,
+# so a long-running server keeps a bounded amount of history on disk
+DEFAULT_SPANS_MAX_MB = 50
+SPANS_BACKUPS = 3
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o-2024-08-06": (2.50, 1.25, 10.00),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "claude-sonnet-4-5": (3.00, 0.30, 15.00),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+}
+
+_current_span = contextvars.ContextVar("arena_span", default=None)
+_current_trace = contextvars.ContextVar("arena_trace", default=None)
+_sink_lock = threading.Lock()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> Optional[float]:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+class Span:
+    """
+    One timed unit of work. Field names follow the OpenTelemetry span
+    model so the JSONL can be shipped to a collector as-is.
+    """
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "OK"
+        self._lock = threading.Lock()
+
+    @property
+    def wall_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_usage(self, model: str, usage):
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        self.add("prompt_tokens", prompt)
+        self.add("completion_tokens", completion)
+        self.add("cached_tokens", cached)
+        cost = estimate_cost(model, prompt, completion, cached)
+        if cost is not None:
+            self.add("cost_usd", cost)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.wall_ms, 2),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """
+    Collects every span started inside trace(), e.g. one adjudication.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def _add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def rows(self) -> list:
+        """
+        Flat per-span table for display: finished spans in start order.
+        """
+        depth = {}
+        rows = []
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+            attrs = span.attributes
+            rows.append({
+                "stage": "  " * depth[span.span_id] + span.name,
+                "wall_ms": round(span.wall_ms, 1),
+                "queue_ms": round(attrs.get("queue_ms", 0.0), 1),
+                "prompt_tokens": attrs.get("prompt_tokens", 0),
+                "completion_tokens": attrs.get("completion_tokens", 0),
+                "cached_tokens": attrs.get("cached_tokens", 0),
+                "retries": attrs.get("retries", 0),
+                "cost_usd": round(attrs.get("cost_usd", 0.0), 5),
+                "status": span.status,
+            })
+        return rows
+
+
+def _sink_path() -> Optional[str]:
+    if os.getenv("ARENA_TELEMETRY", "1").lower() in ("0", "false", "no"):
+        return None
+    return os.getenv("ARENA_TELEMETRY_PATH", DEFAULT_SPANS_PATH)
+
+def _rotate(path: str):
+    # spans.jsonl -> .1 -> .2 ...; the oldest backup is dropped
+    max_bytes = float(os.getenv("ARENA_TELEMETRY_MAX_MB", DEFAULT_SPANS_MAX_MB)) * 1024 * 1024
+    try:
+        if max_bytes <= 0 or os.path.getsize(path) < max_bytes:
+            return
+    except OSError:
+        return
+    for n in range(SPANS_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{path}.{n}"):
+            os.replace(f"{path}.{n}", f"{path}.{n + 1}")
+    os.replace(path, f"{path}.1")
+
+def _emit(span: Span):
+    path = _sink_path()
+    if path is None:
+        return
+    line = json.dumps(span.to_dict(), default=str)
+    with _sink_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _rotate(path)
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times the enclosed block as a child of the current span. Context vars
+    follow asyncio tasks, so spans opened inside gather() nest correctly.
+    """
+    parent = _current_span.get()
+    active_trace = _current_trace.get()
+    trace_id = parent.trace_id if parent else (active_trace.trace_id if active_trace else uuid.uuid4().hex)
+    current = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    if active_trace is not None:
+        active_trace._add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        _emit(current)
+
+@contextmanager
+def trace(name: str):
+    """
+    Groups the spans of one request so the app can show where time went.
+    """
+    collected = Trace(name)
+    token = _current_trace.set(collected)
+    try:
+        with span(name):
+            yield collected
+    finally:
+        _current_trace.reset(token)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def annotate(**attributes):
+    """
+    Sets attributes on the current span; a no-op outside any span.
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+def add(key: str, amount: float):
+    current = _current_span.get()
+    if current is not None:
+        current.add(key, amount)
@@ -0,0 +1,101 @@
+import pytest
+from pydantic import BaseModel
+
+from src.cache import ResponseCache
+
+MESSAGES = [{"role": "system", "content": "s"}, {"role": "user", "content": "document"}]
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class OtherAnswer(BaseModel):
+    text: str
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("src.cache.time.time", clock)
+    return clock
+
+
+def _cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(path=str(tmp_path / "responses.sqlite"), **kwargs)
+
+
+def test_key_covers_model_messages_schema_and_params():
+    key = ResponseCache.make_key("m", MESSAGES, Answer)
+    assert key == ResponseCache.make_key("m", [dict(m) for m in MESSAGES], Answer)
+    assert key != ResponseCache.make_key("other", MESSAGES, Answer)
+    assert key != ResponseCache.make_key("m", MESSAGES[:1], Answer)
+    assert key != ResponseCache.make_key("m", MESSAGES, OtherAnswer)
+    assert key != ResponseCache.make_key("m", MESSAGES, Answer, n=3)
+
+
+def test_round_trip_revalidates_against_the_schema(tmp_path, clock):
+    cache = _cache(tmp_path)
+    key = ResponseCache.make_key("m", MESSAGES, Answer)
+    assert cache.get(key, Answer) is None
+    cache.put(key, Answer(text="hello"))
+    assert cache.get(key, Answer) == Answer(text="hello")
+
+
+class Strict(BaseModel):
+    text: int
+
+
+def test_schema_drift_is_a_miss(tmp_path, clock):
+    cache = _cache(tmp_path)
+    cache.put("k", Answer(text="not a number"))
+    assert cache.get("k", Strict) is None
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache.put("k", Answer(text="a"))
+    clock.now += 59
+    assert cache.get("k", Answer) is not None
+    clock.now += 2
+    assert cache.get("k", Answer) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_is_least_recently_used_by_count(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("a", Answer(text="a"))
+    clock.now += 1
+    cache.put("b", Answer(text="b"))
+    clock.now += 1
+    assert cache.get("a", Answer) is not None  # a is now more recent than b
+    clock.now += 1
+    cache.put("c", Answer(text="c"))
+    assert cache.get("b", Answer) is None
+    assert cache.get("a", Answer) is not None
+    assert cache.get("c", Answer) is not None
+
+
+def test_eviction_respects_the_byte_limit(tmp_path, clock):
+    size = len(Answer(text="x" * 100).model_dump_json())
+    cache = _cache(tmp_path, max_bytes=size * 2)
+    for key in "abc":
+        clock.now += 1
+        cache.put(key, Answer(text=key * 100))
+    assert cache.stats() == {"entries": 2, "bytes": size * 2}
+    assert cache.get("a", Answer) is None
+
+
+def test_disabled_cache_never_stores(tmp_path):
+    cache = _cache(tmp_path, enabled=False)
+    cache.put("k", Answer(text="a"))
+    assert cache.get("k", Answer) is None
+    assert not (tmp_path / "responses.sqlite").exists()
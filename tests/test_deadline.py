@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from src.deadline import Deadline, FALLBACK_MODEL, FULL_QUALITY_SECONDS, MIN_CONTEXT_SCALE, MIN_STAGE_SECONDS
+
+MODEL = "gpt-4o-2024-08-06"
+
+
+def _deadline(stages, remaining: float) -> Deadline:
+    # Pin the time left so budgets do not depend on how fast the test runs
+    deadline = Deadline(600, stages)
+    deadline.expires_at = time.monotonic() + remaining
+    return deadline
+
+
+def test_full_budget_keeps_model_and_context():
+    deadline = _deadline(("fight", "judge"), 600)
+    plan = deadline.plan("fight", MODEL)
+    assert (plan.model, plan.context_scale, plan.skip, plan.degraded) == (MODEL, 1.0, False, False)
+    assert deadline.models == {"fight": MODEL}
+    assert deadline.degraded == []
+
+
+def test_short_fight_drops_model_and_packs_context():
+    # fight gets 6/8 of the time left
+    deadline = _deadline(("fight", "judge"), FULL_QUALITY_SECONDS["fight"] / 2 * 8 / 6)
+    plan = deadline.plan("fight", MODEL)
+    assert plan.model == FALLBACK_MODEL
+    assert plan.context_scale == pytest.approx(0.5, abs=0.01)
+    assert deadline.models == {"fight": FALLBACK_MODEL}
+    assert "context" in deadline.degraded[0]
+
+
+def test_context_scale_has_a_floor():
+    deadline = _deadline(("fight",), FULL_QUALITY_SECONDS["fight"] * 0.05)
+    assert deadline.plan("fight", MODEL).context_scale == MIN_CONTEXT_SCALE
+
+
+def test_short_judge_only_swaps_model():
+    deadline = _deadline(("judge",), 6.5)
+    plan = deadline.plan("judge", MODEL)
+    assert (plan.model, plan.context_scale, plan.skip) == (FALLBACK_MODEL, 1.0, False)
+    assert deadline.degraded == [f"judge: 6s budget: {FALLBACK_MODEL}"]
+
+
+def test_judge_is_skipped_below_its_minimum():
+    deadline = _deadline(("judge",), MIN_STAGE_SECONDS["judge"] / 2)
+    plan = deadline.plan("judge", MODEL)
+    assert plan.skip and plan.degraded
+    assert "judge" not in deadline.models
+
+
+def test_debate_has_a_budget_but_no_plan():
+    deadline = _deadline(("fight", "debate", "judge"), 110)
+    # debate and judge still to run: 3 / (3 + 2) of the time left
+    assert deadline.budget("debate") == pytest.approx(66, abs=0.5)
+    with pytest.raises(ValueError):
+        deadline.plan("debate", MODEL)
+
+
+def test_earlier_stages_leave_time_to_later_ones():
+    deadline = _deadline(("fight", "debate", "judge"), 110)
+    assert deadline.budget("fight") == pytest.approx(60, abs=0.5)
+    assert deadline.budget("judge") == pytest.approx(110, abs=0.5)
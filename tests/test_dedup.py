@@ -0,0 +1,50 @@
+from src.dedup import dedupe_pages, find_boilerplate
+
+
+def _filing(pages: int = 12) -> list:
+    # Every page opens and closes with figures that change page to page,
+    # framed by a real running header and page-x-of-y footer
+    return [[
+        "\n".join([
+            "ACME Corp Confidential",
+            f"Q{n % 4 + 1} FY{20 + n}|{1000 + 17 * n}|{1.1 + n / 100:.2f}",
+            f"Revenue {2000 + 31 * n} operating income {300 + 7 * n}",
+            f"Management discussed segment {n} results with a focus on pricing and mix this quarter.",
+            f"Q{n % 4 + 1} FY{20 + n} {1051 + n} {1.40 + n / 100:.2f}",
+            f"Page {n + 1} of {pages}",
+        ])
+        for n in range(pages)
+    ]]
+
+
+def test_numeric_edge_rows_are_kept():
+    pages = _filing()
+    result = dedupe_pages(pages)
+    for n, page in enumerate(result.pages[0]):
+        assert f"Q{n % 4 + 1} FY{20 + n}|{1000 + 17 * n}|" in page
+        assert f"Revenue {2000 + 31 * n} operating income {300 + 7 * n}" in page
+        assert f"{1051 + n}" in page
+
+
+def test_headers_and_page_counters_are_removed():
+    result = dedupe_pages(_filing())
+    for page in result.pages[0]:
+        assert "ACME Corp Confidential" not in page
+        assert "Page " not in page
+    assert result.boilerplate_lines == 24
+
+
+def test_numeric_rows_never_become_boilerplate_keys():
+    keys = find_boilerplate(_filing())
+    assert keys == {"acme corp confidential", "#"}
+
+
+def test_tables_differing_only_in_figures_are_not_near_duplicates():
+    table = "[table]\nSegment|FY2025|FY2026\n" + "\n".join(f"Segment {s}|{{a{s}}}|{{b{s}}}" for s in range(6))
+    pages = [[
+        table.format(**{f"a{s}": 100 * n + s for s in range(6)}, **{f"b{s}": 200 * n + s for s in range(6)})
+        for n in range(1, 4)
+    ]]
+    result = dedupe_pages(pages)
+    assert result.duplicate_units == 0
+    assert all("Segment 5" in page for page in result.pages[0])
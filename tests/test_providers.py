@@ -0,0 +1,207 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from src.deadline import FALLBACK_MODEL
+from src.providers import (
+    AnthropicProvider, GeminiProvider, HedgedRouter, OpenAIProvider, Provider, ProviderHealth, Usage,
+)
+from src.scheduler import RequestScheduler
+
+MESSAGES = [{"role": "user", "content": "document"}]
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class FakeProvider(Provider):
+    """
+    Answers after `delay` seconds, or raises `error` on the first
+    `failures` calls (every call by default); records every call and
+    whether it was cancelled by the router.
+    """
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception = None, failures: int = None, **kwargs):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.failures = failures
+        self.calls = []
+        self.cancelled = 0
+        super().__init__(model=kwargs.pop("model", f"{name}-model"),
+                         scheduler=RequestScheduler(requests_per_minute=1e6, tokens_per_minute=1e9, base_delay=0.01))
+
+    def _make_client(self):
+        return None
+
+    async def _call(self, messages, schema, model):
+        self.calls.append(model)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None and (self.failures is None or len(self.calls) <= self.failures):
+            raise self.error
+        return schema(text=self.name), Usage(10, 5)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+def _route(router: HedgedRouter, **kwargs):
+    return asyncio.run(router.aparse(MESSAGES, Answer, **kwargs))
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = FakeProvider("a"), FakeProvider("b")
+    router = HedgedRouter([primary, backup], default_hedge_delay=1.0)
+    assert _route(router).text == "a"
+    assert backup.calls == []
+    assert primary.health.successes == 1
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary, backup = FakeProvider("a", delay=5.0), FakeProvider("b", delay=0.01)
+    router = HedgedRouter([primary, backup], default_hedge_delay=0.05)
+    started = time.monotonic()
+    assert _route(router).text == "b"
+    assert time.monotonic() - started < 1.0
+    assert primary.cancelled == 1
+    # Losing the race is not a failure
+    assert primary.health.failures == 0
+
+
+def test_hedge_delay_follows_the_latency_quantile():
+    provider = FakeProvider("a")
+    router = HedgedRouter([provider], hedge_quantile=0.9, default_hedge_delay=30.0, min_hedge_delay=2.0)
+    assert router._hedge_delay(provider) == 30.0
+    for seconds in (1, 2, 3, 4, 10):
+        provider.health.record_success(seconds)
+    assert router._hedge_delay(provider) == 10
+    provider.health.latencies.clear()
+    for _ in range(5):
+        provider.health.record_success(0.1)
+    assert router._hedge_delay(provider) == 2.0
+
+
+def test_error_fails_over_without_waiting_for_the_hedge():
+    primary = FakeProvider("a", error=ValueError("bad output"))
+    backup = FakeProvider("b")
+    router = HedgedRouter([primary, backup], default_hedge_delay=5.0)
+    started = time.monotonic()
+    assert _route(router).text == "b"
+    assert time.monotonic() - started < 1.0
+    assert primary.health.failures == 1
+
+
+def test_last_error_is_raised_when_every_provider_fails():
+    router = HedgedRouter([FakeProvider("a", error=ValueError("a")), FakeProvider("b", error=ValueError("b"))])
+    with pytest.raises(ValueError, match="b"):
+        _route(router)
+
+
+def test_breaker_half_open_probe():
+    health = ProviderHealth(trip_after=2, cooldown=0.05)
+    health.record_failure()
+    assert health.healthy
+    health.record_failure()
+    assert health.tripped and not health.healthy and not health.begin()
+
+    time.sleep(0.06)
+    assert health.healthy
+    assert health.begin()
+    # Only one probe at a time; everyone else still avoids the provider
+    assert not health.begin() and not health.healthy
+
+    health.record_failure(probe=True)
+    assert not health.probing and not health.healthy
+
+    time.sleep(0.06)
+    assert health.begin()
+    health.release_probe()
+    assert health.tripped and health.healthy
+
+    assert health.begin()
+    health.record_success(0.1)
+    assert not health.tripped and health.healthy and not health.begin()
+
+
+def test_tripped_provider_is_ranked_last():
+    primary, backup = FakeProvider("a"), FakeProvider("b")
+    for _ in range(primary.health.trip_after):
+        primary.health.record_failure()
+    router = HedgedRouter([primary, backup], default_hedge_delay=1.0)
+    assert _route(router).text == "b"
+    assert primary.calls == []
+
+
+def test_probe_that_loses_a_hedge_race_is_released():
+    primary, backup = FakeProvider("a", delay=5.0), FakeProvider("b")
+    primary.health.cooldown = 0.0
+    for _ in range(primary.health.trip_after):
+        primary.health.record_failure()
+    router = HedgedRouter([primary, backup], default_hedge_delay=0.05)
+    assert _route(router).text == "b"
+    assert primary.cancelled == 1
+    assert not primary.health.probing and primary.health.tripped
+
+
+def test_requested_model_is_routed_to_its_provider():
+    openai, anthropic = FakeProvider("openai", model="gpt-x"), FakeProvider("anthropic", model="claude-x")
+    router = HedgedRouter([openai, anthropic], default_hedge_delay=1.0)
+    assert router.label == "hedged:openai/gpt-x,anthropic/claude-x"
+    assert router.label_for(FALLBACK_MODEL) == f"hedged:openai/{FALLBACK_MODEL},anthropic/{anthropic.fallback_model}"
+    assert router.label_for("claude-opus-4-1") == "hedged:anthropic/claude-opus-4-1"
+
+    assert _route(router, model="claude-opus-4-1").text == "anthropic"
+    assert anthropic.calls == ["claude-opus-4-1"] and openai.calls == []
+    with pytest.raises(ValueError):
+        _route(router, model="llama-3")
+
+
+def test_is_retryable_uses_the_status():
+    provider = FakeProvider("a")
+    assert provider.is_retryable(StatusError(429))
+    assert provider.is_retryable(StatusError(503))
+    assert not provider.is_retryable(StatusError(400))
+    assert not provider.is_retryable(ValueError())
+
+
+def test_transient_provider_errors_are_retried():
+    provider = FakeProvider("a", error=StatusError(503), failures=2)
+    assert _route(HedgedRouter([provider])).text == "a"
+    assert len(provider.calls) == 3
+    assert provider.scheduler.metrics()["retries"] == 2
+    assert provider.health.failures == 0
+
+
+def test_sdk_errors_are_classified():
+    openai = pytest.importorskip("openai")
+    anthropic = pytest.importorskip("anthropic")
+    # Just the fields the SDK error constructors read off the HTTP response
+    request = None
+
+    def response(status):
+        return SimpleNamespace(status_code=status, headers={}, request=request)
+
+    openai_provider = OpenAIProvider(model="gpt-x", scheduler=RequestScheduler(1e6, 1e9))
+    assert openai_provider.is_retryable(openai.RateLimitError("slow down", response=response(429), body=None))
+    assert openai_provider.is_retryable(openai.APIConnectionError(request=request))
+    assert not openai_provider.is_retryable(openai.BadRequestError("bad", response=response(400), body=None))
+
+    anthropic_provider = AnthropicProvider(model="claude-x", scheduler=RequestScheduler(1e6, 1e9))
+    assert anthropic_provider.is_retryable(anthropic.APIConnectionError(request=request))
+    assert anthropic_provider.is_retryable(anthropic.InternalServerError("overloaded", response=response(529), body=None))
+    assert not anthropic_provider.is_retryable(anthropic.BadRequestError("bad", response=response(400), body=None))
+
+    gemini_provider = GeminiProvider(model="gemini-x", scheduler=RequestScheduler(1e6, 1e9))
+    assert gemini_provider.is_retryable(TimeoutError())
+    assert gemini_provider.is_retryable(type("ServiceUnavailable", (Exception,), {"code": 503})())
+    assert not gemini_provider.is_retryable(type("InvalidArgument", (Exception,), {"code": 400})())
@@ -0,0 +1,137 @@
+import time
+import asyncio
+
+import pytest
+
+from bench.fake_openai import FakeConfig, FakeOpenAIServer
+from src.scheduler import BATCH, INTERACTIVE, RequestScheduler, TokenBucket, _retry_after
+
+
+class Transient(Exception):
+    pass
+
+
+def _scheduler(**kwargs) -> RequestScheduler:
+    kwargs.setdefault("requests_per_minute", 1e6)
+    kwargs.setdefault("tokens_per_minute", 1e9)
+    kwargs.setdefault("base_delay", 0.01)
+    return RequestScheduler(**kwargs)
+
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one per second
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    # Oversized requests wait for a full bucket rather than forever
+    assert bucket.wait_time(600, now) == pytest.approx(60.0)
+    bucket.adjust(1e9)
+    assert bucket.level == bucket.capacity
+
+
+def test_token_budget_gates_admission():
+    scheduler = _scheduler(tokens_per_minute=6000)  # 100 tokens/s
+    scheduler.call(lambda: None, tokens=6000)
+    started = time.monotonic()
+    scheduler.call(lambda: None, tokens=20)
+    assert time.monotonic() - started >= 0.15
+    assert scheduler.metrics()["throttled_seconds"] >= 0.15
+
+
+def test_interactive_overtakes_queued_batch():
+    scheduler = _scheduler(requests_per_minute=600)  # one every 0.1s
+    scheduler.requests.take(scheduler.requests.capacity)
+    order = []
+
+    async def run(name, priority):
+        async def fn():
+            order.append(name)
+        await scheduler.acall(fn, tokens=1, priority=priority)
+
+    async def main():
+        batch = [asyncio.create_task(run(f"batch{i}", BATCH)) for i in range(2)]
+        await asyncio.sleep(0)
+        assert scheduler.metrics()["queue_depth_batch"] == 2
+        await asyncio.gather(run("interactive", INTERACTIVE), *batch)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch0", "batch1"]
+
+
+def test_transient_errors_are_retried():
+    scheduler = _scheduler()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Transient()
+        return "ok"
+
+    assert scheduler.call(fn, tokens=1, retryable=lambda e: isinstance(e, Transient)) == "ok"
+    metrics = scheduler.metrics()
+    assert (metrics["retries"], metrics["failed"], metrics["completed"], metrics["in_flight"]) == (2, 2, 1, 0)
+
+
+def test_other_errors_raise_without_retry():
+    scheduler = _scheduler()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(fn, tokens=1, retryable=lambda e: isinstance(e, Transient))
+    assert len(calls) == 1 and scheduler.metrics()["retries"] == 0
+
+
+def test_retries_stop_at_max_retries():
+    scheduler = _scheduler(max_retries=2)
+
+    def fn():
+        raise Transient()
+
+    with pytest.raises(Transient):
+        scheduler.call(fn, tokens=1, retryable=lambda e: True)
+    assert scheduler.metrics()["retries"] == 2
+
+
+def test_rate_limit_from_server_is_retried_after_retry_after():
+    openai = pytest.importorskip("openai")
+    config = FakeConfig(latency_ms=1, latency_sigma=0, error_429=1.0)
+    scheduler = _scheduler()
+    with FakeOpenAIServer(config) as server:
+        client = openai.OpenAI(base_url=server.base_url, api_key="x", max_retries=0)
+
+        def fn():
+            if config.requests:
+                config.error_429 = 0.0
+            return client.chat.completions.create(model="fake", messages=[{"role": "user", "content": "hi"}])
+
+        started = time.monotonic()
+        response = scheduler.call(fn, tokens=10)
+        elapsed = time.monotonic() - started
+    assert response.choices[0].message.content == "ok"
+    assert config.requests == 2 and scheduler.metrics()["retries"] == 1
+    # The fake server sends retry-after: 0.2
+    assert elapsed >= 0.2
+
+
+class _Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class _HTTPError(Exception):
+    def __init__(self, headers):
+        self.response = _Response(headers)
+
+
+def test_retry_after_header_parsing():
+    assert _retry_after(_HTTPError({"retry-after": "1.5"})) == 1.5
+    assert _retry_after(_HTTPError({"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})) is None
+    assert _retry_after(_HTTPError({})) is None
+    assert _retry_after(ValueError()) is None